@@ -15,17 +15,27 @@ def ensure_session(session_id: str | None) -> str:
     return sid
 
 
-def user_message(session_id: str, text: str, *, context: dict | None = None) -> dict:
+def user_message(session_id: str, text: str, *, context: dict | None = None, on_message=None) -> dict:
+    """Plan one turn. Tool calls are logged as proposed as soon as they stream in.
+
+    on_message(text) receives the partial assistant message while the LLM is streaming.
+    """
     append_event(session_id, "user_message", {"text": text, "context": context or {}})
 
-    planned = plan_turn(user_message=text, context=context or {})
+    proposed: set[str] = set()
+
+    def _propose(tc: dict) -> None:
+        append_event(session_id, "tool_call_proposed", tc)
+        proposed.add(tc["call_id"])
+
+    planned = plan_turn(user_message=text, context=context or {}, on_message=on_message, on_tool_call=_propose)
 
     append_event(session_id, "assistant_message", {"text": planned.get("assistant_message", "")})
     append_event(session_id, "plan_created", {"plan": planned.get("plan", [])})
 
     tool_calls = planned.get("tool_calls") or []
     for tc in tool_calls:
-        if isinstance(tc, dict):
+        if isinstance(tc, dict) and tc.get("call_id") not in proposed:
             append_event(session_id, "tool_call_proposed", tc)
 
     if planned.get("questions"):
@@ -124,15 +134,17 @@ def execute_approved_tool_calls(session_id: str, *, context: dict) -> list[dict]
             # If this is candles, generate chart artifact.
             if tool == "ccxt.fetch_ohlcv" and isinstance(out, list):
                 df = charting.ohlcv_to_df(out)
-                inds = charting.simple_indicators(df)
-                fig_json = charting.build_plotly_candles(
+                frame = charting.indicator_frame(df, bollinger=True) if not df.empty else None
+                inds = charting.simple_indicators(df, frame=frame)
+                spec = charting.build_chart_spec(
                     df,
-                    title=f"{args.get('symbol','')} {args.get('timeframe','')}"
+                    title=f"{args.get('symbol','')} {args.get('timeframe','')}",
+                    frame=frame,
                 )
                 artifact_id = store_artifact(
                     session_id,
                     kind="chart",
-                    content={"plotly": fig_json, "indicators": inds, "symbol": args.get("symbol"), "timeframe": args.get("timeframe")},
+                    content={"chart_spec": spec, "indicators": inds, "symbol": args.get("symbol"), "timeframe": args.get("timeframe")},
                     metadata={"tool_call_id": call_id},
                 )
                 append_event(session_id, "chart_created", {"artifact_id": artifact_id, "call_id": call_id})
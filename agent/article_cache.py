@@ -0,0 +1,160 @@
+"""On-disk article cache for the news fetcher, keyed by normalized URL.
+
+Each row keeps the validators of the last response (ETag / Last-Modified) for
+conditional GETs, a hash of the raw body, and the extracted title / text plus
+the trading summary. A 304, or a 200 whose body hash is unchanged, reuses the
+stored extraction, so readability / lxml only run on content that changed.
+Summaries are also read back by `agent.runtime` when no fresh ones were saved.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from sqlite_utils import Database
+
+ROOT = Path(__file__).resolve().parents[1]
+DB_PATH = ROOT / "agent" / "articles.sqlite"
+
+_DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+
+def article_cache_enabled() -> bool:
+    return os.getenv("AGENT_ARTICLE_CACHE", "1") not in ("0", "false", "FALSE")
+
+
+def news_max_age_s() -> float:
+    """How long a cached summary may stand in for a fresh fetch (AGENT_NEWS_MAX_AGE_S, default 1 day)."""
+    try:
+        return max(0.0, float(os.getenv("AGENT_NEWS_MAX_AGE_S", "86400")))
+    except ValueError:
+        return 86400.0
+
+
+def normalize_url(url: str) -> str:
+    """Cache key: lower-case scheme/host, no www./default port/fragment/utm_* params, sorted query."""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "http").lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and str(parts.port) != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not k.lower().startswith("utm_"))
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def _table(db: Database):
+    t = db["articles"]
+    t.create(
+        {
+            "url_key": str,
+            "url": str,
+            "etag": str,
+            "last_modified": str,
+            "content_hash": str,
+            "title": str,
+            "text": str,
+            "summary": str,
+            "fetched_ts": float,
+            "checked_ts": float,
+        },
+        pk="url_key",
+        if_not_exists=True,
+    )
+    return t
+
+
+def _existing_db(db_path: Path | None) -> Database | None:
+    # Readers must not create an empty database file as a side effect.
+    path = Path(db_path or DB_PATH)
+    return Database(path) if path.exists() else None
+
+
+def get_article(url: str, *, db_path: Path | None = None) -> dict | None:
+    db = _existing_db(db_path)
+    if db is None or "articles" not in db.table_names():
+        return None
+    rows = list(db.query("select * from articles where url_key = ?", [normalize_url(url)]))
+    return rows[0] if rows else None
+
+
+def conditional_headers(row: dict | None) -> dict[str, str]:
+    headers = {}
+    if row and row.get("etag"):
+        headers["If-None-Match"] = row["etag"]
+    if row and row.get("last_modified"):
+        headers["If-Modified-Since"] = row["last_modified"]
+    return headers
+
+
+def save_article(
+    url: str,
+    *,
+    etag: str | None,
+    last_modified: str | None,
+    body_hash: str,
+    title: str,
+    text: str,
+    summary: str,
+    db_path: Path | None = None,
+) -> None:
+    now = time.time()
+    _table(Database(db_path or DB_PATH)).upsert(
+        {
+            "url_key": normalize_url(url),
+            "url": url,
+            "etag": etag or "",
+            "last_modified": last_modified or "",
+            "content_hash": body_hash,
+            "title": title,
+            "text": text,
+            "summary": summary,
+            "fetched_ts": now,
+            "checked_ts": now,
+        },
+        pk="url_key",
+        alter=True,
+    )
+
+
+def mark_checked(url: str, *, etag: str | None = None, last_modified: str | None = None, db_path: Path | None = None) -> None:
+    """Record a revalidation (304 or same body); newer validators replace the stored ones."""
+    row = {"url_key": normalize_url(url), "checked_ts": time.time()}
+    if etag:
+        row["etag"] = etag
+    if last_modified:
+        row["last_modified"] = last_modified
+    _table(Database(db_path or DB_PATH)).upsert(row, pk="url_key", alter=True)
+
+
+def cached_summaries(urls, *, max_age_s: float | None = None, db_path: Path | None = None) -> list[str]:
+    """Stored summaries for `urls`, in order.
+
+    URLs never fetched, or (with `max_age_s`) not fetched / revalidated within
+    that many seconds, are skipped.
+    """
+    db = _existing_db(db_path)
+    if db is None or "articles" not in db.table_names():
+        return []
+    keys = [normalize_url(u) for u in urls]
+    if not keys:
+        return []
+    marks = ",".join("?" * len(keys))
+    sql = f"select url_key, summary from articles where url_key in ({marks})"
+    params: list = list(keys)
+    if max_age_s is not None:
+        sql += " and checked_ts >= ?"
+        params.append(time.time() - max_age_s)
+    by_key = {r["url_key"]: r["summary"] for r in db.query(sql, params)}
+    return [by_key[k] for k in dict.fromkeys(keys) if by_key.get(k)]
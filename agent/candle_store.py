@@ -0,0 +1,256 @@
+"""Local OHLCV candle store keyed by (exchange, symbol, timeframe).
+
+Candles live in `agent/cache/candles/<exchange>/<symbol>/<timeframe>.npy` as an
+(N, 6) float64 array [ts_ms, open, high, low, close, volume], sorted and
+deduplicated, and are read back memory-mapped. A JSON sidecar records which
+[start, end] candle ranges the exchange already answered (up to the last candle
+it returned), so ranges it has no candles for (before a listing) are not fetched
+again; only uncovered ranges and holes inside the stored series go to the
+network (paged with `since`). Only closed candles are stored; the candle still
+forming is read with one REST call on top of them.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+CACHE_DIR = ROOT / "agent" / "cache" / "candles"
+
+DEFAULT_PAGE_LIMIT = 300  # OKX returns at most 300 candles per request
+
+_SAFE_RE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def candle_cache_enabled() -> bool:
+    return os.getenv("AGENT_CANDLE_CACHE", "1") not in ("0", "false", "FALSE")
+
+
+def timeframe_ms(timeframe: str) -> int:
+    """Nominal candle length in ms (ccxt's parser: 1m ... 1w, 1M = 30 days, 1y = 365 days)."""
+    import ccxt  # type: ignore
+
+    return int(ccxt.Exchange.parse_timeframe(timeframe)) * 1000
+
+
+def store_supports(timeframe: str) -> bool:
+    """Only fixed-length candles can be stored and aligned; calendar months / years cannot."""
+    return timeframe[-1:] not in ("M", "y")
+
+
+def merge_ranges(ranges: list, step: int) -> list[list[int]]:
+    """Union of inclusive [start, end] candle ranges; ranges one candle apart are joined."""
+    out: list[list[int]] = []
+    for start, end in sorted((int(a), int(b)) for a, b in ranges):
+        if out and start <= out[-1][1] + step:
+            out[-1][1] = max(out[-1][1], end)
+        else:
+            out.append([start, end])
+    return out
+
+
+def subtract_ranges(start: int, end: int, covered: list, step: int) -> list[tuple[int, int]]:
+    """Parts of [start, end] (candle-aligned) not inside any covered range."""
+    missing = []
+    cur = start
+    for a, b in covered:
+        if b < cur:
+            continue
+        if a > end:
+            break
+        if a > cur:
+            missing.append((cur, min(end, a - step)))
+        cur = max(cur, b + step)
+        if cur > end:
+            break
+    if cur <= end:
+        missing.append((cur, end))
+    return missing
+
+
+def align_down(ts: int, step: int, phase: int = 0) -> int:
+    """Latest candle open <= ts on the grid `phase + k * step`."""
+    return ts - (ts - phase) % step
+
+
+def align_up(ts: int, step: int, phase: int = 0) -> int:
+    return ts + (phase - ts) % step
+
+
+def last_closed_open(timeframe: str, now_ms: int | None = None, *, phase: int = 0) -> int:
+    """Open time of the most recent fully closed candle.
+
+    `phase` is the candles' offset from the epoch grid: OKX weekly candles open on
+    Monday (not the epoch's Thursday) and its 1D / 6H / 12H candles in UTC+8.
+    """
+    step = timeframe_ms(timeframe)
+    now = int(time.time() * 1000) if now_ms is None else now_ms
+    return align_down(now, step, phase) - step
+
+
+class CandleStore:
+    def __init__(self, root: Path | None = None):
+        self.root = Path(root or CACHE_DIR)
+        self._locks: dict[tuple, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, key: tuple) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _paths(self, exchange_id: str, symbol: str, timeframe: str) -> tuple[Path, Path]:
+        d = self.root / _SAFE_RE.sub("_", exchange_id) / _SAFE_RE.sub("_", symbol)
+        return d / f"{timeframe}.npy", d / f"{timeframe}.json"
+
+    def _load(self, data_path: Path) -> np.ndarray:
+        if not data_path.exists():
+            return np.empty((0, 6))
+        return np.load(data_path, mmap_mode="r")
+
+    def _meta(self, exchange_id: str, symbol: str, timeframe: str) -> dict:
+        _, meta_path = self._paths(exchange_id, symbol, timeframe)
+        try:
+            return json.loads(meta_path.read_text(encoding="utf-8"))
+        except Exception:
+            return {}
+
+    def coverage(self, exchange_id: str, symbol: str, timeframe: str) -> list[list[int]]:
+        return self._meta(exchange_id, symbol, timeframe).get("covered") or []
+
+    def phase(self, exchange_id: str, symbol: str, timeframe: str) -> int | None:
+        """Offset of the stored candles' open times from the epoch grid (None until known)."""
+        phase = self._meta(exchange_id, symbol, timeframe).get("phase")
+        if phase is not None:
+            return int(phase)
+        data = self._load(self._paths(exchange_id, symbol, timeframe)[0])
+        return int(data[0, 0]) % timeframe_ms(timeframe) if len(data) else None
+
+    def read(self, exchange_id: str, symbol: str, timeframe: str, *, since: int | None = None, until: int | None = None) -> np.ndarray:
+        """Stored candles with since <= ts <= until (a memory-mapped view when possible)."""
+        data = self._load(self._paths(exchange_id, symbol, timeframe)[0])
+        if not len(data):
+            return data
+        ts = data[:, 0]
+        lo = 0 if since is None else int(np.searchsorted(ts, since, side="left"))
+        hi = len(ts) if until is None else int(np.searchsorted(ts, until, side="right"))
+        return data[lo:hi]
+
+    def missing_ranges(self, exchange_id: str, symbol: str, timeframe: str, since: int, until: int) -> list[tuple[int, int]]:
+        """Uncovered parts of [since, until] plus the stored series' holes inside it."""
+        step = timeframe_ms(timeframe)
+        missing = subtract_ranges(since, until, self.coverage(exchange_id, symbol, timeframe), step)
+        gaps = [(max(a, since), min(b, until)) for a, b in self.data_gaps(exchange_id, symbol, timeframe) if a <= until and b >= since]
+        return [(a, b) for a, b in merge_ranges(missing + gaps, step)]
+
+    def data_gaps(self, exchange_id: str, symbol: str, timeframe: str) -> list[tuple[int, int]]:
+        """Holes inside the stored series: (first missing open, last missing open)."""
+        step = timeframe_ms(timeframe)
+        ts = self._load(self._paths(exchange_id, symbol, timeframe)[0])[:, 0].astype(np.int64)
+        jumps = np.flatnonzero(np.diff(ts) > step)
+        return [(int(ts[i] + step), int(ts[i + 1] - step)) for i in jumps]
+
+    def write(self, exchange_id: str, symbol: str, timeframe: str, rows, *, covered: tuple[int, int] | None = None) -> int:
+        """Merge `rows` (ccxt ohlcv lists) into the store; newer rows win on duplicate timestamps."""
+        step = timeframe_ms(timeframe)
+        new = np.asarray(rows, dtype=float).reshape(-1, 6)
+        data_path, meta_path = self._paths(exchange_id, symbol, timeframe)
+        with self._lock((exchange_id, symbol, timeframe)):
+            old = np.array(self._load(data_path))
+            merged = np.concatenate([new, old]) if len(old) else new
+            _, first = np.unique(merged[:, 0], return_index=True)  # first occurrence = the new row
+            merged = merged[first]
+            meta = self._meta(exchange_id, symbol, timeframe)
+            cov = meta.get("covered") or []
+            if covered is not None:
+                cov = merge_ranges(cov + [list(covered)], step)
+            phase = int(merged[0, 0]) % step if len(merged) else meta.get("phase")
+            data_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = data_path.with_suffix(".tmp.npy")
+            np.save(tmp, merged)
+            os.replace(tmp, data_path)
+            meta_tmp = meta_path.with_suffix(".tmp")
+            meta_tmp.write_text(json.dumps({"covered": cov, "phase": phase, "updated_ts": time.time()}), encoding="utf-8")
+            os.replace(meta_tmp, meta_path)
+            return len(merged)
+
+
+_STORE: CandleStore | None = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_candle_store() -> CandleStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = CandleStore()
+        return _STORE
+
+
+def fetch_range_paged(ex, symbol: str, timeframe: str, since: int, until: int, *, page_limit: int = DEFAULT_PAGE_LIMIT) -> list:
+    """Sequential `since` pagination over [since, until] (candle open times, inclusive)."""
+    step = timeframe_ms(timeframe)
+    out: list = []
+    cursor = since
+    while cursor <= until:
+        page = ex.fetch_ohlcv(symbol, timeframe=timeframe, since=cursor, limit=page_limit) or []
+        page = [r for r in page if cursor <= r[0] <= until]
+        if not page:
+            break
+        out.extend(page)
+        cursor = int(page[-1][0]) + step
+    return out
+
+
+def fetch_ohlcv_cached(
+    ex,
+    symbol: str,
+    timeframe: str,
+    *,
+    limit: int = 200,
+    since: int | None = None,
+    until: int | None = None,
+    store: CandleStore | None = None,
+    fetch_range=fetch_range_paged,
+) -> list:
+    """Candles for [since, until] (default: the last `limit`), fetching only uncovered ranges.
+
+    Closed candles come from the store; when the range reaches the present, the
+    candle still forming is appended from one `limit=1` REST call (which also
+    tells the grid phase of a pair not stored yet).
+    """
+    store = store or get_candle_store()
+    step = timeframe_ms(timeframe)
+    exchange_id = getattr(ex, "id", None) or type(ex).__name__
+    now = int(time.time() * 1000)
+    phase = store.phase(exchange_id, symbol, timeframe)
+    latest: list = []
+    if phase is None or until is None or until >= now - step:
+        latest = ex.fetch_ohlcv(symbol, timeframe=timeframe, limit=1) or []
+        if phase is None:
+            phase = int(latest[-1][0]) % step if latest else 0
+    last_closed = last_closed_open(timeframe, now, phase=phase)
+    live = [list(r) for r in latest if r[0] > last_closed and (until is None or r[0] <= until)]
+    until = min(last_closed if until is None else align_down(until, step, phase), last_closed)
+    if since is None:
+        n_closed = max(1, int(limit)) - len(live)
+        if n_closed <= 0:
+            return live
+        since = until - (n_closed - 1) * step
+    else:
+        since = align_up(since, step, phase)
+        live = [r for r in live if r[0] >= since]
+    if since > until:
+        return live
+    for start, end in store.missing_ranges(exchange_id, symbol, timeframe, since, until):
+        rows = [r for r in fetch_range(ex, symbol, timeframe, start, end) if start <= r[0] <= end]
+        if rows:
+            # Covered only up to the last candle received: a short or failed page leaves the rest uncovered.
+            store.write(exchange_id, symbol, timeframe, rows, covered=(start, int(max(r[0] for r in rows))))
+    data = store.read(exchange_id, symbol, timeframe, since=since, until=until)
+    return [[int(r[0]), *map(float, r[1:])] for r in data.tolist()] + live
@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import base64
+import os
+
+import numpy as np
 import pandas as pd
 
 
@@ -11,60 +15,261 @@ def ohlcv_to_df(ohlcv: list) -> pd.DataFrame:
     return df
 
 
-def simple_indicators(df: pd.DataFrame) -> dict:
-    """Lightweight indicators for LLM context / UI overlays."""
+def ema_np(x: np.ndarray, span: int) -> np.ndarray:
+    """pandas `ewm(span=span, adjust=False).mean()` on a float array without NaNs."""
+    if not len(x):
+        return np.empty(0)
+    return pd.Series(x, copy=False).ewm(span=span, adjust=False).mean().to_numpy()
+
+
+def ema_warmup(span: int, tol: float = 1e-12) -> int:
+    """Candles after which the EMA's dependence on its seed value has decayed below `tol`."""
+    a = 2.0 / (span + 1)
+    return int(np.ceil(np.log(tol) / np.log1p(-a)))
+
+
+def ema_last(x: np.ndarray, span: int) -> float | None:
+    """Last value of `ema_np`, computed over a warm-up tail instead of the whole history.
+
+    Seeding from the tail start instead of x[0] changes the result by less than
+    1e-12 of the price range (see `ema_warmup`).
+    """
+    if not len(x):
+        return None
+    tail = x[-ema_warmup(span) :]
+    return float(ema_np(tail, span)[-1])
+
+
+def _rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        out[window - 1 :] = np.lib.stride_tricks.sliding_window_view(x, window).mean(axis=1)
+    return out
+
+
+def rsi_np(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """Simple-average RSI (rolling mean of gains / losses); NaN where the average loss is 0."""
+    out = np.full(len(close), np.nan)
+    if len(close) <= period:
+        return out
+    delta = np.diff(close)
+    gain = _rolling_mean(np.clip(delta, 0, None), period)
+    loss = _rolling_mean(np.clip(-delta, 0, None), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[1:] = np.where(loss != 0, 100.0 - 100.0 / (1.0 + gain / loss), np.nan)
+    return out
+
+
+def rsi_last(close: np.ndarray, period: int = 14) -> float | None:
+    """Last value of `rsi_np`; only reads the last `period + 1` closes."""
+    if len(close) <= period:
+        return None
+    delta = np.diff(close[-(period + 1) :])
+    gain = np.clip(delta, 0, None).mean()
+    loss = np.clip(-delta, 0, None).mean()
+    if loss == 0:
+        return None
+    return float(100.0 - 100.0 / (1.0 + gain / loss))
+
+
+def indicator_frame(
+    df: pd.DataFrame,
+    *,
+    ema_spans: tuple[int, ...] = (20, 50),
+    rsi_period: int = 14,
+    bollinger: bool = False,
+    bb_window: int = 20,
+    bb_stds: float = 2.0,
+    atr: bool = False,
+    atr_period: int = 14,
+) -> pd.DataFrame:
+    """Compute chart / summary indicators once, aligned to `df`.
+
+    Columns: ema{span}, rsi{period}, optionally bb_lower/bb_mid/bb_upper (rolling mean
+    +- stds * sample std of close) and atr{period} (simple mean of true range).
+    """
+    close = df["close"].to_numpy(dtype=float)
+    cols: dict[str, np.ndarray] = {f"ema{s}": ema_np(close, s) for s in ema_spans}
+    cols[f"rsi{rsi_period}"] = rsi_np(close, rsi_period)
+    if bollinger:
+        mid = _rolling_mean(close, bb_window)
+        std = np.full(len(close), np.nan)
+        if len(close) >= bb_window:
+            std[bb_window - 1 :] = np.lib.stride_tricks.sliding_window_view(close, bb_window).std(axis=1, ddof=1)
+        cols["bb_lower"], cols["bb_mid"], cols["bb_upper"] = mid - bb_stds * std, mid, mid + bb_stds * std
+    if atr:
+        high = df["high"].to_numpy(dtype=float)
+        low = df["low"].to_numpy(dtype=float)
+        prev_close = np.concatenate(([np.nan], close[:-1]))
+        tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+        cols[f"atr{atr_period}"] = _rolling_mean(tr, atr_period)
+    return pd.DataFrame(cols, index=df.index)
+
+
+def simple_indicators(df: pd.DataFrame, *, frame: pd.DataFrame | None = None) -> dict:
+    """Lightweight indicators for LLM context / UI overlays.
+
+    Reads the last row of `frame` (see indicator_frame) when given; otherwise uses the
+    last-value variants, which do not build full series.
+    """
     if df.empty:
         return {}
     out: dict = {}
-    close = df["close"].astype(float)
-    out["last_close"] = float(close.iloc[-1])
-    out["ema20"] = float(close.ewm(span=20, adjust=False).mean().iloc[-1])
-    out["ema50"] = float(close.ewm(span=50, adjust=False).mean().iloc[-1])
-    # RSI(14) minimal
-    delta = close.diff()
-    gain = delta.clip(lower=0).rolling(14).mean()
-    loss = (-delta.clip(upper=0)).rolling(14).mean()
-    rs = gain / loss.replace(0, pd.NA)
-    rsi = 100 - (100 / (1 + rs))
-    out["rsi14"] = float(rsi.iloc[-1]) if pd.notna(rsi.iloc[-1]) else None
+    close = df["close"].to_numpy(dtype=float)
+    out["last_close"] = float(close[-1])
+    if frame is not None:
+        out["ema20"] = float(frame["ema20"].iloc[-1])
+        out["ema50"] = float(frame["ema50"].iloc[-1])
+        rsi = frame["rsi14"].iloc[-1]
+        out["rsi14"] = float(rsi) if pd.notna(rsi) else None
+        return out
+    out["ema20"] = ema_last(close, 20)
+    out["ema50"] = ema_last(close, 50)
+    out["rsi14"] = rsi_last(close, 14)
     return out
 
 
-def build_plotly_candles(df: pd.DataFrame, *, title: str = "") -> dict:
-    """Return plotly figure JSON (so it can be stored as an artifact).
+CHART_SPEC_FORMAT = "chart_spec/v1"
 
-    We store JSON instead of figure object for sqlite-friendly persistence.
-    """
-    import plotly.graph_objects as go
+# Column -> stored dtype. Prices keep float64 (tiny-priced coins); overlays and volume are display-only.
+_SPEC_DTYPES = {"ts": "<i8", "open": "<f8", "high": "<f8", "low": "<f8", "close": "<f8", "volume": "<f4"}
+_OVERLAYS = (
+    ("ema20", "EMA20", {}),
+    ("ema50", "EMA50", {}),
+    ("bb_upper", "BB upper", {"width": 1, "dash": "dot"}),
+    ("bb_lower", "BB lower", {"width": 1, "dash": "dot"}),
+)
+
+
+def encode_column(values, dtype: str) -> dict:
+    arr = np.ascontiguousarray(np.asarray(values).astype(dtype))
+    return {"dtype": dtype, "b64": base64.b64encode(arr.tobytes()).decode("ascii")}
 
+
+def decode_column(col: dict) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(col["b64"]), dtype=np.dtype(col["dtype"]))
+
+
+def build_chart_spec(df: pd.DataFrame, *, title: str = "", frame: pd.DataFrame | None = None) -> dict:
+    """Compact, JSON-safe chart payload: base64 typed columns plus overlay descriptors.
+
+    Stored in artifacts instead of plotly figure JSON; `plotly_figure` renders it at display time.
+    """
+    spec: dict = {"format": CHART_SPEC_FORMAT, "title": title or "Candles", "n": int(len(df)), "columns": {}, "overlays": []}
     if df.empty:
-        fig = go.Figure()
-        if title:
-            fig.update_layout(title=title)
-        return fig.to_plotly_json()
+        return spec
+    for name, dtype in _SPEC_DTYPES.items():
+        spec["columns"][name] = encode_column(df[name].to_numpy(), dtype)
+    if frame is None:
+        frame = indicator_frame(df, bollinger=True)
+    for col, label, line in _OVERLAYS:
+        if col in frame:
+            spec["columns"][col] = encode_column(frame[col].to_numpy(), "<f4")
+            spec["overlays"].append({"column": col, "name": label, "kind": "line", "line": line})
+    return spec
+
+
+def decode_chart_spec(spec: dict) -> dict[str, np.ndarray]:
+    return {name: decode_column(col) for name, col in (spec.get("columns") or {}).items()}
+
+
+def chart_width_px() -> int:
+    try:
+        return max(200, int(os.getenv("AGENT_CHART_WIDTH_PX", "1200")))
+    except ValueError:
+        return 1200
+
+
+def downsample_ohlc(cols: dict[str, np.ndarray], max_bars: int) -> tuple[dict[str, np.ndarray], int]:
+    """Merge every k consecutive candles into one (first open, max high, min low, last close, summed volume).
+
+    Returns the merged columns and k (1 = unchanged).
+    """
+    n = len(cols["ts"])
+    k = -(-n // max(1, max_bars))
+    if k <= 1:
+        return cols, 1
+    starts = np.arange(0, n, k)
+    ends = np.minimum(starts + k, n) - 1
+    out = {
+        "ts": cols["ts"][starts],
+        "open": cols["open"][starts],
+        "high": np.maximum.reduceat(cols["high"], starts),
+        "low": np.minimum.reduceat(cols["low"], starts),
+        "close": cols["close"][ends],
+    }
+    if "volume" in cols:
+        out["volume"] = np.add.reduceat(cols["volume"].astype(float), starts)
+    return out, k
 
-    fig = go.Figure(
-        data=[
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points keeping the line's shape.
+
+    NaN points are dropped first; returns all valid indices if there are few enough.
+    """
+    idx = np.flatnonzero(~np.isnan(y))
+    if threshold < 3 or len(idx) <= threshold:
+        return idx
+    xs, ys = x[idx].astype(float), y[idx].astype(float)
+    n = len(idx)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)  # threshold - 2 inner buckets
+    keep = [0]
+    a = 0
+    for b in range(threshold - 2):
+        lo, hi = edges[b], edges[b + 1]
+        nlo, nhi = edges[b + 1], edges[b + 2] if b + 2 < len(edges) else n
+        avg_x = xs[nlo:nhi].mean() if nhi > nlo else xs[-1]
+        avg_y = ys[nlo:nhi].mean() if nhi > nlo else ys[-1]
+        area = np.abs((xs[a] - avg_x) * (ys[lo:hi] - ys[a]) - (xs[a] - xs[lo:hi]) * (avg_y - ys[a]))
+        a = lo + int(np.argmax(area))
+        keep.append(a)
+    keep.append(n - 1)
+    return idx[np.asarray(keep)]
+
+
+def plotly_figure(spec: dict, *, width_px: int | None = None):
+    """Render a chart spec as a plotly Figure (UI only; plotly is imported here, not by the agent).
+
+    Long histories are downsampled for display only (the spec keeps full resolution):
+    candles are merged to ~width_px / 3 bars, overlay lines reduced with LTTB to ~width_px points.
+    """
+    import plotly.graph_objects as go
+
+    width = width_px or chart_width_px()
+    cols = decode_chart_spec(spec)
+    title = spec.get("title") or "Candles"
+    fig = go.Figure()
+    if cols.get("ts") is not None and len(cols["ts"]):
+        bars, k = downsample_ohlc(cols, width // 3)
+        if k > 1:
+            title = f"{title}（每根合并 {k} 根K线）"
+        fig.add_trace(
             go.Candlestick(
-                x=df["dt"],
-                open=df["open"],
-                high=df["high"],
-                low=df["low"],
-                close=df["close"],
+                x=pd.to_datetime(bars["ts"], unit="ms"),
+                open=bars["open"],
+                high=bars["high"],
+                low=bars["low"],
+                close=bars["close"],
                 name="OHLC",
             )
-        ]
-    )
-
-    # Overlay EMA20/EMA50
-    close = df["close"].astype(float)
-    ema20 = close.ewm(span=20, adjust=False).mean()
-    ema50 = close.ewm(span=50, adjust=False).mean()
-    fig.add_trace(go.Scatter(x=df["dt"], y=ema20, mode="lines", name="EMA20"))
-    fig.add_trace(go.Scatter(x=df["dt"], y=ema50, mode="lines", name="EMA50"))
-
+        )
+        for ov in spec.get("overlays") or []:
+            y = cols.get(ov.get("column"))
+            if y is None:
+                continue
+            keep = lttb(cols["ts"], y, width)
+            fig.add_trace(
+                go.Scatter(
+                    x=pd.to_datetime(cols["ts"][keep], unit="ms"),
+                    y=y[keep],
+                    mode="lines",
+                    name=ov.get("name"),
+                    line=ov.get("line") or None,
+                )
+            )
     fig.update_layout(
-        title=title or "Candles",
+        title=title,
         xaxis_title="Time",
         yaxis_title="Price",
         height=520,
@@ -72,4 +277,4 @@ def build_plotly_candles(df: pd.DataFrame, *, title: str = "") -> dict:
         xaxis_rangeslider_visible=False,
         legend=dict(orientation="h"),
     )
-    return fig.to_plotly_json()
+    return fig
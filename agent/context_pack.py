@@ -0,0 +1,218 @@
+"""Prompt-size budgeting for planner / policy LLM requests.
+
+Everything here is heuristic on purpose: we only need a stable upper bound on
+input size, not an exact tokenizer count.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET_TOKENS = 2400
+
+# Share of the budget each section may use. Unused share flows to the next section.
+POLICY_QUOTAS = {"indicators": 0.15, "memory": 0.25, "news": 0.60}
+PLANNER_QUOTAS = {"user_message": 0.30, "context": 0.70}
+
+_CJK_RE = re.compile(r"[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]")
+_WS_RE = re.compile(r"\s+")
+
+
+def prompt_budget_tokens() -> int:
+    try:
+        return max(256, int(os.getenv("AGENT_LLM_PROMPT_BUDGET", DEFAULT_BUDGET_TOKENS)))
+    except ValueError:
+        return DEFAULT_BUDGET_TOKENS
+
+
+def estimate_tokens(text: str) -> int:
+    """~1 token per CJK char, ~4 chars per token for everything else."""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid]) + 1 <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo] + "…"
+
+
+def round_numbers(obj, *, digits: int = 6):
+    """Round floats to `digits` significant digits (keeps tiny prices readable)."""
+    if isinstance(obj, bool) or obj is None:
+        return obj
+    if isinstance(obj, float):
+        if obj != obj:  # NaN
+            return None
+        return float(f"{obj:.{digits}g}")
+    if isinstance(obj, dict):
+        return {k: round_numbers(v, digits=digits) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [round_numbers(v, digits=digits) for v in obj]
+    return obj
+
+
+def _flatten(obj: dict, prefix: str = "") -> dict:
+    out: dict = {}
+    for k, v in obj.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(_flatten(v, prefix=f"{key}."))
+        else:
+            out[key] = v
+    return out
+
+
+def kv_encode(obj: dict, *, digits: int = 6, skip: set[str] | None = None) -> str:
+    """{"rsi": 31.234, "ema20": None} -> "rsi=31.234" (None / skipped keys dropped)."""
+    parts = []
+    for k, v in _flatten(round_numbers(obj, digits=digits)).items():
+        if v is None or (skip and k in skip):
+            continue
+        if isinstance(v, (list, tuple)):
+            v = ",".join(str(x) for x in v)
+        parts.append(f"{k}={v}")
+    return " ".join(parts)
+
+
+def dedupe_texts(texts: list[str]) -> list[str]:
+    """Drop exact/near-exact duplicates (same URL line or same normalized body)."""
+    seen: set[str] = set()
+    out: list[str] = []
+    for t in texts:
+        if not t:
+            continue
+        norm = _WS_RE.sub(" ", str(t)).strip().lower()
+        keys = {hashlib.sha1(norm.encode("utf-8")).hexdigest()}
+        m = re.search(r"url:\s*(\S+)", norm)
+        if m:
+            keys.add("url:" + m.group(1).rstrip("/"))
+        if keys & seen:
+            continue
+        seen |= keys
+        out.append(str(t))
+    return out
+
+
+def _fit_lines(lines: list[str], max_tokens: int, *, per_item_tokens: int) -> list[str]:
+    out: list[str] = []
+    used = 0
+    for line in lines:
+        line = truncate_to_tokens(line, min(per_item_tokens, max_tokens - used))
+        cost = estimate_tokens(line)
+        if not line or used + cost > max_tokens:
+            break
+        out.append(line)
+        used += cost
+    return out
+
+
+def _log_stats(kind: str, sections: dict[str, int], budget: int) -> None:
+    total = sum(sections.values())
+    logger.info(
+        "prompt %s: ~%d/%d tokens (%s)",
+        kind,
+        total,
+        budget,
+        " ".join(f"{k}={v}" for k, v in sections.items()),
+    )
+
+
+def pack_policy_prompt(
+    *,
+    header: dict,
+    indicators: dict,
+    news: list[str],
+    memory: list[dict],
+    budget_tokens: int | None = None,
+) -> str:
+    """Build the decide_entry user message within `budget_tokens`.
+
+    Indicators and memory hits are sent as compact `k=v` strings; news is deduped
+    and trimmed per item so one long article cannot starve the others.
+    """
+    budget = budget_tokens or prompt_budget_tokens()
+    header_json = json.dumps(round_numbers(header), ensure_ascii=False, separators=(",", ":"))
+    remaining = max(0, budget - estimate_tokens(header_json) - 16)
+
+    ind_quota = int(remaining * POLICY_QUOTAS["indicators"])
+    ind = truncate_to_tokens(kv_encode(indicators or {}), ind_quota)
+    remaining -= estimate_tokens(ind)
+
+    mem_quota = int(remaining * POLICY_QUOTAS["memory"] / (POLICY_QUOTAS["memory"] + POLICY_QUOTAS["news"]))
+    mem_lines = _fit_lines(
+        [kv_encode(m, skip={"pair", "content.pair"}) for m in memory or [] if isinstance(m, dict)],
+        mem_quota,
+        per_item_tokens=max(32, mem_quota // 3 or 1),
+    )
+    remaining -= sum(estimate_tokens(x) for x in mem_lines)
+
+    news_items = dedupe_texts(list(news or []))
+    news_lines = _fit_lines(
+        [_WS_RE.sub(" ", n).strip() for n in news_items],
+        remaining,
+        per_item_tokens=max(64, remaining // max(1, min(len(news_items), 5))),
+    )
+
+    obj = {**header, "indicators": ind, "memory": mem_lines, "news": news_lines}
+    text = json.dumps(round_numbers(obj), ensure_ascii=False, separators=(",", ":"))
+    _log_stats(
+        "policy",
+        {
+            "header": estimate_tokens(header_json),
+            "indicators": estimate_tokens(ind),
+            "memory": sum(estimate_tokens(x) for x in mem_lines),
+            "news": sum(estimate_tokens(x) for x in news_lines),
+        },
+        budget,
+    )
+    return text
+
+
+def _shrink(obj, *, max_list: int, max_str: int):
+    if isinstance(obj, str):
+        return obj if len(obj) <= max_str else obj[:max_str] + "…"
+    if isinstance(obj, dict):
+        return {k: _shrink(v, max_list=max_list, max_str=max_str) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_shrink(v, max_list=max_list, max_str=max_str) for v in list(obj)[:max_list]]
+    return obj
+
+
+def pack_planner_prompt(*, user_message: str, context: dict, budget_tokens: int | None = None) -> str:
+    """Build the plan_turn user message within `budget_tokens`.
+
+    Context is rounded, then long lists/strings are halved until it fits its quota.
+    """
+    budget = budget_tokens or prompt_budget_tokens()
+    msg = truncate_to_tokens(user_message, int(budget * PLANNER_QUOTAS["user_message"]))
+    ctx_quota = budget - estimate_tokens(msg) - 16
+
+    ctx = round_numbers(context or {})
+    max_list, max_str = 50, 2000
+    ctx_json = json.dumps(ctx, ensure_ascii=False, separators=(",", ":"))
+    while estimate_tokens(ctx_json) > ctx_quota and (max_list > 1 or max_str > 32):
+        max_list, max_str = max(1, max_list // 2), max(32, max_str // 2)
+        ctx_json = json.dumps(_shrink(ctx, max_list=max_list, max_str=max_str), ensure_ascii=False, separators=(",", ":"))
+    if estimate_tokens(ctx_json) > ctx_quota:
+        ctx_json = json.dumps({"truncated": True}, separators=(",", ":"))
+
+    text = '{"user_message":' + json.dumps(msg, ensure_ascii=False) + ',"context":' + ctx_json + "}"
+    _log_stats("planner", {"user_message": estimate_tokens(msg), "context": estimate_tokens(ctx_json)}, budget)
+    return text
@@ -0,0 +1,154 @@
+"""Recorded policy decisions, so backtests can replay the LLM gate offline.
+
+Live / dry-run `decide_entry` results are stored per (pair, side, timeframe,
+signal candle) together with a fingerprint of the indicators that were sent.
+Backtests load the table once into a dict and look decisions up in O(1);
+candles with no recording get the AGENT_REPLAY_DEFAULT decision.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from sqlite_utils import Database
+
+from agent.context_pack import round_numbers
+from agent.policy import PolicyDecision
+
+ROOT = Path(__file__).resolve().parents[1]
+DB_PATH = ROOT / "agent" / "decisions.sqlite"
+
+
+def candle_ts(value) -> int | None:
+    """Signal candle open time as epoch seconds (accepts datetime / pandas Timestamp / number)."""
+    if value is None:
+        return None
+    if hasattr(value, "timestamp"):
+        return int(value.timestamp())
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def input_fingerprint(indicators: dict | None) -> str:
+    """Stable hash of the indicators (6 significant digits, so float noise does not matter)."""
+    raw = json.dumps(round_numbers(indicators or {}), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def decision_key(pair: str, side: str, timeframe: str, ts: int) -> str:
+    return f"{pair}|{side}|{timeframe}|{int(ts)}"
+
+
+def record_decision(
+    *,
+    pair: str,
+    side: str,
+    timeframe: str,
+    ts: int,
+    indicators: dict | None,
+    decision: PolicyDecision,
+    db_path: Path | None = None,
+) -> None:
+    db = Database(db_path or DB_PATH)
+    db["decisions"].create(
+        {
+            "key": str,
+            "pair": str,
+            "side": str,
+            "timeframe": str,
+            "candle_ts": int,
+            "fingerprint": str,
+            "allow": int,
+            "reason": str,
+            "confidence": float,
+            "max_position_ratio": float,
+            "recorded_ts": float,
+        },
+        pk="key",
+        if_not_exists=True,
+    )
+    db["decisions"].upsert(
+        {
+            "key": decision_key(pair, side, timeframe, ts),
+            "pair": pair,
+            "side": side,
+            "timeframe": timeframe,
+            "candle_ts": int(ts),
+            "fingerprint": input_fingerprint(indicators),
+            "allow": int(bool(decision.allow)),
+            "reason": str(decision.reason or "")[:400],
+            "confidence": decision.confidence,
+            "max_position_ratio": decision.max_position_ratio,
+            "recorded_ts": time.time(),
+        },
+        pk="key",
+        alter=True,
+    )
+
+
+def replay_default() -> PolicyDecision:
+    allow = os.getenv("AGENT_REPLAY_DEFAULT", "allow").strip().lower() not in ("deny", "0", "false")
+    return PolicyDecision(allow=allow, reason="replay miss")
+
+
+class DecisionReplay:
+    """All recorded decisions of one timeframe, indexed by (pair, side, candle_ts).
+
+    With `strict`, a recording whose indicator fingerprint differs from the
+    backtest's indicators counts as a miss (the strategy's features changed).
+    """
+
+    def __init__(self, timeframe: str, *, strict: bool = False, db_path: Path | None = None):
+        self.timeframe = timeframe
+        self.strict = strict
+        self.hits = 0
+        self.misses = 0
+        self._rows: dict[tuple[str, str, int], tuple[str, PolicyDecision]] = {}
+        db = Database(db_path or DB_PATH)
+        if "decisions" not in db.table_names():
+            return
+        for r in db.query(
+            "select pair, side, candle_ts, fingerprint, allow, reason, confidence, max_position_ratio "
+            "from decisions where timeframe = ?",
+            [timeframe],
+        ):
+            self._rows[(r["pair"], r["side"], int(r["candle_ts"]))] = (
+                r["fingerprint"],
+                PolicyDecision(
+                    allow=bool(r["allow"]),
+                    reason=r["reason"] or "",
+                    confidence=r["confidence"],
+                    max_position_ratio=r["max_position_ratio"],
+                ),
+            )
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def lookup(self, *, pair: str, side: str, ts: int | None, indicators: dict | None = None) -> PolicyDecision:
+        hit = self._rows.get((pair, side, int(ts))) if ts is not None else None
+        if hit is not None and (not self.strict or hit[0] == input_fingerprint(indicators)):
+            self.hits += 1
+            return hit[1]
+        self.misses += 1
+        return replay_default()
+
+
+_REPLAYS: dict[tuple[str, bool], DecisionReplay] = {}
+_REPLAYS_LOCK = threading.Lock()
+
+
+def get_replay(timeframe: str) -> DecisionReplay:
+    """Process-wide replay table (loaded on first use; AGENT_REPLAY_STRICT=1 for fingerprint checks)."""
+    strict = os.getenv("AGENT_REPLAY_STRICT", "0") in ("1", "true", "TRUE")
+    with _REPLAYS_LOCK:
+        replay = _REPLAYS.get((timeframe, strict))
+        if replay is None:
+            replay = _REPLAYS[(timeframe, strict)] = DecisionReplay(timeframe, strict=strict)
+        return replay
@@ -0,0 +1,32 @@
+"""Offline text embeddings: hashed character n-grams, no model download.
+
+Good enough for near-duplicate detection on short (mixed CJK/latin) prompts.
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+
+DIM = 256
+
+_WS_RE = re.compile(r"\s+")
+
+
+def embed_text(text: str, *, dim: int = DIM, ngrams: tuple[int, ...] = (1, 2, 3)) -> list[float]:
+    """L2-normalized signed feature-hashing vector over character n-grams."""
+    t = _WS_RE.sub(" ", (text or "").lower()).strip()
+    vec = [0.0] * dim
+    for n in ngrams:
+        for i in range(len(t) - n + 1):
+            h = int.from_bytes(hashlib.blake2b(t[i : i + n].encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % dim] += 1.0 if (h >> 63) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec))
+    if norm == 0:
+        return vec
+    return [v / norm for v in vec]
+
+
+def cosine(a: list[float], b: list[float]) -> float:
+    """Cosine similarity of two embed_text vectors (already normalized)."""
+    return sum(x * y for x, y in zip(a, b))
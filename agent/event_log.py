@@ -148,3 +148,72 @@ def load_artifact(artifact_id: str) -> dict | None:
         }
     except Exception:
         return None
+
+
+def append_llm_call(row: dict) -> None:
+    """Store one LLM call telemetry row (see agent.llm.call_llm_json)."""
+    db = Database(DB_PATH)
+    db["llm_calls"].create(
+        {
+            "id": int,
+            "ts": float,
+            "caller": str,
+            "pair": str,
+            "provider": str,
+            "model": str,
+            "streamed": int,
+            "latency_ms": float,
+            "input_tokens": int,
+            "output_tokens": int,
+            "parse_failed": int,
+            "fallback": int,
+            "error": str,
+        },
+        pk="id",
+        if_not_exists=True,
+    )
+    db["llm_calls"].insert({"id": None, "ts": time.time(), **row}, alter=True)
+
+
+def load_llm_calls(*, since_ts: float | None = None, limit: int = 5000) -> list[dict]:
+    db = Database(DB_PATH)
+    if "llm_calls" not in db.table_names():
+        return []
+    rows = db.query(
+        "select * from llm_calls where ts >= ? order by ts desc limit ?",
+        [float(since_ts or 0.0), limit],
+    )
+    return [dict(r) for r in rows]
+
+
+def append_profile_rows(rows: list[dict]) -> None:
+    """Store flushed stage-timing histograms (see agent.profiler)."""
+    if not rows:
+        return
+    db = Database(DB_PATH)
+    db["profile_hist"].create(
+        {
+            "id": int,
+            "ts": float,
+            "stage": str,
+            "pair": str,
+            "n": int,
+            "total_ms": float,
+            "max_ms": float,
+            "buckets_json": str,
+        },
+        pk="id",
+        if_not_exists=True,
+    )
+    db["profile_hist"].insert_all(({"id": None, **r} for r in rows), alter=True)
+
+
+def load_profile_rows(*, since_ts: float | None = None, limit: int = 50000) -> list[dict]:
+    db = Database(DB_PATH)
+    if "profile_hist" not in db.table_names():
+        return []
+    rows = db.query(
+        "select * from profile_hist where ts >= ? order by ts desc limit ?",
+        [float(since_ts or 0.0), limit],
+    )
+    return [dict(r) for r in rows]
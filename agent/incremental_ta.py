@@ -0,0 +1,371 @@
+"""Incremental (O(1) per appended candle) indicators for live strategy analysis.
+
+Semantics follow what HybridOkxAgent computes on the full frame:
+- EMA: TA-Lib `EMA` (seeded with the SMA of the first `period` values)
+- RSI: TA-Lib `RSI` (Wilder smoothing, first value at index `period`)
+- Bollinger: qtpylib `bollinger_bands` on typical price (min_periods=1, sample std)
+- Donchian: pandas `rolling(window).max()/min()` of high/low
+
+The `*_full` functions are vectorized reference implementations of the same
+semantics; IncrementalIndicators uses them to verify itself periodically.
+"""
+from __future__ import annotations
+
+import logging
+import math
+from collections import deque
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+NAN = float("nan")
+
+
+class EmaState:
+    __slots__ = ("period", "k", "value", "_n", "_seed_sum")
+
+    def __init__(self, period: int):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.value = NAN
+        self._n = 0
+        self._seed_sum = 0.0
+
+    def update(self, x: float) -> float:
+        if self._n < self.period:
+            self._n += 1
+            self._seed_sum += x
+            if self._n == self.period:
+                self.value = self._seed_sum / self.period
+            return self.value
+        self.value += self.k * (x - self.value)
+        return self.value
+
+
+class WilderRsiState:
+    __slots__ = ("period", "value", "_prev", "_n", "_gain", "_loss")
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.value = NAN
+        self._prev = NAN
+        self._n = 0
+        self._gain = 0.0
+        self._loss = 0.0
+
+    def update(self, close: float) -> float:
+        prev, self._prev = self._prev, close
+        if math.isnan(prev):
+            return self.value
+        diff = close - prev
+        gain, loss = (diff, 0.0) if diff > 0 else (0.0, -diff)
+        p = self.period
+        if self._n < p:
+            self._n += 1
+            self._gain += gain
+            self._loss += loss
+            if self._n < p:
+                return self.value
+            self._gain /= p
+            self._loss /= p
+        else:
+            self._gain = (self._gain * (p - 1) + gain) / p
+            self._loss = (self._loss * (p - 1) + loss) / p
+        total = self._gain + self._loss
+        self.value = 100.0 * self._gain / total if total != 0 else 0.0
+        return self.value
+
+
+class BollingerState:
+    """Running sum / sum of squares over a ring buffer; resynced every `window` updates."""
+
+    __slots__ = ("window", "stds", "_buf", "_sum", "_sumsq", "_since_resync")
+
+    def __init__(self, window: int = 20, stds: float = 2.0):
+        self.window = window
+        self.stds = stds
+        self._buf: deque = deque(maxlen=window)
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._since_resync = 0
+
+    def update(self, x: float) -> tuple[float, float, float]:
+        if len(self._buf) == self.window:
+            old = self._buf[0]
+            self._sum -= old
+            self._sumsq -= old * old
+        self._buf.append(x)
+        self._sum += x
+        self._sumsq += x * x
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            # Bound float drift of the running sums.
+            self._sum = math.fsum(self._buf)
+            self._sumsq = math.fsum(v * v for v in self._buf)
+            self._since_resync = 0
+
+        n = len(self._buf)
+        mid = self._sum / n
+        if n < 2:
+            return NAN, mid, NAN
+        var = max(0.0, (self._sumsq - n * mid * mid) / (n - 1))
+        sd = math.sqrt(var) * self.stds
+        return mid - sd, mid, mid + sd
+
+
+class DonchianState:
+    """Rolling max(high)/min(low) via monotonic deques (amortized O(1))."""
+
+    __slots__ = ("window", "_i", "_max", "_min")
+
+    def __init__(self, window: int = 20):
+        self.window = window
+        self._i = -1
+        self._max: deque = deque()
+        self._min: deque = deque()
+
+    def update(self, high: float, low: float) -> tuple[float, float]:
+        self._i += 1
+        i, w = self._i, self.window
+        while self._max and self._max[-1][1] <= high:
+            self._max.pop()
+        self._max.append((i, high))
+        while self._min and self._min[-1][1] >= low:
+            self._min.pop()
+        self._min.append((i, low))
+        while self._max[0][0] <= i - w:
+            self._max.popleft()
+        while self._min[0][0] <= i - w:
+            self._min.popleft()
+        if i + 1 < w:
+            return NAN, NAN
+        return self._max[0][1], self._min[0][1]
+
+
+# --- Vectorized references (full recompute) ---
+
+
+def ema_full(x: np.ndarray, period: int) -> np.ndarray:
+    out = np.full(len(x), np.nan)
+    if len(x) < period:
+        return out
+    k = 2.0 / (period + 1)
+    v = float(np.mean(x[:period]))
+    out[period - 1] = v
+    for i in range(period, len(x)):
+        v += k * (x[i] - v)
+        out[i] = v
+    return out
+
+
+def rsi_full(close: np.ndarray, period: int = 14) -> np.ndarray:
+    out = np.full(len(close), np.nan)
+    if len(close) <= period:
+        return out
+    diff = np.diff(close)
+    gains = np.clip(diff, 0, None)
+    losses = np.clip(-diff, 0, None)
+    g = float(np.mean(gains[:period]))
+    lo = float(np.mean(losses[:period]))
+    for i in range(period, len(close)):
+        if i > period:
+            g = (g * (period - 1) + gains[i - 1]) / period
+            lo = (lo * (period - 1) + losses[i - 1]) / period
+        out[i] = 100.0 * g / (g + lo) if (g + lo) != 0 else 0.0
+    return out
+
+
+def bollinger_full(x: np.ndarray, window: int = 20, stds: float = 2.0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    import pandas as pd
+
+    s = pd.Series(x)
+    mid = s.rolling(window, min_periods=1).mean().to_numpy()
+    sd = s.rolling(window, min_periods=1).std().to_numpy() * stds
+    return mid - sd, mid, mid + sd
+
+
+def donchian_full(high: np.ndarray, low: np.ndarray, window: int = 20) -> tuple[np.ndarray, np.ndarray]:
+    import pandas as pd
+
+    return (
+        pd.Series(high).rolling(window).max().to_numpy(),
+        pd.Series(low).rolling(window).min().to_numpy(),
+    )
+
+
+class _Columns:
+    """Append-only float64 column buffers, compacted to `max_rows` when full."""
+
+    def __init__(self, names: list[str], max_rows: int):
+        self.names = names
+        self.max_rows = max_rows
+        self._cap = 1024
+        self._n = 0
+        self.ts = np.empty(self._cap, dtype=np.int64)
+        self.data = {n: np.empty(self._cap) for n in names}
+
+    def __len__(self) -> int:
+        return self._n
+
+    def append(self, ts: int, values: dict) -> None:
+        if self._n == self._cap:
+            keep = min(self._n, self.max_rows)
+            if keep == self._n:
+                self._cap *= 2
+            drop = self._n - keep
+            self.ts = np.concatenate([self.ts[drop : self._n], np.empty(self._cap - keep, dtype=np.int64)])
+            for n in self.names:
+                self.data[n] = np.concatenate([self.data[n][drop : self._n], np.empty(self._cap - keep)])
+            self._n = keep
+        self.ts[self._n] = ts
+        for n in self.names:
+            self.data[n][self._n] = values[n]
+        self._n += 1
+
+    def tail(self, n: int) -> dict[str, np.ndarray]:
+        return {name: self.data[name][self._n - n : self._n] for name in self.names}
+
+
+class PairIndicatorState:
+    def __init__(self, *, ema_periods, rsi_period, bb_window, bb_stds, donchian_window, max_rows):
+        self.emas = {p: EmaState(p) for p in ema_periods}
+        self.rsi = WilderRsiState(rsi_period)
+        self.bb = BollingerState(bb_window, bb_stds)
+        self.donchian = DonchianState(donchian_window)
+        self.dc_window = donchian_window
+        names = [f"ema{p}" for p in ema_periods] + [
+            "rsi", "bb_lowerband", "bb_middleband", "bb_upperband", f"hh{donchian_window}", f"ll{donchian_window}",
+        ]
+        self.cols = _Columns(names, max_rows)
+        # Raw inputs since the seed, so verify() can recompute from the same origin.
+        self.inputs = _Columns(["high", "low", "close"], max_rows)
+        self.updates_since_verify = 0
+
+    @property
+    def last_ts(self) -> int | None:
+        return int(self.cols.ts[len(self.cols) - 1]) if len(self.cols) else None
+
+    def update(self, ts: int, high: float, low: float, close: float) -> None:
+        values = {f"ema{p}": st.update(close) for p, st in self.emas.items()}
+        values["rsi"] = self.rsi.update(close)
+        lower, mid, upper = self.bb.update((high + low + close) / 3.0)
+        values.update(bb_lowerband=lower, bb_middleband=mid, bb_upperband=upper)
+        hh, ll = self.donchian.update(high, low)
+        values[f"hh{self.dc_window}"] = hh
+        values[f"ll{self.dc_window}"] = ll
+        self.cols.append(ts, values)
+        self.inputs.append(ts, {"high": high, "low": low, "close": close})
+
+
+class IncrementalIndicators:
+    """Per-pair incremental indicator state for freqtrade analyzed frames.
+
+    `apply(pair, dataframe)` returns column arrays aligned to `dataframe`. If the frame
+    is the cached history plus a few new candles, only those candles are processed;
+    anything else (first call, gap, restart, history window moved) reseeds from the frame.
+    With `verify_every > 0` the state is compared against a full recompute every N
+    incremental updates and reseeded on mismatch.
+
+    EMA / RSI are seeded once and then run over everything appended since, so on a
+    sliding window they are not equal to a recompute on the window alone: that one is
+    seeded at the window's first candle, a difference that decays as (1 - k) ** len.
+    """
+
+    def __init__(
+        self,
+        *,
+        ema_periods: tuple[int, ...] = (20, 50),
+        rsi_period: int = 14,
+        bb_window: int = 20,
+        bb_stds: float = 2.0,
+        donchian_window: int = 20,
+        max_rows: int = 5000,
+        verify_every: int = 0,
+        rtol: float = 1e-6,
+    ):
+        self.params = dict(
+            ema_periods=tuple(ema_periods),
+            rsi_period=rsi_period,
+            bb_window=bb_window,
+            bb_stds=bb_stds,
+            donchian_window=donchian_window,
+        )
+        self.max_rows = max_rows
+        self.verify_every = verify_every
+        self.rtol = rtol
+        self._states: dict[str, PairIndicatorState] = {}
+
+    def _seed(self, pair: str, ts: np.ndarray, high, low, close) -> PairIndicatorState:
+        st = PairIndicatorState(**self.params, max_rows=max(self.max_rows, len(ts)))
+        for i in range(len(ts)):
+            st.update(int(ts[i]), float(high[i]), float(low[i]), float(close[i]))
+        self._states[pair] = st
+        return st
+
+    def apply(self, pair: str, dataframe) -> dict[str, np.ndarray]:
+        n = len(dataframe)
+        ts = dataframe["date"].values.astype("datetime64[ns]").astype(np.int64)
+        high = dataframe["high"].to_numpy(dtype=float)
+        low = dataframe["low"].to_numpy(dtype=float)
+        close = dataframe["close"].to_numpy(dtype=float)
+
+        st = self._states.get(pair)
+        new_rows = None
+        if st is not None and n and st.last_ts is not None:
+            pos = np.searchsorted(ts, st.last_ts)
+            if pos < n and ts[pos] == st.last_ts:
+                new_rows = n - pos - 1
+                overlap = n - new_rows
+                # The cached tail must line up with the frame's head.
+                if overlap > len(st.cols) or st.cols.ts[len(st.cols) - overlap] != ts[0]:
+                    new_rows = None
+
+        if new_rows is None:
+            st = self._seed(pair, ts, high, low, close)
+        else:
+            for i in range(n - new_rows, n):
+                st.update(int(ts[i]), float(high[i]), float(low[i]), float(close[i]))
+            st.updates_since_verify += new_rows
+            if self.verify_every and st.updates_since_verify >= self.verify_every:
+                st.updates_since_verify = 0
+                if not self.verify(pair):
+                    logger.warning("incremental indicators drifted for %s; reseeding", pair)
+                    st = self._seed(pair, ts, high, low, close)
+        return st.cols.tail(n)
+
+    def verify(self, pair: str) -> bool:
+        """Compare the last cached row against a full recompute of the pair's own inputs.
+
+        The recompute starts where the incremental state was seeded, so EMA / RSI
+        share their seed and must agree to float precision. Once the buffers were
+        compacted (more than `max_rows` candles) the origin is gone, but the seed
+        difference has then decayed far below `rtol`.
+        """
+        st = self._states.get(pair)
+        if st is None or not len(st.inputs):
+            return False
+        inputs = st.inputs.tail(len(st.inputs))
+        high, low, close = inputs["high"], inputs["low"], inputs["close"]
+        got = {k: v[-1] for k, v in st.cols.tail(1).items()}
+        p = self.params
+        want = {f"ema{n}": ema_full(close, n)[-1] for n in p["ema_periods"]}
+        want["rsi"] = rsi_full(close, p["rsi_period"])[-1]
+        lo_, mid, up = bollinger_full((high + low + close) / 3.0, p["bb_window"], p["bb_stds"])
+        want.update(bb_lowerband=lo_[-1], bb_middleband=mid[-1], bb_upperband=up[-1])
+        hh, ll = donchian_full(high, low, p["donchian_window"])
+        want[f"hh{p['donchian_window']}"] = hh[-1]
+        want[f"ll{p['donchian_window']}"] = ll[-1]
+        for k, w in want.items():
+            g = got[k]
+            if math.isnan(w) and math.isnan(g):
+                continue
+            if not math.isclose(g, w, rel_tol=self.rtol, abs_tol=1e-9):
+                return False
+        return True
+
+    def reset(self, pair: str | None = None) -> None:
+        if pair is None:
+            self._states.clear()
+        else:
+            self._states.pop(pair, None)
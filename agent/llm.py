@@ -1,97 +1,205 @@
 import json
 import os
+import threading
+import time
 from dataclasses import dataclass
 from pathlib import Path
 
+from agent.llm_backends import AnthropicBackend, LLMBackend, MockBackend, OpenAICompatBackend
+
+ROOT = Path(__file__).resolve().parents[1]
+PARAMS_PATH = ROOT / "app" / "params.json"
+
 
 @dataclass
 class LLMConfig:
-    provider: str
+    provider: str  # anthropic|openai|mock
     model: str
     api_key_env: str
     api_url: str
 
 
-def load_llm_config() -> LLMConfig:
-    # First, try UI config in app/params.json
-    params_path = Path(__file__).resolve().parents[2] / "app" / "params.json"
+def _load_agent_params() -> dict:
     try:
-        with open(params_path, encoding="utf-8") as f:
-            params = json.load(f)
-            agent = params.get("agent", {})
-            api_url = agent.get("llm_api_url", os.getenv("AGENT_LLM_API_URL", "https://api.anthropic.com"))
+        with open(PARAMS_PATH, encoding="utf-8") as f:
+            return json.load(f).get("agent", {}) or {}
     except Exception:
-        # Fallback to environment variables
-        api_url = os.getenv("AGENT_LLM_API_URL", "https://api.anthropic.com")
+        return {}
+
+
+def _default_provider(api_url: str) -> str:
+    # An explicit non-Anthropic URL (e.g. Volcengine Ark) is OpenAI-compatible.
+    return "anthropic" if "anthropic.com" in api_url else "openai"
+
 
-    # Remaining config is still env-driven
-    provider = os.getenv("AGENT_LLM_PROVIDER", "anthropic")
-    model = os.getenv("AGENT_LLM_MODEL", "claude-3-5-sonnet-latest")
+def _setting(env: str, key: str, default: str | None = None) -> str | None:
+    """Environment variable first, then the UI config in app/params.json, then the default."""
+    return os.getenv(env) or _load_agent_params().get(key) or default
+
+
+def load_llm_config() -> LLMConfig:
+    api_url = _setting("AGENT_LLM_API_URL", "llm_api_url", "https://api.anthropic.com")
+    provider = _setting("AGENT_LLM_PROVIDER", "llm_provider", "auto")
+    if provider == "auto":
+        provider = _default_provider(api_url)
+    model = _setting("AGENT_LLM_MODEL", "llm_model", "claude-3-5-sonnet-latest")
     api_key_env = os.getenv("AGENT_LLM_API_KEY_ENV", "ANTHROPIC_API_KEY")
     return LLMConfig(provider=provider, model=model, api_key_env=api_key_env, api_url=api_url)
 
 
 def _get_api_key(cfg: LLMConfig) -> str | None:
-    # First try params.json for key
-    params_path = Path(__file__).resolve().parents[2] / "app" / "params.json"
-    try:
-        with open(params_path, encoding="utf-8") as f:
-            params = json.load(f)
-            agent = params.get("agent", {})
-            if "llm_api_key" in agent:
-                return agent.get("llm_api_key")
-    except Exception:
-        pass
-    # Fallback to environment
-    return os.getenv(cfg.api_key_env)
+    return _setting(cfg.api_key_env, "llm_api_key")
 
 
 def llm_enabled() -> bool:
     return os.getenv("AGENT_LLM_ENABLED", "0") in ("1", "true", "TRUE")
 
 
-def _get_api_key(cfg: LLMConfig) -> str | None:
-    return os.getenv(cfg.api_key_env)
+_BACKENDS: dict[tuple, LLMBackend] = {}
+_BACKENDS_LOCK = threading.Lock()
 
 
-def call_llm_json(system: str, user: str) -> dict | None:
-    """Best-effort JSON call. Returns dict or None if disabled/unconfigured."""
-    cfg = load_llm_config()
-    if not llm_enabled():
-        return None
+def get_backend(cfg: LLMConfig, api_key: str | None) -> LLMBackend | None:
+    """Return a cached backend for cfg, or None if the provider is unknown/unconfigured."""
+    key = (cfg.provider, cfg.api_url, cfg.model, api_key)
+    with _BACKENDS_LOCK:
+        if key in _BACKENDS:
+            return _BACKENDS[key]
+        if cfg.provider == "mock":
+            backend = MockBackend(
+                latency_s=float(os.getenv("AGENT_LLM_MOCK_LATENCY_MS", "0")) / 1000.0,
+                error_rate=float(os.getenv("AGENT_LLM_MOCK_ERROR_RATE", "0")),
+                seed=int(os.getenv("AGENT_LLM_MOCK_SEED", "0")),
+            )
+        elif not api_key:
+            return None
+        elif cfg.provider == "anthropic":
+            backend = AnthropicBackend(api_url=cfg.api_url, api_key=api_key, model=cfg.model)
+        elif cfg.provider == "openai":
+            backend = OpenAICompatBackend(api_url=cfg.api_url, api_key=api_key, model=cfg.model)
+        else:
+            return None
+        _BACKENDS[key] = backend
+        return backend
 
-    api_key = _get_api_key(cfg)
-    if not api_key:
-        return None
 
-    if cfg.provider != "anthropic":
-        # Only anthropic supported in this project for now.
+class IncrementalJsonParser:
+    """Incremental parser for one streamed JSON object.
+
+    Text before the first "{" (e.g. a code fence) is ignored. Callbacks:
+    - on_field(key, value, done): top-level string fields, re-emitted as they grow.
+    - on_item(key, obj): each complete object inside a top-level array.
+    """
+
+    def __init__(self, *, on_field=None, on_item=None):
+        self.on_field = on_field
+        self.on_item = on_item
+        self.text = ""
+        self._pos = 0
+        self._started = False
+        self._done = False
+        # Frames: [kind("obj"|"arr"), key, expect_key, pending_key, start_index]
+        self._stack: list[list] = []
+        self._in_str = False
+        self._esc = False
+        self._str_start = 0
+        self._last_partial: str | None = None
+
+    def feed(self, chunk: str) -> None:
+        self.text += chunk
+        t = self.text
+        i = self._pos
+        n = len(t)
+        while i < n and not self._done:
+            c = t[i]
+            if not self._started:
+                if c == "{":
+                    self._started = True
+                    self._stack.append(["obj", None, True, None, i])
+                i += 1
+                continue
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif c == "\\":
+                    self._esc = True
+                elif c == '"':
+                    self._in_str = False
+                    self._end_string(t[self._str_start : i])
+                i += 1
+                continue
+
+            top = self._stack[-1]
+            if c == '"':
+                self._in_str = True
+                self._str_start = i + 1
+            elif c in "{[":
+                key = top[3] if top[0] == "obj" else top[1]
+                self._stack.append(["obj" if c == "{" else "arr", key, True, None, i])
+            elif c in "}]":
+                frame = self._stack.pop()
+                if not self._stack:
+                    self._done = True
+                elif frame[0] == "obj" and len(self._stack) == 2 and self._stack[-1][0] == "arr" and self.on_item:
+                    try:
+                        obj = json.loads(t[frame[4] : i + 1])
+                    except Exception:
+                        obj = None
+                    if obj is not None:
+                        self.on_item(frame[1], obj)
+            elif c == "," and top[0] == "obj":
+                top[2] = True
+            elif c == ":" and top[0] == "obj":
+                top[2] = False
+            i += 1
+        self._pos = i
+
+        if self._in_str and self._is_top_level_value():
+            partial = self._decode_partial(t[self._str_start : n])
+            if partial is not None and partial != self._last_partial:
+                self._last_partial = partial
+                if self.on_field:
+                    self.on_field(self._stack[-1][3], partial, False)
+
+    def _is_top_level_value(self) -> bool:
+        return len(self._stack) == 1 and not self._stack[0][2]
+
+    def _end_string(self, raw: str) -> None:
+        top = self._stack[-1]
+        try:
+            value = json.loads('"' + raw + '"')
+        except Exception:
+            value = raw
+        if top[0] == "obj" and top[2]:
+            top[3] = value
+            return
+        if len(self._stack) == 1 and self.on_field:
+            self.on_field(top[3], value, True)
+        self._last_partial = None
+
+    @staticmethod
+    def _decode_partial(raw: str) -> str | None:
+        # Drop a trailing incomplete escape sequence (lone backslash, partial \uXXXX) before decoding.
+        for cut in range(0, 7):
+            if cut > len(raw):
+                break
+            try:
+                return json.loads('"' + raw[: len(raw) - cut] + '"')
+            except Exception:
+                continue
         return None
 
-    from anthropic import Anthropic
 
-    # Initialize client with potential custom URL
-    if hasattr(Anthropic, "__init__") and hasattr(Anthropic.__init__, "parameters"):
-        # Newer Anthropic SDK allows base_url parameter
-        if "base_url" in Anthropic.__init__.__parameters__:
-            client = Anthropic(api_key=api_key, base_url=cfg.api_url)
-        else:
-            client = Anthropic(api_key=api_key)
-    else:
-        # Fallback for older SDKs
-        client = Anthropic(api_key=api_key)
-
-    msg = client.messages.create(
-        model=cfg.model,
-        max_tokens=800,
-        system=system,
-        messages=[{"role": "user", "content": user}],
-    )
-    text = "".join([b.text for b in msg.content if getattr(b, "type", None) == "text"])
+def _record_call(cfg: LLMConfig, **row) -> None:
+    try:
+        from agent.event_log import append_llm_call
+
+        append_llm_call({"provider": cfg.provider, "model": cfg.model, **row})
+    except Exception:
+        pass
 
-    # Try parse JSON object from response
-    import json
 
+def _parse_json_text(text: str) -> dict | None:
     try:
         return json.loads(text)
     except Exception:
@@ -104,3 +212,71 @@ def call_llm_json(system: str, user: str) -> dict | None:
             except Exception:
                 return None
         return None
+
+
+def call_llm_json(
+    system: str,
+    user: str,
+    *,
+    caller: str = "unknown",
+    pair: str | None = None,
+    on_field=None,
+    on_item=None,
+) -> dict | None:
+    """Best-effort JSON call. Returns dict or None if disabled/unconfigured.
+
+    If on_field/on_item are given the response is streamed through an
+    IncrementalJsonParser so callers can react before the completion ends.
+    Every call that reaches a backend is recorded (latency, tokens, parse
+    failure) in the event store, tagged with caller ("planner"/"policy") and pair.
+    """
+    cfg = load_llm_config()
+    if not llm_enabled():
+        return None
+
+    backend = get_backend(cfg, _get_api_key(cfg))
+    if backend is None:
+        return None
+
+    streamed = on_field is not None or on_item is not None
+    usage: dict = {}
+    started = time.perf_counter()
+    try:
+        if not streamed:
+            resp = backend.complete(system=system, user=user, max_tokens=800)
+            usage.update(input_tokens=resp.input_tokens, output_tokens=resp.output_tokens)
+            text = resp.text
+        else:
+            parser = IncrementalJsonParser(on_field=on_field, on_item=on_item)
+            for chunk in backend.stream(system=system, user=user, max_tokens=800, usage=usage):
+                parser.feed(chunk)
+            text = parser.text
+    except Exception as e:
+        _record_call(
+            cfg,
+            caller=caller,
+            pair=pair or "",
+            streamed=int(streamed),
+            latency_ms=(time.perf_counter() - started) * 1000.0,
+            input_tokens=usage.get("input_tokens"),
+            output_tokens=usage.get("output_tokens"),
+            parse_failed=0,
+            fallback=1,
+            error=f"{type(e).__name__}: {e}"[:300],
+        )
+        raise
+
+    out = _parse_json_text(text)
+    _record_call(
+        cfg,
+        caller=caller,
+        pair=pair or "",
+        streamed=int(streamed),
+        latency_ms=(time.perf_counter() - started) * 1000.0,
+        input_tokens=usage.get("input_tokens"),
+        output_tokens=usage.get("output_tokens"),
+        parse_failed=int(out is None),
+        fallback=int(out is None),
+        error="",
+    )
+    return out
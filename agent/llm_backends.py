@@ -0,0 +1,309 @@
+"""LLM HTTP backends (Anthropic / OpenAI-compatible / mock) on one pooled client."""
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterator
+
+import httpx
+
+_CLIENT: httpx.Client | None = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def shared_http_client() -> httpx.Client:
+    """One keep-alive connection pool for every backend (httpx.Client is thread-safe)."""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = httpx.Client(
+                timeout=httpx.Timeout(60.0, connect=10.0),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        return _CLIENT
+
+
+@dataclass
+class LLMResponse:
+    text: str
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+
+
+class LLMBackend:
+    name = "base"
+
+    def complete(self, *, system: str, user: str, max_tokens: int) -> LLMResponse:
+        raise NotImplementedError
+
+    def stream(self, *, system: str, user: str, max_tokens: int, usage: dict | None = None) -> Iterator[str]:
+        """Yield text deltas. Token counts (if reported) are written into `usage`."""
+        resp = self.complete(system=system, user=user, max_tokens=max_tokens)
+        if usage is not None:
+            usage.update(input_tokens=resp.input_tokens, output_tokens=resp.output_tokens)
+        yield resp.text
+
+
+def _sse_data(lines: Iterator[str]) -> Iterator[str]:
+    for line in lines:
+        if line.startswith("data:"):
+            yield line[5:].strip()
+
+
+class AnthropicBackend(LLMBackend):
+    name = "anthropic"
+
+    def __init__(self, *, api_url: str, api_key: str, model: str):
+        base = (api_url or "https://api.anthropic.com").rstrip("/")
+        self.url = base + ("/messages" if base.endswith("/v1") else "/v1/messages")
+        self.model = model
+        self.headers = {
+            "x-api-key": api_key,
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json",
+        }
+
+    def _body(self, system: str, user: str, max_tokens: int) -> dict:
+        return {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "system": system,
+            "messages": [{"role": "user", "content": user}],
+        }
+
+    def complete(self, *, system: str, user: str, max_tokens: int) -> LLMResponse:
+        r = shared_http_client().post(self.url, headers=self.headers, json=self._body(system, user, max_tokens))
+        r.raise_for_status()
+        data = r.json()
+        text = "".join(b.get("text", "") for b in data.get("content") or [] if b.get("type") == "text")
+        u = data.get("usage") or {}
+        return LLMResponse(text=text, input_tokens=u.get("input_tokens"), output_tokens=u.get("output_tokens"))
+
+    def stream(self, *, system: str, user: str, max_tokens: int, usage: dict | None = None) -> Iterator[str]:
+        body = {**self._body(system, user, max_tokens), "stream": True}
+        with shared_http_client().stream("POST", self.url, headers=self.headers, json=body) as r:
+            r.raise_for_status()
+            for data in _sse_data(r.iter_lines()):
+                try:
+                    ev = json.loads(data)
+                except Exception:
+                    continue
+                t = ev.get("type")
+                if t == "content_block_delta":
+                    text = (ev.get("delta") or {}).get("text")
+                    if text:
+                        yield text
+                elif usage is not None and t == "message_start":
+                    u = (ev.get("message") or {}).get("usage") or {}
+                    usage["input_tokens"] = u.get("input_tokens")
+                elif usage is not None and t == "message_delta":
+                    usage["output_tokens"] = (ev.get("usage") or {}).get("output_tokens")
+
+
+class OpenAICompatBackend(LLMBackend):
+    """Any /chat/completions endpoint (OpenAI, Volcengine Ark, vLLM, ...)."""
+
+    name = "openai"
+
+    def __init__(self, *, api_url: str, api_key: str, model: str):
+        base = api_url.rstrip("/")
+        self.url = base if base.endswith("/chat/completions") else base + "/chat/completions"
+        self.model = model
+        self.headers = {"Authorization": f"Bearer {api_key}", "content-type": "application/json"}
+
+    def _body(self, system: str, user: str, max_tokens: int) -> dict:
+        return {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "messages": [{"role": "system", "content": system}, {"role": "user", "content": user}],
+        }
+
+    def complete(self, *, system: str, user: str, max_tokens: int) -> LLMResponse:
+        r = shared_http_client().post(self.url, headers=self.headers, json=self._body(system, user, max_tokens))
+        r.raise_for_status()
+        data = r.json()
+        choices = data.get("choices") or [{}]
+        text = str(((choices[0] or {}).get("message") or {}).get("content") or "")
+        u = data.get("usage") or {}
+        return LLMResponse(text=text, input_tokens=u.get("prompt_tokens"), output_tokens=u.get("completion_tokens"))
+
+    def stream(self, *, system: str, user: str, max_tokens: int, usage: dict | None = None) -> Iterator[str]:
+        body = {**self._body(system, user, max_tokens), "stream": True, "stream_options": {"include_usage": True}}
+        with shared_http_client().stream("POST", self.url, headers=self.headers, json=body) as r:
+            r.raise_for_status()
+            for data in _sse_data(r.iter_lines()):
+                if data == "[DONE]":
+                    break
+                try:
+                    ev = json.loads(data)
+                except Exception:
+                    continue
+                for ch in ev.get("choices") or []:
+                    text = (ch.get("delta") or {}).get("content")
+                    if text:
+                        yield text
+                u = ev.get("usage")
+                if usage is not None and u:
+                    usage.update(input_tokens=u.get("prompt_tokens"), output_tokens=u.get("completion_tokens"))
+
+
+class MockBackendError(RuntimeError):
+    pass
+
+
+class MockBackend(LLMBackend):
+    """Deterministic offline backend for load tests.
+
+    The reply only depends on the request text, so repeated runs are identical.
+    Errors are drawn from a seeded RNG, so the failure sequence is reproducible too.
+    """
+
+    name = "mock"
+
+    def __init__(self, *, latency_s: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency_s = max(0.0, latency_s)
+        self.error_rate = max(0.0, min(1.0, error_rate))
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _maybe_fail(self) -> None:
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.error_rate:
+            raise MockBackendError("mock backend injected error")
+
+    @staticmethod
+    def reply_for(system: str, user: str) -> dict:
+        h = int(hashlib.sha256((system + "\n" + user).encode("utf-8")).hexdigest()[:8], 16)
+        if "Planner" in system:
+            return {
+                "assistant_message": f"[mock] plan {h % 1000:03d}",
+                "plan": [{"step_id": "1", "title": "mock step", "status": "planned"}],
+                "tool_calls": [
+                    {
+                        "call_id": f"tc_{h:08x}",
+                        "tool": "ccxt.fetch_ticker",
+                        "args": {"symbol": "BTC/USDT:USDT"},
+                        "reason": "mock",
+                        "risk": "low",
+                    }
+                ],
+                "questions": [],
+            }
+        return {
+            "allow": h % 4 != 0,
+            "reason": "mock decision",
+            "confidence": round((h % 100) / 100, 2),
+            "max_position_ratio": 0.5,
+        }
+
+    def complete(self, *, system: str, user: str, max_tokens: int) -> LLMResponse:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        self._maybe_fail()
+        text = json.dumps(self.reply_for(system, user), ensure_ascii=False)
+        return LLMResponse(text=text, input_tokens=(len(system) + len(user)) // 4, output_tokens=len(text) // 4)
+
+    def stream(self, *, system: str, user: str, max_tokens: int, usage: dict | None = None) -> Iterator[str]:
+        self._maybe_fail()
+        text = json.dumps(self.reply_for(system, user), ensure_ascii=False)
+        chunks = [text[i : i + 16] for i in range(0, len(text), 16)] or [""]
+        for c in chunks:
+            if self.latency_s:
+                time.sleep(self.latency_s / len(chunks))
+            yield c
+        if usage is not None:
+            usage.update(input_tokens=(len(system) + len(user)) // 4, output_tokens=len(text) // 4)
+
+
+def serve_mock(*, host: str = "127.0.0.1", port: int = 8765, backend: MockBackend | None = None) -> None:
+    """Serve MockBackend over HTTP, speaking both /v1/messages and /chat/completions.
+
+    Point `llm_api_url` at http://127.0.0.1:8765 to load-test the real HTTP backends offline.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    mock = backend or MockBackend()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, code: int, obj: dict) -> None:
+            raw = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def _send_sse(self, events: list) -> None:
+            self.send_response(200)
+            self.send_header("content-type", "text/event-stream")
+            self.end_headers()
+            for ev in events:
+                data = ev if isinstance(ev, str) else json.dumps(ev, ensure_ascii=False)
+                self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("content-length") or 0)) or b"{}")
+            msgs = body.get("messages") or []
+            system = body.get("system") or next((m.get("content", "") for m in msgs if m.get("role") == "system"), "")
+            user = next((m.get("content", "") for m in msgs if m.get("role") == "user"), "")
+            try:
+                resp = mock.complete(system=system, user=user, max_tokens=int(body.get("max_tokens") or 800))
+            except MockBackendError as e:
+                self._send_json(500, {"error": str(e)})
+                return
+
+            if self.path.rstrip("/").endswith("/messages"):
+                usage = {"input_tokens": resp.input_tokens, "output_tokens": resp.output_tokens}
+                if body.get("stream"):
+                    self._send_sse(
+                        [
+                            {"type": "message_start", "message": {"usage": {"input_tokens": resp.input_tokens}}},
+                            {"type": "content_block_delta", "delta": {"type": "text_delta", "text": resp.text}},
+                            {"type": "message_delta", "usage": {"output_tokens": resp.output_tokens}},
+                            {"type": "message_stop"},
+                        ]
+                    )
+                else:
+                    self._send_json(200, {"content": [{"type": "text", "text": resp.text}], "usage": usage})
+            elif self.path.rstrip("/").endswith("/chat/completions"):
+                usage = {"prompt_tokens": resp.input_tokens, "completion_tokens": resp.output_tokens}
+                if body.get("stream"):
+                    self._send_sse(
+                        [
+                            {"choices": [{"delta": {"content": resp.text}}]},
+                            {"choices": [], "usage": usage},
+                            "[DONE]",
+                        ]
+                    )
+                else:
+                    self._send_json(200, {"choices": [{"message": {"content": resp.text}}], "usage": usage})
+            else:
+                self._send_json(404, {"error": "unknown path"})
+
+    ThreadingHTTPServer((host, port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Run the local mock LLM server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--seed", type=int, default=0)
+    a = ap.parse_args()
+    serve_mock(
+        host=a.host,
+        port=a.port,
+        backend=MockBackend(latency_s=a.latency_ms / 1000.0, error_rate=a.error_rate, seed=a.seed),
+    )
@@ -0,0 +1,248 @@
+"""Streaming market data: tickers, positions and open orders from exchange WebSockets.
+
+A `MarketFeed` runs a ccxt.pro client on a background thread and keeps a
+`MarketSnapshot` up to date: tickers for the watched symbols (public channel)
+and, when credentials are configured, positions and open orders (private
+channels, seeded once over REST because the streams only carry changes).
+Readers get `None` when the data is stale or the stream is down and fall back
+to REST themselves.
+
+Off by default (AGENT_WS_FEED=1 enables it). AGENT_WS_URL points the client at
+another endpoint, e.g. a local fake server in tests; AGENT_WS_MAX_AGE_S is how
+old a ticker may be before it counts as stale.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_CLOSED_STATUSES = ("closed", "canceled", "cancelled", "expired", "rejected")
+
+
+def ws_feed_enabled() -> bool:
+    return os.getenv("AGENT_WS_FEED", "0") in ("1", "true", "TRUE")
+
+
+def ws_max_age_s() -> float:
+    try:
+        return max(0.1, float(os.getenv("AGENT_WS_MAX_AGE_S", "10")))
+    except ValueError:
+        return 10.0
+
+
+class MarketSnapshot:
+    """Thread-safe latest view; every reader gets copies, never live dicts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tickers: dict[str, tuple[float, dict]] = {}  # symbol -> (received ts, ticker)
+        self._positions: dict[tuple, dict] = {}
+        self._orders: dict[str, dict] = {}
+        self._private_live = False
+
+    # --- writers (feed thread) ---
+    def update_tickers(self, tickers: dict) -> None:
+        now = time.time()
+        with self._lock:
+            for symbol, t in (tickers or {}).items():
+                self._tickers[symbol] = (now, dict(t))
+
+    def set_private(self, positions: list, orders: list) -> None:
+        with self._lock:
+            self._positions = {}
+            self._orders = {}
+            self._merge_positions(positions)
+            self._merge_orders(orders)
+            self._private_live = True
+
+    def update_positions(self, positions: list) -> None:
+        with self._lock:
+            self._merge_positions(positions)
+
+    def update_orders(self, orders: list) -> None:
+        with self._lock:
+            self._merge_orders(orders)
+
+    def mark_private_down(self) -> None:
+        with self._lock:
+            self._private_live = False
+
+    def _merge_positions(self, positions: list) -> None:
+        for p in positions or []:
+            key = (p.get("symbol"), p.get("side") or "")
+            if float(p.get("contracts") or 0) == 0:
+                self._positions.pop(key, None)
+            else:
+                self._positions[key] = dict(p)
+
+    def _merge_orders(self, orders: list) -> None:
+        for o in orders or []:
+            oid = str(o.get("id"))
+            if o.get("status") in _CLOSED_STATUSES:
+                self._orders.pop(oid, None)
+            else:
+                self._orders[oid] = dict(o)
+
+    # --- readers ---
+    def ticker(self, symbol: str, max_age_s: float | None = None) -> dict | None:
+        max_age = ws_max_age_s() if max_age_s is None else max_age_s
+        with self._lock:
+            item = self._tickers.get(symbol)
+        if item is None or time.time() - item[0] > max_age:
+            return None
+        return dict(item[1])
+
+    def tickers(self, symbols, max_age_s: float | None = None) -> dict[str, dict]:
+        """Fresh tickers among `symbols` (missing / stale ones are left out)."""
+        out = {}
+        for s in symbols:
+            t = self.ticker(s, max_age_s)
+            if t is not None:
+                out[s] = t
+        return out
+
+    def positions(self) -> list | None:
+        with self._lock:
+            return [dict(p) for p in self._positions.values()] if self._private_live else None
+
+    def open_orders(self, symbol: str | None = None) -> list | None:
+        with self._lock:
+            if not self._private_live:
+                return None
+            return [dict(o) for o in self._orders.values() if symbol is None or o.get("symbol") == symbol]
+
+
+class MarketFeed:
+    def __init__(self, ex_cfg: dict, *, default_type: str = "swap", symbols=(), ws_url: str | None = None):
+        self.ex_cfg = ex_cfg
+        self.default_type = default_type
+        self.ws_url = ws_url if ws_url is not None else os.getenv("AGENT_WS_URL") or None
+        self.snapshot = MarketSnapshot()
+        self._symbols: set[str] = set(symbols)
+        self._symbols_changed: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._main_task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def has_credentials(self) -> bool:
+        return bool(self.ex_cfg.get("key") and self.ex_cfg.get("secret"))
+
+    def start(self) -> "MarketFeed":
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=lambda: asyncio.run(self._main()), name="market-feed", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        loop, task = self._loop, self._main_task
+        if loop is not None and task is not None:
+            loop.call_soon_threadsafe(task.cancel)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def watch(self, symbols) -> None:
+        """Add symbols to the ticker subscription (takes effect on the next update)."""
+        new = set(symbols) - self._symbols
+        if not new:
+            return
+        self._symbols = self._symbols | new  # rebind: the feed thread iterates the old set
+        if self._loop is not None and self._symbols_changed is not None:
+            self._loop.call_soon_threadsafe(self._symbols_changed.set)
+
+    def _exchange(self):
+        from agent.tools.exchange_factory import build_exchange, get_exchange
+
+        ex = build_exchange(self.ex_cfg, self.default_type, pro=True)
+        if self.ws_url:
+            ex.urls["api"]["ws"] = self.ws_url.rstrip("/")
+        # Reuse the markets the shared REST instance already loaded (or warmed from disk).
+        rest = get_exchange(self.ex_cfg, default_type=self.default_type)
+        if getattr(rest, "markets", None):
+            ex.set_markets(rest.markets, getattr(rest, "currencies", None))
+        return ex
+
+    async def _main(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._main_task = asyncio.current_task()
+        self._symbols_changed = asyncio.Event()
+        ex = self._exchange()
+        loops = [self._retry("tickers", self._ticker_loop, ex)]
+        if self.has_credentials:
+            loops.append(self._retry("private", self._private_loop, ex, on_error=self.snapshot.mark_private_down))
+        try:
+            await asyncio.gather(*loops)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.snapshot.mark_private_down()
+            try:
+                await ex.close()
+            except Exception:
+                pass
+
+    async def _retry(self, name: str, body, ex, *, on_error=None) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                await body(ex)
+                backoff = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if on_error is not None:
+                    on_error()
+                logger.warning("market feed %s stream error: %s (retry in %.0fs)", name, e, backoff)
+                await asyncio.sleep(backoff)
+                backoff = min(30.0, backoff * 2)
+
+    async def _ticker_loop(self, ex) -> None:
+        while True:
+            # Unknown symbols would fail the whole subscription; they stay on REST.
+            symbols = sorted(s for s in self._symbols if not ex.markets or s in ex.markets)
+            if not symbols:
+                self._symbols_changed.clear()
+                await self._symbols_changed.wait()
+                continue
+            self._symbols_changed.clear()
+            while not self._symbols_changed.is_set():
+                self.snapshot.update_tickers(await ex.watch_tickers(symbols))
+
+    async def _private_loop(self, ex) -> None:
+        positions, orders = await asyncio.gather(ex.fetch_positions(), ex.fetch_open_orders())
+        self.snapshot.set_private(positions, orders)
+
+        async def _positions():
+            while True:
+                self.snapshot.update_positions(await ex.watch_positions())
+
+        async def _orders():
+            while True:
+                self.snapshot.update_orders(await ex.watch_orders())
+
+        await asyncio.gather(_positions(), _orders())
+
+
+_FEEDS: dict[str, MarketFeed] = {}
+_FEEDS_LOCK = threading.Lock()
+
+
+def get_market_feed(ex_cfg: dict, *, default_type: str = "swap", symbols=()) -> MarketFeed | None:
+    """The running feed for this exchange config (started on first use); None when disabled."""
+    if not ws_feed_enabled():
+        return None
+    from agent.tools.exchange_factory import instance_key
+
+    key = instance_key(ex_cfg, default_type)
+    with _FEEDS_LOCK:
+        feed = _FEEDS.get(key)
+        if feed is None:
+            feed = _FEEDS[key] = MarketFeed(ex_cfg, default_type=default_type, symbols=symbols)
+        feed.start()
+    feed.watch(symbols)
+    return feed
@@ -0,0 +1,234 @@
+"""Vectorized HybridOkxAgent features/signals for many pairs at once.
+
+All whitelisted pairs are stacked into (time x pair) float64 arrays and every
+indicator is computed for all columns in one pass, instead of one pandas
+pipeline per pair. Semantics match agent.incremental_ta (TA-Lib EMA/RSI,
+qtpylib Bollinger, pandas rolling Donchian). Leading NaNs (pair listed later
+than the others) delay seeding per column; a NaN inside the history leaves the
+state untouched and yields NaN for that row.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+@dataclass
+class PairPanel:
+    pairs: list[str]
+    ts: np.ndarray  # (T,) int64 ns
+    data: dict[str, np.ndarray]  # column -> (T, N)
+    features: dict[str, np.ndarray] = field(default_factory=dict)
+
+    def column(self, pair: str) -> int | None:
+        try:
+            return self.pairs.index(pair)
+        except ValueError:
+            return None
+
+    def rows_for(self, dates: np.ndarray) -> np.ndarray | None:
+        """Row indices of `dates` (int64 ns) in the panel, or None if any is missing."""
+        idx = np.searchsorted(self.ts, dates)
+        if len(idx) and (idx[-1] >= len(self.ts) or np.any(self.ts[np.minimum(idx, len(self.ts) - 1)] != dates)):
+            return None
+        return idx
+
+    def slice(self, pair: str, dates: np.ndarray) -> dict[str, np.ndarray] | None:
+        j = self.column(pair)
+        rows = self.rows_for(dates) if j is not None else None
+        if rows is None:
+            return None
+        return {name: arr[rows, j] for name, arr in self.features.items()}
+
+
+def frame_dates(dataframe) -> np.ndarray:
+    return dataframe["date"].values.astype("datetime64[ns]").astype(np.int64)
+
+
+def stack_frames(frames: dict, columns=("high", "low", "close", "volume")) -> PairPanel:
+    """Align per-pair OHLCV frames on the union of their dates."""
+    pairs = [p for p, df in frames.items() if df is not None and len(df)]
+    dates = {p: frame_dates(frames[p]) for p in pairs}
+    ts = np.unique(np.concatenate([dates[p] for p in pairs])) if pairs else np.empty(0, dtype=np.int64)
+    data = {c: np.full((len(ts), len(pairs)), np.nan) for c in columns}
+    for j, p in enumerate(pairs):
+        rows = np.searchsorted(ts, dates[p])
+        for c in columns:
+            data[c][rows, j] = frames[p][c].to_numpy(dtype=float)
+    return PairPanel(pairs=pairs, ts=ts, data=data)
+
+
+def ema_2d(x: np.ndarray, period: int) -> np.ndarray:
+    T, N = x.shape
+    out = np.full((T, N), np.nan)
+    k = 2.0 / (period + 1)
+    count = np.zeros(N, dtype=np.int64)
+    seed = np.zeros(N)
+    value = np.full(N, np.nan)
+    for t in range(T):
+        xt = x[t]
+        valid = ~np.isnan(xt)
+        seeding = valid & (count < period)
+        seed[seeding] += xt[seeding]
+        count[seeding] += 1
+        just_seeded = seeding & (count == period)
+        value[just_seeded] = seed[just_seeded] / period
+        step = valid & ~seeding
+        value[step] += k * (xt[step] - value[step])
+        emit = valid & (count >= period)
+        out[t, emit] = value[emit]
+    return out
+
+
+def rsi_2d(close: np.ndarray, period: int = 14) -> np.ndarray:
+    T, N = close.shape
+    out = np.full((T, N), np.nan)
+    prev = np.full(N, np.nan)
+    count = np.zeros(N, dtype=np.int64)
+    gain = np.zeros(N)
+    loss = np.zeros(N)
+    for t in range(T):
+        c = close[t]
+        valid = ~np.isnan(c) & ~np.isnan(prev)
+        diff = np.where(valid, c - prev, 0.0)
+        g = np.clip(diff, 0, None)
+        lo = np.clip(-diff, 0, None)
+        seeding = valid & (count < period)
+        gain[seeding] += g[seeding]
+        loss[seeding] += lo[seeding]
+        count[seeding] += 1
+        just_seeded = seeding & (count == period)
+        gain[just_seeded] /= period
+        loss[just_seeded] /= period
+        step = valid & ~seeding
+        gain[step] = (gain[step] * (period - 1) + g[step]) / period
+        loss[step] = (loss[step] * (period - 1) + lo[step]) / period
+        emit = valid & (count >= period)
+        total = gain + loss
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = np.where(total != 0, 100.0 * gain / total, 0.0)
+        out[t, emit] = rsi[emit]
+        prev = np.where(np.isnan(c), prev, c)
+    return out
+
+
+def rolling_mean_std_2d(x: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """Rolling mean and sample std with min_periods=1 (qtpylib bollinger semantics)."""
+    # Center each column on its first valid value so the squared sums stay small.
+    valid = ~np.isnan(x)
+    first = np.argmax(valid, axis=0)
+    ref = np.where(valid.any(axis=0), x[first, np.arange(x.shape[1])], 0.0)
+    v = x - ref
+    v0 = np.where(valid, v, 0.0)
+    zeros = np.zeros((1, x.shape[1]))
+    cs = np.concatenate([zeros, np.cumsum(v0, axis=0)])
+    cs2 = np.concatenate([zeros, np.cumsum(v0 * v0, axis=0)])
+    cn = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+    lag = np.maximum(np.arange(1, len(x) + 1) - window, 0)
+    s = cs[1:] - cs[lag]
+    s2 = cs2[1:] - cs2[lag]
+    n = cn[1:] - cn[lag]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = s / n
+        var = (s2 - n * mean * mean) / (n - 1)
+    std = np.where(n >= 2, np.sqrt(np.maximum(var, 0.0)), np.nan)
+    mean = np.where(n >= 1, mean, np.nan)
+    return mean + ref, std
+
+
+def rolling_extreme_2d(x: np.ndarray, window: int, *, fn) -> np.ndarray:
+    """Rolling max/min with min_periods=window (NaN inside the window -> NaN)."""
+    T, N = x.shape
+    out = np.full((T, N), np.nan)
+    if T < window:
+        return out
+    view = np.lib.stride_tricks.sliding_window_view(x, window, axis=0)  # (T-w+1, N, w)
+    out[window - 1 :] = fn(view, axis=-1)
+    return out
+
+
+def shift_2d(x: np.ndarray, n: int = 1) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    out[n:] = x[:-n]
+    return out
+
+
+def hybrid_features(
+    panel: PairPanel,
+    *,
+    ema_periods: tuple[int, ...] = (20, 50),
+    rsi_period: int = 14,
+    bb_window: int = 20,
+    bb_stds: float = 2.0,
+    donchian_window: int = 20,
+) -> PairPanel:
+    """Fill panel.features with the columns HybridOkxAgent reads, for all pairs."""
+    d = panel.data
+    high, low, close = d["high"], d["low"], d["close"]
+    f = panel.features
+    for p in ema_periods:
+        f[f"ema{p}"] = ema_2d(close, p)
+    f["rsi"] = rsi_2d(close, rsi_period)
+    mid, std = rolling_mean_std_2d((high + low + close) / 3.0, bb_window)
+    f["bb_middleband"] = mid
+    f["bb_lowerband"] = mid - std * bb_stds
+    f["bb_upperband"] = mid + std * bb_stds
+    f[f"hh{donchian_window}"] = rolling_extreme_2d(high, donchian_window, fn=np.max)
+    f[f"ll{donchian_window}"] = rolling_extreme_2d(low, donchian_window, fn=np.min)
+    return panel
+
+
+def hybrid_entry_signals(
+    *,
+    close,
+    volume,
+    rsi,
+    bb_lowerband,
+    bb_upperband,
+    ema_fast,
+    ema_slow,
+    hh_prev,
+    ll_prev,
+    buy_rsi: float = 30,
+    sell_rsi: float = 70,
+) -> tuple:
+    """Entry logic of HybridOkxAgent on arrays of any (matching) shape."""
+    with np.errstate(invalid="ignore"):
+        uptrend = ema_fast > ema_slow
+        downtrend = ema_fast < ema_slow
+        mr_long = (rsi < buy_rsi) & (close < bb_lowerband)
+        mr_short = (rsi > sell_rsi) & (close > bb_upperband)
+        bo_long = close > hh_prev
+        bo_short = close < ll_prev
+        active = volume > 0
+    enter_long = active & ((uptrend & (mr_long | bo_long)) | (downtrend & bo_long))
+    enter_short = active & ((downtrend & (mr_short | bo_short)) | (uptrend & bo_short))
+    return enter_long, enter_short
+
+
+def hybrid_signals(
+    panel: PairPanel,
+    *,
+    donchian_window: int = 20,
+    fast: int = 20,
+    slow: int = 50,
+    buy_rsi: float = 30,
+    sell_rsi: float = 70,
+) -> PairPanel:
+    """Add 2D enter_long / enter_short to panel.features (requires hybrid_features)."""
+    f = panel.features
+    f["enter_long"], f["enter_short"] = hybrid_entry_signals(
+        close=panel.data["close"],
+        volume=panel.data["volume"],
+        rsi=f["rsi"],
+        bb_lowerband=f["bb_lowerband"],
+        bb_upperband=f["bb_upperband"],
+        ema_fast=f[f"ema{fast}"],
+        ema_slow=f[f"ema{slow}"],
+        hh_prev=shift_2d(f[f"hh{donchian_window}"]),
+        ll_prev=shift_2d(f[f"ll{donchian_window}"]),
+        buy_rsi=buy_rsi,
+        sell_rsi=sell_rsi,
+    )
+    return panel
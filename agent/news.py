@@ -1,5 +1,9 @@
+import logging
+import os
 import re
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass
 from typing import Iterable
 from urllib.parse import urlparse
@@ -8,6 +12,41 @@ import httpx
 from bs4 import BeautifulSoup
 from readability import Document
 
+from agent.article_cache import (
+    article_cache_enabled,
+    conditional_headers,
+    content_hash,
+    get_article,
+    mark_checked,
+    save_article,
+)
+
+logger = logging.getLogger(__name__)
+
+_CLIENT: httpx.Client | None = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def _env_num(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def shared_news_client() -> httpx.Client:
+    """One keep-alive pool for every article fetch (httpx.Client is thread-safe)."""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = httpx.Client(
+                follow_redirects=True,
+                timeout=httpx.Timeout(15.0, connect=5.0),
+                limits=httpx.Limits(max_connections=16, max_keepalive_connections=8),
+                headers={"User-Agent": "okx-trading-agent/1.0"},
+            )
+        return _CLIENT
+
 
 @dataclass
 class NewsItem:
@@ -21,11 +60,12 @@ def _domain(url: str) -> str:
     return urlparse(url).netloc.lower()
 
 
+def _strip_www(domain: str) -> str:
+    return domain[4:] if domain.startswith("www.") else domain
+
+
 def _is_allowed(url: str, allow_domains: set[str]) -> bool:
-    d = _domain(url)
-    if d.startswith("www."):
-        d = d[4:]
-    return d in allow_domains
+    return _strip_www(_domain(url)) in allow_domains
 
 
 def _clean_text(text: str) -> str:
@@ -36,15 +76,7 @@ def _clean_text(text: str) -> str:
     return text.strip()
 
 
-def fetch_article(url: str, *, allow_domains: set[str], timeout_s: float = 15.0) -> NewsItem | None:
-    if not _is_allowed(url, allow_domains):
-        return None
-
-    with httpx.Client(follow_redirects=True, timeout=timeout_s, headers={"User-Agent": "okx-trading-agent/1.0"}) as client:
-        r = client.get(url)
-        r.raise_for_status()
-        html = r.text
-
+def extract_article(url: str, html: str) -> NewsItem:
     doc = Document(html)
     title = doc.short_title() or ""
     content_html = doc.summary(html_partial=True)
@@ -55,6 +87,54 @@ def fetch_article(url: str, *, allow_domains: set[str], timeout_s: float = 15.0)
     return NewsItem(url=url, title=_clean_text(title), text=_clean_text(text), fetched_at=time.time())
 
 
+def fetch_article(url: str, *, allow_domains: set[str], timeout_s: float = 15.0) -> NewsItem | None:
+    if not _is_allowed(url, allow_domains):
+        return None
+
+    if not article_cache_enabled():
+        r = shared_news_client().get(url, timeout=timeout_s)
+        r.raise_for_status()
+        return extract_article(url, r.text)
+
+    cached = _cache_call(get_article, url)
+    r = shared_news_client().get(url, timeout=timeout_s, headers=conditional_headers(cached))
+    etag, last_modified = r.headers.get("etag"), r.headers.get("last-modified")
+    if cached and r.status_code == 304:
+        _cache_call(mark_checked, url, etag=etag, last_modified=last_modified)
+        return _cached_item(url, cached)
+    r.raise_for_status()
+    body_hash = content_hash(r.content)
+    if cached and cached.get("content_hash") == body_hash:
+        # Same bytes as last time: skip readability / lxml.
+        _cache_call(mark_checked, url, etag=etag, last_modified=last_modified)
+        return _cached_item(url, cached)
+    item = extract_article(url, r.text)
+    _cache_call(
+        save_article,
+        url,
+        etag=etag,
+        last_modified=last_modified,
+        body_hash=body_hash,
+        title=item.title,
+        text=item.text,
+        summary=summarize_for_trading(item),
+    )
+    return item
+
+
+def _cached_item(url: str, row: dict) -> NewsItem:
+    return NewsItem(url=url, title=row.get("title") or "", text=row.get("text") or "", fetched_at=float(row.get("fetched_ts") or 0))
+
+
+def _cache_call(fn, *args, **kwargs):
+    # The cache is best-effort: a locked / broken database must not fail the fetch.
+    try:
+        return fn(*args, **kwargs)
+    except Exception as e:
+        logger.warning("article cache %s failed: %s", fn.__name__, e)
+        return None
+
+
 def summarize_for_trading(item: NewsItem, *, max_chars: int = 2000) -> str:
     # No LLM here yet (that comes later). This is a safe extractive summary.
     t = item.text
@@ -63,11 +143,58 @@ def summarize_for_trading(item: NewsItem, *, max_chars: int = 2000) -> str:
     return f"Title: {item.title}\nURL: {item.url}\nContent: {t}"
 
 
+def fetch_articles(
+    urls: Iterable[str],
+    allow_domains: set[str],
+    *,
+    deadline_s: float | None = None,
+    max_workers: int | None = None,
+    per_domain: int | None = None,
+) -> list[NewsItem | None]:
+    """Fetch `urls` concurrently; one result per URL, in input order.
+
+    At most `per_domain` requests run against one host at a time. Whatever has
+    not finished by the global deadline, or failed, comes back as None, so a
+    refresh takes about as long as the slowest article (capped by the deadline).
+    """
+    urls = list(urls)
+    if not urls:
+        return []
+    deadline_s = deadline_s if deadline_s is not None else _env_num("AGENT_NEWS_DEADLINE_S", 20.0)
+    workers = int(max_workers or _env_num("AGENT_NEWS_WORKERS", 8))
+    per_domain = int(per_domain or _env_num("AGENT_NEWS_PER_DOMAIN", 2))
+    deadline = time.monotonic() + deadline_s
+    slots = {d: threading.Semaphore(max(1, per_domain)) for d in {_domain(u) for u in urls}}
+
+    def _one(url: str) -> NewsItem | None:
+        with slots[_domain(url)]:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            return fetch_article(url, allow_domains=allow_domains, timeout_s=min(15.0, remaining))
+
+    results: list[NewsItem | None] = [None] * len(urls)
+    pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(urls))), thread_name_prefix="news")
+    try:
+        futures = {pool.submit(_one, u): i for i, u in enumerate(urls)}
+        pending = set(futures)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for fut in done:
+                try:
+                    results[futures[fut]] = fut.result()
+                except Exception as e:
+                    logger.warning("news fetch failed for %s: %s", urls[futures[fut]], e)
+        if pending:
+            logger.warning("news deadline (%.1fs) hit; %d of %d articles skipped", deadline_s, len(pending), len(urls))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
 def fetch_and_summarize(urls: Iterable[str], allow_domains: Iterable[str]) -> list[str]:
-    allow = {d.lower().lstrip("www.") for d in allow_domains}
-    out: list[str] = []
-    for u in urls:
-        it = fetch_article(u, allow_domains=allow)
-        if it:
-            out.append(summarize_for_trading(it))
-    return out
+    allow = {_strip_www(d.lower()) for d in allow_domains}
+    return [summarize_for_trading(it) for it in fetch_articles(urls, allow) if it]
@@ -0,0 +1,158 @@
+"""In-process cache of planner turns for repeated / near-identical questions."""
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from agent.embeddings import cosine, embed_text
+
+_WS_RE = re.compile(r"\s+")
+_TRAILING_PUNCT_RE = re.compile(r"[\s?？!！。.,，~～]+$")
+# BTC/USDT, btc-usdt-swap, BTCUSDT -> "btc"; bare tickers count when upper case or well known.
+_PAIR_RE = re.compile(r"(?<![a-z0-9])([a-z0-9]{2,10}?)[/-]?(?:usdt|usdc|usd)(?::[a-z]+|-swap)?(?![a-z0-9])", re.I)
+_TICKER_RE = re.compile(r"(?<![A-Za-z0-9])([A-Za-z][A-Za-z0-9]{1,9})(?![A-Za-z0-9])")
+_KNOWN_BASES = frozenset(
+    "btc eth sol xrp bnb doge ada trx ton avax link dot ltc bch shib uni etc okb op arb sui pepe apt near fil atom".split()
+)
+# 15m, 4h, 1d, 1w, 1M, 4小时, 日线, 周线 ...
+_TF_RE = re.compile(r"(?<![A-Za-z0-9])(\d+)\s*(min|hr|[mhdwHDWM]|分钟|小时|天|日|周)(?![A-Za-z])")
+_TF_UNITS = {"min": "m", "hr": "h", "分钟": "m", "小时": "h", "天": "d", "日": "d", "周": "w"}
+_TF_WORDS = {"日线": "1d", "周线": "1w", "月线": "1M", "daily": "1d", "weekly": "1w", "hourly": "1h"}
+
+
+def normalize_message(text: str) -> str:
+    t = _WS_RE.sub(" ", (text or "").strip().lower())
+    return _TRAILING_PUNCT_RE.sub("", t)
+
+
+def instrument_tokens(text: str) -> str:
+    """Symbols and timeframes named in a message, e.g. "btc|eth|1h|4h" (part of the cache key)."""
+    text = text or ""
+    symbols = {m.group(1).lower() for m in _PAIR_RE.finditer(text)}
+    for m in _TICKER_RE.finditer(_PAIR_RE.sub(" ", text)):
+        tok = m.group(1)
+        if tok.isupper() or tok.lower() in _KNOWN_BASES:
+            symbols.add(tok.lower())
+    symbols -= {"usdt", "usdc", "usd"}
+    timeframes = set()
+    for m in _TF_RE.finditer(text):
+        unit = m.group(2)
+        unit = _TF_UNITS.get(unit, unit if unit == "M" else unit.lower())  # 1M is a month, 1H / 1D as on OKX
+        timeframes.add(f"{int(m.group(1))}{unit}")
+    timeframes |= {tf for word, tf in _TF_WORDS.items() if word in text.lower()}
+    return "|".join(sorted(symbols) + sorted(timeframes))
+
+
+def context_fingerprint(context: dict | None) -> str:
+    raw = json.dumps(context or {}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def with_fresh_call_ids(plan: dict) -> dict:
+    """Deep copy of a cached plan with new call_ids, so each turn's tool calls are distinct events."""
+    out = copy.deepcopy(plan)
+    for tc in out.get("tool_calls") or []:
+        if isinstance(tc, dict):
+            tc["call_id"] = f"tc_{uuid.uuid4().hex[:8]}"
+    return out
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    vector: list[float] | None
+    plan: dict
+    ts: float
+
+
+class PlanCache:
+    """LRU + TTL cache keyed on (normalized message, context fingerprint + instrument tokens).
+
+    With `similarity` set, a miss falls back to the most similar cached message
+    with the same fingerprint, i.e. the same context and the same symbols and
+    timeframes: "BTC 1h" and "BTC 4h" embed too close to tell apart by cosine.
+    """
+
+    def __init__(self, *, max_size: int = 128, ttl_s: float = 300.0, similarity: float | None = None):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self.similarity = similarity
+        self._entries: OrderedDict[tuple[str, str], _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, e: _Entry, now: float) -> bool:
+        return now - e.ts > self.ttl_s
+
+    def get(self, message: str, context: dict | None) -> dict | None:
+        norm = normalize_message(message)
+        fp = f"{context_fingerprint(context)}:{instrument_tokens(message)}"
+        now = time.time()
+        with self._lock:
+            e = self._entries.get((norm, fp))
+            if e is not None and self._expired(e, now):
+                del self._entries[(norm, fp)]
+                e = None
+            if e is None and self.similarity is not None:
+                vec = embed_text(norm)
+                best, best_key = self.similarity, None
+                for k, cand in self._entries.items():
+                    if cand.fingerprint != fp or cand.vector is None or self._expired(cand, now):
+                        continue
+                    sim = cosine(vec, cand.vector)
+                    if sim >= best:
+                        best, best_key = sim, k
+                if best_key is not None:
+                    e = self._entries[best_key]
+                    self._entries.move_to_end(best_key)
+            elif e is not None:
+                self._entries.move_to_end((norm, fp))
+            if e is None:
+                return None
+            return with_fresh_call_ids(e.plan)
+
+    def put(self, message: str, context: dict | None, plan: dict) -> None:
+        norm = normalize_message(message)
+        fp = f"{context_fingerprint(context)}:{instrument_tokens(message)}"
+        vec = embed_text(norm) if self.similarity is not None else None
+        with self._lock:
+            self._entries[(norm, fp)] = _Entry(fingerprint=fp, vector=vec, plan=copy.deepcopy(plan), ts=time.time())
+            self._entries.move_to_end((norm, fp))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_CACHE: PlanCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_plan_cache() -> PlanCache | None:
+    """Process-wide cache from env; opt-in with AGENT_PLAN_CACHE_SIZE > 0.
+
+    Off by default: a cached assistant_message may repeat market statements that
+    are out of date by the time it is replayed.
+    """
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            size = int(os.getenv("AGENT_PLAN_CACHE_SIZE", "0"))
+            if size <= 0:
+                return None
+            sim = os.getenv("AGENT_PLAN_CACHE_SIMILARITY", "").strip()
+            _CACHE = PlanCache(
+                max_size=size,
+                ttl_s=float(os.getenv("AGENT_PLAN_CACHE_TTL_S", "300")),
+                similarity=float(sim) if sim else None,
+            )
+        return _CACHE
@@ -1,12 +1,36 @@
-import json
 import uuid
 
+from agent.context_pack import pack_planner_prompt
 from agent.llm import call_llm_json
+from agent.plan_cache import get_plan_cache
 
 
-def plan_turn(*, user_message: str, context: dict | None = None) -> dict:
+def _normalize_tool_call(tc: dict) -> dict:
+    if not tc.get("call_id"):
+        tc["call_id"] = f"tc_{uuid.uuid4().hex[:8]}"
+    if not isinstance(tc.get("args"), dict):
+        tc["args"] = {}
+    if tc.get("risk") not in {"low", "medium", "high"}:
+        tc["risk"] = "low"
+    return tc
+
+
+def plan_turn(
+    *,
+    user_message: str,
+    context: dict | None = None,
+    on_message=None,
+    on_tool_call=None,
+) -> dict:
     """Return structured plan + proposed tool calls.
 
+    If on_message / on_tool_call are given the LLM response is streamed:
+    on_message(text) receives the growing assistant_message and
+    on_tool_call(tc) each normalized tool call as soon as it is complete.
+
+    Answers are cached per (normalized message, context); a cache hit replays
+    the callbacks and returns the plan with fresh call_ids.
+
     Output schema (best-effort):
     {
       "assistant_message": str,
@@ -33,8 +57,36 @@ def plan_turn(*, user_message: str, context: dict | None = None) -> dict:
         "}\n"
     )
 
-    payload = {"user_message": user_message, "context": context or {}}
-    resp = call_llm_json(system=system, user=json.dumps(payload, ensure_ascii=False)) or {}
+    cache = get_plan_cache()
+    if cache is not None:
+        cached = cache.get(user_message, context)
+        if cached is not None:
+            if on_message:
+                on_message(cached["assistant_message"])
+            for tc in cached["tool_calls"]:
+                if on_tool_call and isinstance(tc, dict):
+                    on_tool_call(tc)
+            return cached
+
+    user = pack_planner_prompt(user_message=user_message, context=context or {})
+    streamed: list[dict] = []
+
+    def _on_field(key, value, done):
+        if key == "assistant_message" and on_message:
+            on_message(str(value))
+
+    def _on_item(key, obj):
+        if key != "tool_calls" or not isinstance(obj, dict):
+            return
+        tc = _normalize_tool_call(obj)
+        streamed.append(tc)
+        if on_tool_call:
+            on_tool_call(tc)
+
+    if on_message or on_tool_call:
+        resp = call_llm_json(system=system, user=user, caller="planner", on_field=_on_field, on_item=_on_item) or {}
+    else:
+        resp = call_llm_json(system=system, user=user, caller="planner") or {}
 
     # Best-effort normalization
     out = {
@@ -45,11 +97,15 @@ def plan_turn(*, user_message: str, context: dict | None = None) -> dict:
     }
 
     for tc in out["tool_calls"]:
-        if isinstance(tc, dict) and not tc.get("call_id"):
-            tc["call_id"] = f"tc_{uuid.uuid4().hex[:8]}"
-        if isinstance(tc, dict) and not isinstance(tc.get("args"), dict):
-            tc["args"] = {}
-        if isinstance(tc, dict) and tc.get("risk") not in {"low", "medium", "high"}:
-            tc["risk"] = "low"
+        if isinstance(tc, dict):
+            _normalize_tool_call(tc)
+
+    # Keep the already-emitted (streamed) calls so call_ids stay stable.
+    if streamed:
+        out["tool_calls"] = streamed + out["tool_calls"][len(streamed) :]
+
+    # Only cache real LLM answers, never the empty "LLM disabled" shape.
+    if cache is not None and resp and (out["assistant_message"] or out["tool_calls"]):
+        cache.put(user_message, context, out)
 
     return out
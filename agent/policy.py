@@ -1,4 +1,3 @@
-import json
 import os
 from dataclasses import dataclass
 
@@ -29,27 +28,32 @@ def decide_entry(
     if not llm_policy_enabled():
         return PolicyDecision(allow=True, reason="LLM disabled")
 
+    from agent.context_pack import pack_policy_prompt
     from agent.llm import call_llm_json
 
     system = (
         "You are a risk-focused crypto trading gatekeeper. "
-        "You must output ONLY valid JSON with keys: allow(boolean), reason(string), confidence(number 0-1), max_position_ratio(number 0-1)."
+        "You must output ONLY valid JSON with keys: allow(boolean), reason(string), confidence(number 0-1), max_position_ratio(number 0-1). "
+        "indicators and memory entries are compact space-separated key=value strings."
     )
 
-    user_obj = {
+    header = {
         "pair": pair,
         "side": side,
         "timeframe": timeframe,
-        "indicators": indicators,
-        "news": recent_news or [],
-        "memory": memory_hits or [],
         "constraints": {
             "no_direct_instructions": True,
             "role": "veto_and_position_sizing_only",
         },
     }
+    user = pack_policy_prompt(
+        header=header,
+        indicators=indicators,
+        news=recent_news or [],
+        memory=memory_hits or [],
+    )
 
-    resp = call_llm_json(system=system, user=json.dumps(user_obj, ensure_ascii=False))
+    resp = call_llm_json(system=system, user=user, caller="policy", pair=pair)
     if not resp:
         return PolicyDecision(allow=True, reason="LLM unavailable")
 
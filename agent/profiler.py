@@ -0,0 +1,256 @@
+"""Opt-in stage timing for the strategy hot path (AGENT_PROFILE=1).
+
+`@profiled(stage)` wraps a strategy callback and `profile_span(stage, pair)`
+times a block inside one. Durations go into per-(stage, pair) log2 histograms
+that are flushed into the event store every AGENT_PROFILE_FLUSH_S seconds.
+When profiling is off (the default) the decorator returns the function itself
+and the span is a shared no-op, so the hot path pays nothing.
+
+    python -m agent.profiler report --hours 24 --top 15
+"""
+from __future__ import annotations
+
+import atexit
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Bucket i counts durations in [2**(i-1), 2**i) microseconds; the last one is open-ended.
+N_BUCKETS = 28
+
+
+def profiling_enabled() -> bool:
+    return os.getenv("AGENT_PROFILE", "0") in ("1", "true", "TRUE")
+
+
+def _flush_interval_s() -> float:
+    try:
+        return max(1.0, float(os.getenv("AGENT_PROFILE_FLUSH_S", "60")))
+    except ValueError:
+        return 60.0
+
+
+class Histogram:
+    __slots__ = ("n", "total_s", "max_s", "buckets")
+
+    def __init__(self):
+        self.n = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.buckets = [0] * N_BUCKETS
+
+    def add(self, seconds: float) -> None:
+        self.n += 1
+        self.total_s += seconds
+        if seconds > self.max_s:
+            self.max_s = seconds
+        self.buckets[min(N_BUCKETS - 1, int(seconds * 1e6).bit_length())] += 1
+
+
+def bucket_upper_ms(i: int) -> float:
+    return (2**i) / 1000.0
+
+
+def percentile_ms(buckets: list[int], q: float) -> float | None:
+    """Upper bound (ms) of the bucket holding the q-quantile."""
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for i, c in enumerate(buckets):
+        seen += c
+        if seen >= rank:
+            return bucket_upper_ms(i)
+    return bucket_upper_ms(len(buckets) - 1)
+
+
+class Profiler:
+    def __init__(self, *, flush_interval_s: float = 60.0):
+        self.flush_interval_s = flush_interval_s
+        self._hists: dict[tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def record(self, stage: str, pair: str | None, seconds: float) -> None:
+        key = (stage, pair or "")
+        with self._lock:
+            h = self._hists.get(key)
+            if h is None:
+                h = self._hists[key] = Histogram()
+            h.add(seconds)
+            due = time.monotonic() - self._last_flush >= self.flush_interval_s
+        if due:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write the histograms collected since the last flush to the event store."""
+        with self._lock:
+            hists, self._hists = self._hists, {}
+            self._last_flush = time.monotonic()
+        if not hists:
+            return 0
+        now = time.time()
+        rows = [
+            {
+                "ts": now,
+                "stage": stage,
+                "pair": pair,
+                "n": h.n,
+                "total_ms": h.total_s * 1000.0,
+                "max_ms": h.max_s * 1000.0,
+                "buckets_json": json.dumps(h.buckets),
+            }
+            for (stage, pair), h in hists.items()
+        ]
+        try:
+            from agent.event_log import append_profile_rows
+
+            append_profile_rows(rows)
+        except Exception:
+            logger.warning("profiler flush failed", exc_info=True)
+        return len(rows)
+
+
+_PROFILER: Profiler | None = None
+_PROFILER_LOCK = threading.Lock()
+
+
+def get_profiler() -> Profiler:
+    global _PROFILER
+    with _PROFILER_LOCK:
+        if _PROFILER is None:
+            _PROFILER = Profiler(flush_interval_s=_flush_interval_s())
+            atexit.register(_PROFILER.flush)
+        return _PROFILER
+
+
+def _pair_of(args: tuple, kwargs: dict) -> str | None:
+    # freqtrade passes `metadata` (populate_*) or `pair` (callbacks).
+    pair = kwargs.get("pair") or (kwargs.get("metadata") or {}).get("pair")
+    if pair:
+        return pair
+    for a in args:
+        if isinstance(a, dict) and "pair" in a:
+            return a["pair"]
+        if isinstance(a, str):
+            return a
+    return None
+
+
+def profiled(stage: str):
+    """Decorator timing each call under `stage`, keyed by the call's pair."""
+
+    def wrap(fn):
+        if not profiling_enabled():
+            return fn
+
+        @functools.wraps(fn)
+        def inner(self, *args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(self, *args, **kwargs)
+            finally:
+                get_profiler().record(stage, _pair_of(args, kwargs), time.perf_counter() - t0)
+
+        return inner
+
+    return wrap
+
+
+class _Span:
+    __slots__ = ("stage", "pair", "t0")
+
+    def __init__(self, stage: str, pair: str | None):
+        self.stage = stage
+        self.pair = pair
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        get_profiler().record(self.stage, self.pair, time.perf_counter() - self.t0)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def profile_span(stage: str, pair: str | None = None):
+    """`with profile_span("confirm.llm", pair): ...` -- a shared no-op when profiling is off."""
+    if not profiling_enabled():
+        return _NO_SPAN
+    return _Span(stage, pair)
+
+
+def summarize(rows: list[dict], *, by_pair: bool = False) -> list[dict]:
+    """Merge flushed rows per stage (or stage + pair), hottest (most total time) first."""
+    merged: dict[tuple, dict] = {}
+    for r in rows:
+        key = (r["stage"], r["pair"] if by_pair else "")
+        m = merged.setdefault(key, {"stage": key[0], "pair": key[1], "n": 0, "total_ms": 0.0, "max_ms": 0.0, "buckets": [0] * N_BUCKETS})
+        m["n"] += int(r["n"] or 0)
+        m["total_ms"] += float(r["total_ms"] or 0.0)
+        m["max_ms"] = max(m["max_ms"], float(r["max_ms"] or 0.0))
+        try:
+            for i, c in enumerate(json.loads(r["buckets_json"] or "[]")[:N_BUCKETS]):
+                m["buckets"][i] += int(c)
+        except Exception:
+            pass
+    out = []
+    for m in merged.values():
+        b = m.pop("buckets")
+        m["mean_ms"] = m["total_ms"] / m["n"] if m["n"] else None
+        for q in (50, 95, 99):
+            p = percentile_ms(b, q / 100)
+            m[f"p{q}_ms"] = None if p is None else min(p, m["max_ms"])  # bucket bound can exceed the max
+        out.append(m)
+    out.sort(key=lambda m: m["total_ms"], reverse=True)
+    return out
+
+
+def _fmt(v) -> str:
+    return "-" if v is None else f"{v:.3f}"
+
+
+def report(*, hours: float = 24.0, top: int = 20, by_pair: bool = False) -> str:
+    from agent.event_log import load_profile_rows
+
+    rows = summarize(load_profile_rows(since_ts=time.time() - hours * 3600), by_pair=by_pair)[:top]
+    if not rows:
+        return "no profile data (run with AGENT_PROFILE=1)"
+    header = ["stage", "pair", "n", "total_ms", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+    table = [header] + [
+        [m["stage"], m["pair"] or "*", str(m["n"])] + [_fmt(m[k]) for k in header[3:]] for m in rows
+    ]
+    widths = [max(len(r[i]) for r in table) for i in range(len(header))]
+    return "\n".join("  ".join(c.ljust(w) for c, w in zip(r, widths)) for r in table)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Strategy hot-path profile report")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    rp = sub.add_parser("report", help="print the hottest stages")
+    rp.add_argument("--hours", type=float, default=24.0)
+    rp.add_argument("--top", type=int, default=20)
+    rp.add_argument("--by-pair", action="store_true")
+    a = ap.parse_args()
+    print(report(hours=a.hours, top=a.top, by_pair=a.by_pair))
@@ -0,0 +1,177 @@
+"""Higher-timeframe regime features resampled from already-loaded base candles.
+
+Instead of asking freqtrade for extra informative timeframes (one more download
+and analysis per pair and timeframe), base-timeframe closes are bucketed into
+UTC-aligned 4h / 1d candles here. A bucket is only used from the base candle
+that closes it, i.e. base row `t` sees buckets with
+`bucket_open + bucket_len <= t + base_len` -- the same alignment as freqtrade's
+`merge_informative_pair`, so there is no lookahead.
+
+State is kept per (pair, base timeframe) and extended with the new candles of
+each call; a frame that does not continue the cached history reseeds it.
+"""
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+
+from agent.incremental_ta import EmaState
+
+_UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def timeframe_seconds(timeframe: str) -> int:
+    return int(timeframe[:-1]) * _UNIT_SECONDS[timeframe[-1]]
+
+
+def warmup_candles(base_timeframe: str, timeframes=("4h", "1d"), ema_period: int = 10) -> int:
+    """Base candles needed before every regime column is defined.
+
+    The slowest timeframe needs `ema_period` completed buckets, plus one bucket
+    because history starting mid-bucket skips the first one.
+    """
+    base_s = timeframe_seconds(base_timeframe)
+    slowest = max((timeframe_seconds(tf) for tf in timeframes if timeframe_seconds(tf) >= base_s), default=base_s)
+    return (ema_period + 1) * slowest // base_s
+
+
+class _HtfSeries:
+    """Completed buckets of one higher timeframe plus the bucket being filled."""
+
+    __slots__ = ("bucket_s", "base_s", "ema", "avail", "close", "ema_values", "cur_ts", "cur_close", "cur_valid", "cur_done")
+
+    def __init__(self, bucket_s: int, base_s: int, ema_period: int):
+        self.bucket_s = bucket_s
+        self.base_s = base_s
+        self.ema = EmaState(ema_period)
+        self.avail: list[int] = []  # first base-row open time that may use the bucket
+        self.close: list[float] = []
+        self.ema_values: list[float] = []
+        self.cur_ts: int | None = None
+        self.cur_close = float("nan")
+        self.cur_valid = False
+        self.cur_done = False
+
+    def _finish(self) -> None:
+        if self.cur_done:
+            return
+        self.cur_done = True
+        if self.cur_valid:  # the first bucket is skipped if history starts mid-bucket
+            self.avail.append(self.cur_ts + self.bucket_s - self.base_s)
+            self.close.append(self.cur_close)
+            self.ema_values.append(self.ema.update(self.cur_close))
+
+    def update(self, ts: int, close: float) -> None:
+        bucket = ts - ts % self.bucket_s
+        if bucket != self.cur_ts:
+            if self.cur_ts is not None:
+                self._finish()  # a later bucket started, even if its last base candle was missing
+            self.cur_valid = self.cur_ts is not None or ts == bucket
+            self.cur_ts, self.cur_done = bucket, False
+        self.cur_close = close
+        if ts + self.base_s >= bucket + self.bucket_s:
+            self._finish()
+
+    def trim(self, first_ts: int, slack: int = 256) -> None:
+        """Drop buckets no row at or after `first_ts` can use (batched, every `slack` buckets)."""
+        keep_from = int(np.searchsorted(np.asarray(self.avail, dtype=np.int64), first_ts, side="right")) - 1
+        if keep_from >= slack:
+            del self.avail[:keep_from], self.close[:keep_from], self.ema_values[:keep_from]
+
+    def aligned(self, ts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Latest completed (close, ema) usable by each base row open time in `ts`."""
+        idx = np.searchsorted(np.asarray(self.avail, dtype=np.int64), ts, side="right") - 1
+        ok = idx >= 0
+        close = np.full(len(ts), np.nan)
+        ema = np.full(len(ts), np.nan)
+        close[ok] = np.asarray(self.close)[idx[ok]]
+        ema[ok] = np.asarray(self.ema_values)[idx[ok]]
+        return close, ema
+
+
+class _PairState:
+    __slots__ = ("series", "last_ts")
+
+    def __init__(self, series: dict[str, _HtfSeries]):
+        self.series = series
+        self.last_ts: int | None = None
+
+
+class ResampleCache:
+    """Per-pair 4h / 1d regime features computed from base-timeframe candles.
+
+    `apply(pair, base_timeframe, dataframe)` returns, aligned to `dataframe`:
+    `close_{tf}`, `ema{period}_{tf}` and `regime_{tf}` (+1 close above EMA,
+    -1 below, 0 while undefined). Timeframes shorter than the base are NaN / 0.
+    """
+
+    def __init__(self, *, timeframes: tuple[str, ...] = ("4h", "1d"), ema_period: int = 10):
+        self.timeframes = tuple(timeframes)
+        self.ema_period = ema_period
+        self._states: dict[tuple[str, int], _PairState] = {}
+        self._lock = threading.Lock()
+
+    def _new_state(self, base_s: int) -> _PairState:
+        return _PairState(
+            {
+                tf: _HtfSeries(timeframe_seconds(tf), base_s, self.ema_period)
+                for tf in self.timeframes
+                if timeframe_seconds(tf) >= base_s
+            }
+        )
+
+    def apply(self, pair: str, base_timeframe: str, dataframe) -> dict[str, np.ndarray]:
+        base_s = timeframe_seconds(base_timeframe)
+        ts = dataframe["date"].values.astype("datetime64[s]").astype(np.int64)
+        close = dataframe["close"].to_numpy(dtype=float)
+        with self._lock:
+            st = self._states.get((pair, base_s))
+            start = 0
+            if st is not None and st.last_ts is not None and len(ts):
+                pos = int(np.searchsorted(ts, st.last_ts))
+                start = pos + 1 if pos < len(ts) and ts[pos] == st.last_ts else -1
+            if st is None or start < 0:
+                st = self._states[(pair, base_s)] = self._new_state(base_s)
+                start = 0
+            for i in range(start, len(ts)):
+                t, c = int(ts[i]), float(close[i])
+                for series in st.series.values():
+                    series.update(t, c)
+            if len(ts):
+                st.last_ts = int(ts[-1])
+            out: dict[str, np.ndarray] = {}
+            for tf in self.timeframes:
+                series = st.series.get(tf)
+                if series is None:
+                    htf_close = htf_ema = np.full(len(ts), np.nan)
+                else:
+                    htf_close, htf_ema = series.aligned(ts)
+                    if len(ts):
+                        series.trim(int(ts[0]))
+                out[f"close_{tf}"] = htf_close
+                out[f"ema{self.ema_period}_{tf}"] = htf_ema
+                with np.errstate(invalid="ignore"):
+                    out[f"regime_{tf}"] = np.nan_to_num(np.sign(htf_close - htf_ema), nan=0.0)
+            return out
+
+    def reset(self, pair: str | None = None) -> None:
+        with self._lock:
+            if pair is None:
+                self._states.clear()
+            else:
+                for key in [k for k in self._states if k[0] == pair]:
+                    del self._states[key]
+
+
+_CACHE: ResampleCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_resample_cache() -> ResampleCache:
+    """Process-wide cache shared by every strategy / caller resampling the same pairs."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ResampleCache()
+        return _CACHE
@@ -10,8 +10,17 @@ def load_runtime_news_summaries() -> list[str]:
         params = json.loads(PARAMS_PATH.read_text(encoding="utf-8"))
     except Exception:
         return []
+    news = params.get("news") or {}
+    if not news.get("enabled", True):
+        return []
     rt = params.get("runtime") or {}
     summaries = rt.get("news_summaries") or []
-    if isinstance(summaries, list):
+    if isinstance(summaries, list) and summaries:
         return [str(s) for s in summaries][:20]
-    return []
+    # Nothing saved from the UI yet: reuse recently checked cached summaries of the configured news URLs.
+    try:
+        from agent.article_cache import cached_summaries, news_max_age_s
+
+        return cached_summaries(news.get("urls") or [], max_age_s=news_max_age_s())[:20]
+    except Exception:
+        return []
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import time
+
 
 def _get_exchange_from_context(context: dict):
     # context expects: {"exchange": ccxt_instance}
@@ -9,6 +11,12 @@ def _get_exchange_from_context(context: dict):
     return ex
 
 
+def _feed_snapshot(context: dict):
+    # Optional agent.market_feed.MarketFeed; its readers return None when stale, so REST stays the fallback.
+    feed = (context or {}).get("market_feed")
+    return feed.snapshot if feed is not None else None
+
+
 def fetch_balance(*, args: dict, context: dict) -> dict:
     ex = _get_exchange_from_context(context)
     return ex.fetch_balance()
@@ -16,12 +24,20 @@ def fetch_balance(*, args: dict, context: dict) -> dict:
 
 def fetch_positions(*, args: dict, context: dict) -> list:
     ex = _get_exchange_from_context(context)
+    snap = _feed_snapshot(context)
+    positions = snap.positions() if snap is not None else None
+    if positions is not None:
+        return positions
     return ex.fetch_positions()
 
 
 def fetch_open_orders(*, args: dict, context: dict) -> list:
     ex = _get_exchange_from_context(context)
     symbol = args.get("symbol")
+    snap = _feed_snapshot(context)
+    orders = snap.open_orders(symbol) if snap is not None else None
+    if orders is not None:
+        return orders
     if symbol:
         return ex.fetch_open_orders(symbol)
     return ex.fetch_open_orders()
@@ -32,16 +48,65 @@ def fetch_ticker(*, args: dict, context: dict) -> dict:
     symbol = args.get("symbol")
     if not symbol:
         raise RuntimeError("symbol is required")
+    snap = _feed_snapshot(context)
+    if snap is not None:
+        ticker = snap.ticker(symbol)
+        if ticker is not None:
+            return ticker
+        context["market_feed"].watch([symbol])
     return ex.fetch_ticker(symbol)
 
 
+def _ms(value) -> int | None:
+    """Epoch ms from an int / numeric string / ISO-8601 string."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)) or str(value).isdigit():
+        return int(value)
+    import pandas as pd
+
+    ts = pd.Timestamp(str(value))
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return int(ts.timestamp() * 1000)
+
+
 def fetch_ohlcv(*, args: dict, context: dict) -> list:
+    """Candles for `symbol` / `timeframe`: the last `limit`, or the [since, until] range (ms or ISO dates).
+
+    Long ranges are paged concurrently (agent.tools.ohlcv_fetcher); closed candles are
+    served from the local candle store when it is enabled, with the forming candle on top.
+    """
     ex = _get_exchange_from_context(context)
     symbol = args.get("symbol")
     timeframe = args.get("timeframe")
     limit = int(args.get("limit") or 200)
+    since, until = _ms(args.get("since")), _ms(args.get("until"))
     if not symbol:
         raise RuntimeError("symbol is required")
     if not timeframe:
         raise RuntimeError("timeframe is required")
-    return ex.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+    from agent.candle_store import (
+        DEFAULT_PAGE_LIMIT,
+        candle_cache_enabled,
+        fetch_ohlcv_cached,
+        store_supports,
+        timeframe_ms,
+    )
+    from agent.tools.ohlcv_fetcher import fetch_ohlcv_range
+
+    if not store_supports(timeframe):
+        # Calendar candles (1M, ...) have no fixed length to page or cache by: plain REST call.
+        if until is not None:
+            rows = ex.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit) or []
+            return [r for r in rows if r[0] <= until]
+        return ex.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
+    if candle_cache_enabled():
+        return fetch_ohlcv_cached(ex, symbol, timeframe, limit=limit, since=since, until=until, fetch_range=fetch_ohlcv_range)
+    if since is None and until is None and limit <= DEFAULT_PAGE_LIMIT:
+        return ex.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+    until = until if until is not None else int(time.time() * 1000)
+    if since is None:
+        # The last `limit` candles up to `until`, whatever the exchange's candle phase.
+        return fetch_ohlcv_range(ex, symbol, timeframe, until - limit * timeframe_ms(timeframe) + 1, until)
+    return fetch_ohlcv_range(ex, symbol, timeframe, since, until)
@@ -0,0 +1,150 @@
+"""Shared, pre-warmed ccxt exchange instances.
+
+One configured instance is kept per (exchange, credentials, defaultType) and
+handed to every caller (chat tools, tool execution, dashboard), so the
+connection pool and the loaded markets are reused. The markets payload -- one
+of the heaviest OKX calls -- is persisted to `agent/cache/markets/` and reused
+across restarts while it is younger than AGENT_MARKETS_TTL_S.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[2]
+MARKETS_DIR = ROOT / "agent" / "cache" / "markets"
+
+_SAFE_RE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def markets_ttl_s() -> float:
+    try:
+        return max(0.0, float(os.getenv("AGENT_MARKETS_TTL_S", "21600")))
+    except ValueError:
+        return 21600.0
+
+
+def instance_key(ex_cfg: dict, default_type: str) -> str:
+    # Credentials only enter the key as a digest; the cache never holds them in plain text.
+    raw = json.dumps(
+        [
+            str(ex_cfg.get("name") or "okx"),
+            ex_cfg.get("key"),
+            ex_cfg.get("secret"),
+            ex_cfg.get("password"),
+            ex_cfg.get("ccxt_config") or {},
+            default_type,
+        ],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _markets_path(exchange_id: str, default_type: str) -> Path:
+    return MARKETS_DIR / f"{_SAFE_RE.sub('_', exchange_id)}_{_SAFE_RE.sub('_', default_type)}.json"
+
+
+def _read_markets(path: Path, ttl_s: float) -> dict | None:
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    if time.time() - float(payload.get("ts") or 0) > ttl_s or not payload.get("markets"):
+        return None
+    return payload
+
+
+def _write_markets(path: Path, ex) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        payload = {"ts": time.time(), "markets": ex.markets, "currencies": getattr(ex, "currencies", None)}
+        tmp.write_text(json.dumps(payload, default=str), encoding="utf-8")
+        os.replace(tmp, path)
+    except Exception:
+        logger.warning("could not persist markets to %s", path, exc_info=True)
+
+
+class _Entry:
+    __slots__ = ("exchange", "default_type", "lock", "markets_ts")
+
+    def __init__(self, exchange, default_type: str):
+        self.exchange = exchange
+        self.default_type = default_type
+        self.lock = threading.Lock()
+        self.markets_ts = 0.0
+
+
+_INSTANCES: dict[str, _Entry] = {}
+_INSTANCES_LOCK = threading.Lock()
+
+
+def _ensure_markets(entry: _Entry, ttl_s: float) -> None:
+    """Warm markets from disk, else load them once from the exchange and persist them."""
+    with entry.lock:
+        if entry.markets_ts and time.time() - entry.markets_ts <= ttl_s:
+            return
+        ex = entry.exchange
+        path = _markets_path(ex.id, entry.default_type)
+        payload = None if entry.markets_ts else _read_markets(path, ttl_s)
+        if payload is not None:
+            ex.set_markets(payload["markets"], payload.get("currencies"))
+            entry.markets_ts = float(payload["ts"])
+            return
+        ex.load_markets(reload=bool(entry.markets_ts))
+        entry.markets_ts = time.time()
+        _write_markets(path, ex)
+
+
+def build_exchange(ex_cfg: dict, default_type: str = "swap", *, pro: bool = False):
+    """A new, uncached instance; `pro` builds the ccxt.pro (asyncio / WebSocket) class."""
+    if pro:
+        import ccxt.pro as ccxt  # type: ignore
+    else:
+        import ccxt  # type: ignore
+
+    exchange_cls = getattr(ccxt, str(ex_cfg.get("name") or "okx"))
+    ex = exchange_cls(
+        {
+            "apiKey": ex_cfg.get("key"),
+            "secret": ex_cfg.get("secret"),
+            "password": ex_cfg.get("password"),
+            **(ex_cfg.get("ccxt_config") or {}),
+        }
+    )
+    ex.options = {**getattr(ex, "options", {}), "defaultType": default_type}
+    return ex
+
+
+def get_exchange(ex_cfg: dict, *, default_type: str = "swap", warm: bool = True):
+    """Cached ccxt instance for `ex_cfg` ({name, key, secret, password, ccxt_config}).
+
+    With `warm`, markets are loaded (from the disk cache when fresh) before the
+    instance is returned; a failure there is logged and left to ccxt's lazy load.
+    """
+    key = instance_key(ex_cfg, default_type)
+    with _INSTANCES_LOCK:
+        entry = _INSTANCES.get(key)
+        if entry is None:
+            entry = _INSTANCES[key] = _Entry(build_exchange(ex_cfg, default_type), default_type)
+    if warm:
+        try:
+            _ensure_markets(entry, markets_ttl_s())
+        except Exception:
+            logger.warning("markets warm-up failed for %s", entry.exchange.id, exc_info=True)
+    return entry.exchange
+
+
+def clear_exchanges() -> None:
+    """Forget cached instances (e.g. after credentials change); the disk markets cache is kept."""
+    with _INSTANCES_LOCK:
+        _INSTANCES.clear()
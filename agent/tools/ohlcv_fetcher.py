@@ -0,0 +1,173 @@
+"""Paginated, concurrent OHLCV history fetching within the exchange rate limit.
+
+A [since, until] range of candle open times is split into exchange-sized pages
+that are fetched on a small thread pool. A shared token bucket keeps the request
+rate at or below the exchange's (`rateLimit` ms between requests, unless
+overridden). Pages are yielded as they arrive; `fetch_ohlcv_range` stitches them
+and validates the result (sorted, deduplicated, timeframe-aligned).
+
+    python -m agent.tools.ohlcv_fetcher BTC/USDT:USDT 1h --days 90
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator
+
+from agent.candle_store import DEFAULT_PAGE_LIMIT, timeframe_ms
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `acquire()` blocks until a request may be sent."""
+
+    def __init__(self, rate_per_s: float, burst: int = 1):
+        self.rate = max(0.01, rate_per_s)
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def default_rate_per_s(ex) -> float:
+    """AGENT_OHLCV_RATE, else the exchange's own limit (ccxt `rateLimit` is ms per request)."""
+    override = _env_float("AGENT_OHLCV_RATE", 0.0)
+    if override > 0:
+        return override
+    rate_limit_ms = float(getattr(ex, "rateLimit", 0) or 0)
+    return 1000.0 / rate_limit_ms if rate_limit_ms > 0 else 10.0
+
+
+def plan_pages(since: int, until: int, step: int, page_limit: int) -> list[tuple[int, int]]:
+    """Tile [since, until] (inclusive ms) into contiguous ranges holding at most `page_limit` candles.
+
+    Pages are not snapped to a candle grid, so candles whose open times are offset
+    from the epoch (weekly, UTC+8 daily) still fall into exactly one page.
+    """
+    span = step * page_limit
+    return [(start, min(until, start + span - 1)) for start in range(since, until + 1, span)]
+
+
+def _fetch_page(ex, symbol: str, timeframe: str, start: int, end: int, step: int, page_limit: int, bucket: TokenBucket) -> list:
+    # Exchanges may cap a response below page_limit; keep paging inside this range until it is exhausted.
+    out: list = []
+    cursor = start
+    while cursor <= end:
+        bucket.acquire()
+        rows = ex.fetch_ohlcv(symbol, timeframe=timeframe, since=cursor, limit=page_limit) or []
+        rows = [r for r in rows if cursor <= r[0] <= end]
+        if not rows:
+            break
+        out.extend(rows)
+        cursor = int(max(r[0] for r in rows)) + step
+    return out
+
+
+def iter_ohlcv_pages(
+    ex,
+    symbol: str,
+    timeframe: str,
+    since: int,
+    until: int,
+    *,
+    page_limit: int = DEFAULT_PAGE_LIMIT,
+    max_workers: int | None = None,
+    rate_per_s: float | None = None,
+) -> Iterator[tuple[tuple[int, int], list]]:
+    """Yield ((page_start, page_end), rows) in completion order."""
+    step = timeframe_ms(timeframe)
+    pages = plan_pages(since, until, step, page_limit)
+    if not pages:
+        return
+    workers = max_workers or int(_env_float("AGENT_OHLCV_WORKERS", 4))
+    bucket = TokenBucket(rate_per_s or default_rate_per_s(ex), burst=max(1, workers))
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pages))), thread_name_prefix="ohlcv") as pool:
+        futures = {
+            pool.submit(_fetch_page, ex, symbol, timeframe, a, b, step, page_limit, bucket): (a, b) for a, b in pages
+        }
+        for fut in as_completed(futures):
+            yield futures[fut], fut.result()
+
+
+def stitch_pages(pages: list[list], step: int) -> list:
+    """Concatenate pages into one ascending, deduplicated series; later duplicates are dropped.
+
+    Every candle must sit on the grid of the first one (same phase modulo `step`).
+    """
+    by_ts: dict[int, list] = {}
+    for rows in pages:
+        for r in rows:
+            ts = int(r[0])
+            by_ts.setdefault(ts, [ts, *r[1:]])
+    out = [by_ts[ts] for ts in sorted(by_ts)]
+    if out:
+        phase = out[0][0] % step
+        for r in out:
+            if (r[0] - phase) % step:
+                raise RuntimeError(f"candle timestamp {r[0]} is off the {step} ms grid of the first candle")
+    if any(b[0] <= a[0] for a, b in zip(out, out[1:])):
+        raise RuntimeError("stitched candles are not strictly increasing")
+    return out
+
+
+def fetch_ohlcv_range(ex, symbol: str, timeframe: str, since: int, until: int, *, on_page=None, **kwargs) -> list:
+    """All candles in [since, until]; `on_page(page_range, rows)` is called as each page arrives."""
+    pages = []
+    for page_range, rows in iter_ohlcv_pages(ex, symbol, timeframe, since, until, **kwargs):
+        if on_page is not None:
+            on_page(page_range, rows)
+        pages.append(rows)
+    return stitch_pages(pages, timeframe_ms(timeframe))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from agent.candle_store import fetch_ohlcv_cached
+    from agent.tools.exchange_factory import get_exchange
+
+    ap = argparse.ArgumentParser(description="Download OHLCV history into the local candle store")
+    ap.add_argument("symbol")
+    ap.add_argument("timeframe")
+    ap.add_argument("--days", type=float, default=30.0)
+    ap.add_argument("--exchange", default="okx")
+    ap.add_argument("--type", default="swap", help="ccxt defaultType")
+    a = ap.parse_args()
+
+    exchange = get_exchange({"name": a.exchange, "ccxt_config": {"enableRateLimit": False}}, default_type=a.type)
+    end = int(time.time() * 1000)
+    start = end - int(a.days * 86400 * 1000)
+    t0 = time.perf_counter()
+
+    def _progress(page_range, rows):
+        print(f"page {page_range[0]}..{page_range[1]}: {len(rows)} candles")
+
+    rows = fetch_ohlcv_cached(
+        exchange,
+        a.symbol,
+        a.timeframe,
+        since=start,
+        until=end,
+        fetch_range=lambda ex, s, tf, lo, hi: fetch_ohlcv_range(ex, s, tf, lo, hi, on_page=_progress),
+    )
+    print(f"{len(rows)} candles in {time.perf_counter() - t0:.1f}s")
@@ -0,0 +1,157 @@
+"""USDT valuation of held currencies with targeted ticker requests.
+
+Each currency is resolved to one quote market from the exchange's (cached)
+markets, and only those tickers are requested, one `fetch_ticker(symbol)`
+each (in a small thread pool). `fetch_tickers(symbols)` is not used: on OKX
+it sends only `instType` and downloads every ticker of that type. Prices are
+cached for AGENT_PRICE_TTL_S seconds; a live WebSocket snapshot
+(agent.market_feed), when given, is consulted first.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def price_ttl_s() -> float:
+    try:
+        return max(0.0, float(os.getenv("AGENT_PRICE_TTL_S", "15")))
+    except ValueError:
+        return 15.0
+
+
+def resolve_market(markets: dict, ccy: str, quote: str = "USDT") -> tuple[str, bool] | None:
+    """(symbol, inverse) pricing `ccy` in `quote`; `inverse` means the ticker is quote/ccy."""
+    ccy = ccy.upper()
+    for symbol, inverse in (
+        (f"{ccy}/{quote}:{quote}", False),
+        (f"{ccy}/{quote}", False),
+        (f"{quote}/{ccy}:{quote}", True),
+        (f"{quote}/{ccy}", True),
+    ):
+        m = markets.get(symbol)
+        if m is not None and m.get("active") is not False:
+            return symbol, inverse
+    return None
+
+
+def _last(ticker) -> float | None:
+    if not isinstance(ticker, dict):
+        return None
+    last = ticker.get("last") or ticker.get("close")
+    try:
+        return float(last) if last else None
+    except (TypeError, ValueError):
+        return None
+
+
+class PriceCache:
+    """symbol -> last price, per exchange, each entry valid for `ttl_s` seconds."""
+
+    def __init__(self):
+        self._prices: dict[tuple[str, str], tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, exchange_id: str, symbol: str, ttl_s: float) -> float | None:
+        with self._lock:
+            item = self._prices.get((exchange_id, symbol))
+        if item is None or time.time() - item[0] > ttl_s:
+            return None
+        return item[1]
+
+    def put(self, exchange_id: str, symbol: str, price: float) -> None:
+        with self._lock:
+            self._prices[(exchange_id, symbol)] = (time.time(), price)
+
+
+_CACHE: PriceCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_price_cache() -> PriceCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = PriceCache()
+        return _CACHE
+
+
+def price_workers() -> int:
+    try:
+        return max(1, int(os.getenv("AGENT_PRICE_WORKERS", "4")))
+    except ValueError:
+        return 4
+
+
+def _fetch_last(exchange, symbol: str) -> float | None:
+    try:
+        return _last(exchange.fetch_ticker(symbol))
+    except Exception:
+        logger.warning("fetch_ticker failed for %s", symbol, exc_info=True)
+        return None
+
+
+def _fetch_last_prices(exchange, symbols: list[str]) -> dict[str, float]:
+    if len(symbols) == 1:
+        lasts = [_fetch_last(exchange, symbols[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(price_workers(), len(symbols)), thread_name_prefix="price") as pool:
+            lasts = list(pool.map(lambda s: _fetch_last(exchange, s), symbols))
+    return {s: last for s, last in zip(symbols, lasts) if last}
+
+
+def usdt_prices(exchange, currencies, *, snapshot=None, cache: PriceCache | None = None, ttl_s: float | None = None) -> dict[str, float | None]:
+    """USDT per unit of each currency (None when it has no USDT market or no price)."""
+    cache = cache or get_price_cache()
+    ttl = price_ttl_s() if ttl_s is None else ttl_s
+    out: dict[str, float | None] = {}
+    wanted: dict[str, tuple[str, bool]] = {}
+    markets = {}
+    if exchange is not None:
+        try:
+            markets = exchange.markets or exchange.load_markets()
+        except Exception:
+            logger.warning("load_markets failed; currencies other than USDT stay unvalued", exc_info=True)
+    for ccy in currencies:
+        if ccy.upper() == "USDT":
+            out[ccy] = 1.0
+            continue
+        out[ccy] = None
+        resolved = resolve_market(markets, ccy) if markets else None
+        if resolved is not None:
+            wanted[ccy] = resolved
+    if not wanted:
+        return out
+
+    ex_id = getattr(exchange, "id", "") or ""
+    prices: dict[str, float] = {}
+    live = snapshot.tickers({s for s, _ in wanted.values()}) if snapshot is not None else {}
+    for s, t in live.items():
+        last = _last(t)
+        if last:
+            prices[s] = last
+    missing = []
+    for s, _ in wanted.values():
+        if s in prices:
+            continue
+        cached = cache.get(ex_id, s, ttl)
+        if cached is not None:
+            prices[s] = cached
+        elif s not in missing:
+            missing.append(s)
+    if missing:
+        fetched = _fetch_last_prices(exchange, missing)
+        for s, last in fetched.items():
+            cache.put(ex_id, s, last)
+        prices.update(fetched)
+
+    for ccy, (s, inverse) in wanted.items():
+        p = prices.get(s)
+        if p:
+            out[ccy] = 1.0 / p if inverse else p
+    return out
@@ -12,6 +12,7 @@ ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
 
 from agent.freqtrade_api import get_json, load_api_auth_from_config
+from agent.tools.exchange_factory import get_exchange
 from generate_config import generate_config
 
 
@@ -26,6 +27,17 @@ def _load_exchange_credentials(config_path: Path) -> dict:
         "ccxt_config": ex.get("ccxt_config") or {},
     }
 
+
+def _market_feed(config_path: Path, symbols=()):
+    # Streaming tickers/positions/orders (AGENT_WS_FEED=1); None keeps everything on REST.
+    try:
+        from agent.market_feed import get_market_feed
+
+        return get_market_feed(_load_exchange_credentials(config_path), default_type="swap", symbols=symbols)
+    except Exception:
+        return None
+
+
 PARAMS_PATH = ROOT / "app" / "params.json"
 BASE_CONFIG_PATH = ROOT / "user_data" / "config.json"
 GEN_CONFIG_PATH = ROOT / "user_data" / "config.generated.json"
@@ -172,43 +184,33 @@ def _redact(s: str | None) -> str:
     return s[:4] + "..." + s[-4:]
 
 
-def _okx_balance_table(bal: dict, *, exchange=None, dust_usdt: float = 0.5) -> pd.DataFrame:
+def _okx_balance_table(bal: dict, *, exchange=None, snapshot=None, dust_usdt: float = 0.5) -> pd.DataFrame:
     # ccxt balance shape: {'free': {...}, 'used': {...}, 'total': {...}, 'info': ...}
     free = bal.get("free") or {}
     used = bal.get("used") or {}
     total = bal.get("total") or {}
 
-    # Optional USDT valuation via tickers.
-    tickers = {}
+    # Optional USDT valuation: only the held currencies' tickers (agent.valuation).
+    currencies = sorted(set(list(free.keys()) + list(used.keys()) + list(total.keys())))
+    prices = {}
     if exchange is not None:
         try:
-            tickers = exchange.fetch_tickers()
+            from agent.valuation import usdt_prices
+
+            prices = usdt_prices(exchange, currencies, snapshot=snapshot)
         except Exception:
-            tickers = {}
+            prices = {}
 
     def _to_usdt(ccy: str, amount: float) -> float | None:
         if amount == 0:
             return 0.0
         if ccy.upper() == "USDT":
             return float(amount)
-        if not tickers:
-            return None
-        # Try direct markets first.
-        for sym in (f"{ccy}/USDT:USDT", f"{ccy}/USDT"):
-            t = tickers.get(sym)
-            last = (t or {}).get("last") if isinstance(t, dict) else None
-            if last:
-                return float(amount) * float(last)
-        # Try inverse markets.
-        for sym in (f"USDT/{ccy}:USDT", f"USDT/{ccy}"):
-            t = tickers.get(sym)
-            last = (t or {}).get("last") if isinstance(t, dict) else None
-            if last:
-                return float(amount) / float(last)
-        return None
+        price = prices.get(ccy)
+        return float(amount) * price if price else None
 
     rows = []
-    for ccy in sorted(set(list(free.keys()) + list(used.keys()) + list(total.keys()))):
+    for ccy in currencies:
         try:
             f = float(free.get(ccy) or 0)
             u = float(used.get(ccy) or 0)
@@ -384,6 +386,10 @@ with agent_col3:
     params = load_params()
     agent_conf = params.setdefault("agent", {})
     agent_conf["llm_api_url"] = st.text_input("API 完整地址", value=str(agent_conf.get("llm_api_url", "https://api.anthropic.com")), placeholder="https://api.anthropic.com")
+    providers = ["auto", "anthropic", "openai", "mock"]
+    agent_conf["llm_provider"] = st.selectbox(
+        "接口协议", providers, index=providers.index(agent_conf.get("llm_provider", "auto")) if agent_conf.get("llm_provider", "auto") in providers else 0
+    )
     agent_conf["llm_model"] = st.text_input("模型名称", value=str(agent_conf.get("llm_model", "claude-3-5-sonnet-latest")), placeholder="claude-3-5-sonnet-latest")
     agent_conf["llm_api_key"] = st.text_input("API 秘钥", value=str(agent_conf.get("llm_api_key", "")), placeholder="输入 API Key", type="password")
     if st.button("保存 Agent 配置", key="agent_conf_save"):
@@ -432,19 +438,7 @@ with chat_col:
         # ccxt exchange (read-only tools)
         ccxt_ex = None
         try:
-            ex_cfg = _load_exchange_credentials(config_path)
-            import ccxt  # type: ignore
-
-            exchange_cls = getattr(ccxt, str(ex_cfg.get("name") or "okx"))
-            ccxt_ex = exchange_cls(
-                {
-                    "apiKey": ex_cfg.get("key"),
-                    "secret": ex_cfg.get("secret"),
-                    "password": ex_cfg.get("password"),
-                    **(ex_cfg.get("ccxt_config") or {}),
-                }
-            )
-            ccxt_ex.options = {**getattr(ccxt_ex, "options", {}), "defaultType": "swap"}
+            ccxt_ex = get_exchange(_load_exchange_credentials(config_path), default_type="swap")
         except Exception:
             ccxt_ex = None
 
@@ -452,11 +446,18 @@ with chat_col:
             "mode": "analysis",
             "freqtrade_auth": ft_auth,
             "exchange": ccxt_ex,
+            "market_feed": _market_feed(config_path, trading.get("pairs", [])),
             "pairs": trading.get("pairs", []),
             "timeframe": trading.get("timeframe", "1h"),
         }
 
-        user_message(agent_session_id, user_input.strip(), context={"pairs": ctx["pairs"], "timeframe": ctx["timeframe"]})
+        stream_box = st.empty()
+        user_message(
+            agent_session_id,
+            user_input.strip(),
+            context={"pairs": ctx["pairs"], "timeframe": ctx["timeframe"]},
+            on_message=lambda t: stream_box.markdown(f"**Agent：** {t}"),
+        )
         st.rerun()
 
 with plan_col:
@@ -488,33 +489,31 @@ with plan_col:
 
             ccxt_ex = None
             try:
-                ex_cfg = _load_exchange_credentials(config_path)
-                import ccxt  # type: ignore
-
-                exchange_cls = getattr(ccxt, str(ex_cfg.get("name") or "okx"))
-                ccxt_ex = exchange_cls(
-                    {
-                        "apiKey": ex_cfg.get("key"),
-                        "secret": ex_cfg.get("secret"),
-                        "password": ex_cfg.get("password"),
-                        **(ex_cfg.get("ccxt_config") or {}),
-                    }
-                )
-                ccxt_ex.options = {**getattr(ccxt_ex, "options", {}), "defaultType": "swap"}
+                ccxt_ex = get_exchange(_load_exchange_credentials(config_path), default_type="swap")
             except Exception:
                 ccxt_ex = None
 
-            tool_ctx = {"freqtrade_auth": ft_auth, "exchange": ccxt_ex}
+            tool_ctx = {
+                "freqtrade_auth": ft_auth,
+                "exchange": ccxt_ex,
+                "market_feed": _market_feed(config_path, trading.get("pairs", [])),
+            }
             execute_approved_tool_calls(agent_session_id, context=tool_ctx)
             st.rerun()
 
     chart = get_latest_chart(agent_session_id)
-    if chart and isinstance(chart.get("content"), dict) and "plotly" in chart["content"]:
-        import plotly.graph_objects as go
+    content = chart.get("content") if chart else None
+    if isinstance(content, dict) and ("chart_spec" in content or "plotly" in content):
+        if "chart_spec" in content:
+            from agent.charting import plotly_figure
 
-        fig = go.Figure(chart["content"]["plotly"])
+            fig = plotly_figure(content["chart_spec"])
+        else:  # artifacts stored before chart specs
+            import plotly.graph_objects as go
+
+            fig = go.Figure(content["plotly"])
         st.plotly_chart(fig, use_container_width=True)
-        inds = chart["content"].get("indicators")
+        inds = content.get("indicators")
         if isinstance(inds, dict):
             with st.expander("指标摘要", expanded=False):
                 st.json(inds)
@@ -528,6 +527,49 @@ with plan_col:
                 st.rerun()
 
 
+def _llm_stats(df: pd.DataFrame, by: str) -> pd.DataFrame:
+    df = df.assign(tokens=df["input_tokens"].fillna(0) + df["output_tokens"].fillna(0))
+    g = df.groupby(by)
+    out = pd.DataFrame(
+        {
+            "calls": g.size(),
+            "p50_ms": g["latency_ms"].quantile(0.5),
+            "p95_ms": g["latency_ms"].quantile(0.95),
+            "tokens_per_call": g["tokens"].mean(),
+            "input_tokens": g["input_tokens"].mean(),
+            "output_tokens": g["output_tokens"].mean(),
+            "parse_fail_rate": g["parse_failed"].mean(),
+            "fallback_rate": g["fallback"].mean(),
+        }
+    )
+    return out.round(3).sort_values("calls", ascending=False)
+
+
+with st.expander("LLM 调用统计（延迟 / tokens / 回退率）", expanded=False):
+    from agent.event_log import load_llm_calls
+
+    hours = st.selectbox("时间窗口（小时）", [1, 6, 24, 24 * 7], index=2, key="llm_stats_hours")
+    llm_df = pd.DataFrame(load_llm_calls(since_ts=time.time() - hours * 3600))
+    if llm_df.empty:
+        st.caption("暂无 LLM 调用记录")
+    else:
+        k1, k2, k3, k4 = st.columns(4)
+        k1.metric("调用次数", str(len(llm_df)))
+        k2.metric("p50 延迟(ms)", f"{llm_df['latency_ms'].quantile(0.5):,.0f}")
+        k3.metric("p95 延迟(ms)", f"{llm_df['latency_ms'].quantile(0.95):,.0f}")
+        k4.metric("回退率", f"{llm_df['fallback'].mean():.1%}")
+        st.markdown("**按调用方**")
+        st.dataframe(_llm_stats(llm_df, "caller"), use_container_width=True)
+        policy_df = llm_df[llm_df["caller"] == "policy"]
+        if not policy_df.empty:
+            st.markdown("**入场决策（按交易对）**")
+            st.dataframe(_llm_stats(policy_df, "pair"), use_container_width=True)
+        errors = llm_df[llm_df["error"].fillna("") != ""]
+        if not errors.empty:
+            st.markdown("**最近错误**")
+            st.dataframe(errors[["ts", "caller", "pair", "error"]].head(20), use_container_width=True)
+
+
 api_data = {}
 api_error = None
 
@@ -619,32 +661,24 @@ else:
             try:
                 config_path = GEN_CONFIG_PATH if api_config_choice == "config.generated.json" else BASE_CONFIG_PATH
                 ex_cfg = _load_exchange_credentials(config_path)
-
-                import ccxt  # type: ignore
-
-                exchange_cls = getattr(ccxt, str(ex_cfg.get("name") or "okx"))
-                exchange = exchange_cls(
-                    {
-                        "apiKey": ex_cfg.get("key"),
-                        "secret": ex_cfg.get("secret"),
-                        "password": ex_cfg.get("password"),
-                        **(ex_cfg.get("ccxt_config") or {}),
-                    }
-                )
                 # Make sure we query swaps in futures mode.
-                exchange.options = {**getattr(exchange, "options", {}), "defaultType": "swap"}
+                exchange = get_exchange(ex_cfg, default_type="swap")
 
                 okx_bal = exchange.fetch_balance()
-                okx_positions = []
-                okx_open_orders = []
-                try:
-                    okx_positions = exchange.fetch_positions()
-                except Exception:
-                    okx_positions = []
-                try:
-                    okx_open_orders = exchange.fetch_open_orders()
-                except Exception:
-                    okx_open_orders = []
+                # Positions / open orders come from the WebSocket snapshot when it is live.
+                feed = _market_feed(config_path, trading.get("pairs", []))
+                okx_positions = feed.snapshot.positions() if feed is not None else None
+                okx_open_orders = feed.snapshot.open_orders() if feed is not None else None
+                if okx_positions is None:
+                    try:
+                        okx_positions = exchange.fetch_positions()
+                    except Exception:
+                        okx_positions = []
+                if okx_open_orders is None:
+                    try:
+                        okx_open_orders = exchange.fetch_open_orders()
+                    except Exception:
+                        okx_open_orders = []
 
                 st.session_state["okx_snapshot"] = {
                     "ex_id": exchange.id,
@@ -667,27 +701,21 @@ else:
             dust_usdt = 0.0 if show_dust else 0.5
 
             # --- Summary (WIP) ---
-            # Rebuild exchange only for ticker valuation.
+            # Same shared instance as the snapshot (markets already loaded).
             exchange_for_ticker = None
             try:
                 config_path = GEN_CONFIG_PATH if api_config_choice == "config.generated.json" else BASE_CONFIG_PATH
-                ex_cfg = _load_exchange_credentials(config_path)
-                import ccxt  # type: ignore
-
-                exchange_cls = getattr(ccxt, str(ex_cfg.get("name") or "okx"))
-                exchange_for_ticker = exchange_cls(
-                    {
-                        "apiKey": ex_cfg.get("key"),
-                        "secret": ex_cfg.get("secret"),
-                        "password": ex_cfg.get("password"),
-                        **(ex_cfg.get("ccxt_config") or {}),
-                    }
-                )
-                exchange_for_ticker.options = {**getattr(exchange_for_ticker, "options", {}), "defaultType": "swap"}
+                exchange_for_ticker = get_exchange(_load_exchange_credentials(config_path), default_type="swap")
             except Exception:
                 exchange_for_ticker = None
 
-            bal_df = _okx_balance_table(okx_bal, exchange=exchange_for_ticker, dust_usdt=dust_usdt)
+            feed = _market_feed(config_path)
+            bal_df = _okx_balance_table(
+                okx_bal,
+                exchange=exchange_for_ticker,
+                snapshot=feed.snapshot if feed is not None else None,
+                dust_usdt=dust_usdt,
+            )
 
             total_free = float(bal_df["free"].sum()) if not bal_df.empty else 0.0
             total_used = float(bal_df["used"].sum()) if not bal_df.empty else 0.0
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Make the repo packages (agent/, app/) importable when running plain `pytest`.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
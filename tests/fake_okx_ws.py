@@ -0,0 +1,145 @@
+"""Minimal local stand-in for the OKX v5 WebSocket API (public tickers, private positions / orders)."""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+
+import websockets
+
+
+def _ms() -> str:
+    return str(int(time.time() * 1000))
+
+
+def ticker_msg(inst_id: str, last: float) -> dict:
+    return {
+        "arg": {"channel": "tickers", "instId": inst_id},
+        "data": [
+            {
+                "instType": "SWAP",
+                "instId": inst_id,
+                "last": str(last),
+                "askPx": str(last + 0.1),
+                "bidPx": str(last - 0.1),
+                "open24h": str(last),
+                "high24h": str(last),
+                "low24h": str(last),
+                "vol24h": "1",
+                "volCcy24h": "1",
+                "ts": _ms(),
+            }
+        ],
+    }
+
+
+def position_msg(inst_id: str, pos: float, side: str = "long") -> dict:
+    return {
+        "arg": {"channel": "positions", "instType": "ANY"},
+        "data": [
+            {
+                "instId": inst_id,
+                "instType": "SWAP",
+                "pos": str(pos),
+                "posSide": side,
+                "mgnMode": "cross",
+                "avgPx": "100",
+                "upl": "0",
+                "lever": "3",
+                "cTime": _ms(),
+                "uTime": _ms(),
+            }
+        ],
+    }
+
+
+def order_msg(inst_id: str, ord_id: str, state: str) -> dict:
+    return {
+        "arg": {"channel": "orders", "instType": "ANY"},
+        "data": [
+            {
+                "instId": inst_id,
+                "instType": "SWAP",
+                "ordId": ord_id,
+                "clOrdId": "",
+                "px": "99",
+                "sz": "1",
+                "accFillSz": "1" if state == "filled" else "0",
+                "side": "buy",
+                "posSide": "long",
+                "ordType": "limit",
+                "state": state,
+                "cTime": _ms(),
+                "uTime": _ms(),
+            }
+        ],
+    }
+
+
+class FakeOkxWs:
+    """Serves ws://127.0.0.1:<port>/ws/v5/{public,private} on a background thread.
+
+    Ticker subscriptions are answered with `self.prices`; `push(msg)` sends a
+    message to every connection subscribed to the message's channel.
+    """
+
+    def __init__(self, prices: dict[str, float] | None = None):
+        self.prices = dict(prices or {})
+        self.port: int | None = None
+        self._subs: dict[str, set] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._ready = threading.Event()
+        self._stop: asyncio.Future | None = None
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._main()), daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}/ws/v5"
+
+    def start(self) -> "FakeOkxWs":
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set_result, None)
+        self._thread.join(5)
+
+    def push(self, msg: dict) -> None:
+        asyncio.run_coroutine_threadsafe(self._broadcast(msg), self._loop).result(5)
+
+    def subscribed(self, channel: str) -> bool:
+        return bool(self._subs.get(channel))
+
+    async def _broadcast(self, msg: dict) -> None:
+        for ws in list(self._subs.get(msg["arg"]["channel"], ())):
+            await ws.send(json.dumps(msg))
+
+    async def _handler(self, ws) -> None:
+        try:
+            async for raw in ws:
+                if raw == "ping":
+                    await ws.send("pong")
+                    continue
+                req = json.loads(raw)
+                if req.get("op") == "login":
+                    await ws.send(json.dumps({"event": "login", "code": "0", "msg": ""}))
+                    continue
+                for arg in req.get("args", []):
+                    await ws.send(json.dumps({"event": "subscribe", "arg": arg}))
+                    self._subs.setdefault(arg["channel"], set()).add(ws)
+                    if arg["channel"] == "tickers" and arg.get("instId") in self.prices:
+                        await ws.send(json.dumps(ticker_msg(arg["instId"], self.prices[arg["instId"]])))
+        finally:
+            for subs in self._subs.values():
+                subs.discard(ws)
+
+    async def _main(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stop = self._loop.create_future()
+        async with websockets.serve(self._handler, "127.0.0.1", 0) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await self._stop
@@ -0,0 +1,56 @@
+import json
+import time
+
+import pytest
+
+from agent import article_cache, runtime
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    path = tmp_path / "articles.sqlite"
+    monkeypatch.setattr(article_cache, "DB_PATH", path)
+    return path
+
+
+def _save(url: str, summary: str) -> None:
+    article_cache.save_article(url, etag=None, last_modified=None, body_hash="h", title="t", text="x", summary=summary)
+
+
+def _age(db, url: str, seconds: float) -> None:
+    from sqlite_utils import Database
+
+    Database(db)["articles"].update(article_cache.normalize_url(url), {"checked_ts": time.time() - seconds})
+
+
+def test_normalize_url():
+    assert article_cache.normalize_url("HTTPS://www.Example.com:443/a/?b=2&a=1&utm_source=x#f") == "https://example.com/a?a=1&b=2"
+
+
+def test_cached_summaries_respects_max_age(db):
+    _save("https://a.com/1", "fresh")
+    _save("https://a.com/2", "old")
+    _age(db, "https://a.com/2", 7 * 86400)
+    urls = ["https://a.com/2", "https://a.com/1", "https://a.com/3"]
+    assert article_cache.cached_summaries(urls) == ["old", "fresh"]
+    assert article_cache.cached_summaries(urls, max_age_s=86400) == ["fresh"]
+
+
+def test_runtime_summaries(db, tmp_path, monkeypatch):
+    params_path = tmp_path / "params.json"
+    monkeypatch.setattr(runtime, "PARAMS_PATH", params_path)
+    _save("https://a.com/1", "cached")
+
+    def write(news: dict, saved: list) -> None:
+        params_path.write_text(json.dumps({"news": news, "runtime": {"news_summaries": saved}}), encoding="utf-8")
+
+    write({"enabled": True, "urls": ["https://a.com/1"]}, ["saved"])
+    assert runtime.load_runtime_news_summaries() == ["saved"]
+    write({"enabled": True, "urls": ["https://a.com/1"]}, [])
+    assert runtime.load_runtime_news_summaries() == ["cached"]
+    write({"enabled": False, "urls": ["https://a.com/1"]}, ["saved"])
+    assert runtime.load_runtime_news_summaries() == []
+
+    write({"enabled": True, "urls": ["https://a.com/1"]}, [])
+    _age(db, "https://a.com/1", 2 * 86400)
+    assert runtime.load_runtime_news_summaries() == []
@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+
+from agent import charting
+
+
+def _df(n: int = 120) -> pd.DataFrame:
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, n))
+    ts = 1_700_000_000_000 + np.arange(n) * 3600_000
+    return charting.ohlcv_to_df([[int(t), c, c + 1, c - 1, c, 10.0] for t, c in zip(ts, close)])
+
+
+def test_chart_spec_has_bollinger_overlays():
+    df = _df()
+    for frame in (None, charting.indicator_frame(df, bollinger=True)):
+        spec = charting.build_chart_spec(df, frame=frame)
+        assert [o["column"] for o in spec["overlays"]] == ["ema20", "ema50", "bb_upper", "bb_lower"]
+        cols = charting.decode_chart_spec(spec)
+        mid = df["close"].rolling(20).mean().to_numpy()
+        np.testing.assert_allclose(cols["bb_upper"][-1], mid[-1] + 2 * df["close"].iloc[-20:].std(), rtol=1e-5)
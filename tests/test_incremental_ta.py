@@ -0,0 +1,94 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agent.incremental_ta import (
+    IncrementalIndicators,
+    bollinger_full,
+    donchian_full,
+    ema_full,
+    rsi_full,
+)
+
+
+def _candles(n: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    spread = np.abs(rng.normal(0, 0.004, n)) * close
+    return pd.DataFrame(
+        {
+            "date": pd.date_range("2024-01-01", periods=n, freq="1h", tz="UTC"),
+            "open": close,
+            "high": close + spread,
+            "low": close - spread,
+            "close": close,
+        }
+    )
+
+
+def _reference(df: pd.DataFrame) -> dict[str, np.ndarray]:
+    high, low, close = (df[c].to_numpy(dtype=float) for c in ("high", "low", "close"))
+    ref = {"ema20": ema_full(close, 20), "ema50": ema_full(close, 50), "rsi": rsi_full(close, 14)}
+    ref["bb_lowerband"], ref["bb_middleband"], ref["bb_upperband"] = bollinger_full((high + low + close) / 3.0)
+    ref["hh20"], ref["ll20"] = donchian_full(high, low, 20)
+    return ref
+
+
+def _assert_close(got: dict, want: dict, rows: slice) -> None:
+    for name, w in want.items():
+        np.testing.assert_allclose(got[name][rows], w[rows], rtol=1e-9, atol=1e-9, err_msg=name)
+
+
+def test_appended_candles_match_full_recompute():
+    df = _candles(600)
+    inc = IncrementalIndicators()
+    for end in [200, 201, 205, 260, 400, 600]:
+        out = inc.apply("BTC/USDT:USDT", df.iloc[:end])
+        _assert_close(out, _reference(df.iloc[:end]), slice(None))
+
+
+def test_matches_talib():
+    talib = pytest.importorskip("talib")
+    df = _candles(400)
+    inc = IncrementalIndicators()
+    inc.apply("BTC/USDT:USDT", df.iloc[:300])
+    out = inc.apply("BTC/USDT:USDT", df)
+    close = df["close"].to_numpy(dtype=float)
+    np.testing.assert_allclose(out["ema50"][60:], talib.EMA(close, 50)[60:], rtol=1e-9)
+    np.testing.assert_allclose(out["rsi"][20:], talib.RSI(close, 14)[20:], rtol=1e-9)
+
+
+def test_sliding_window_verify_does_not_reseed(caplog):
+    # Live frames are a fixed 130-candle window moving one candle at a time.
+    window = 130
+    df = _candles(window + 400)
+    inc = IncrementalIndicators(verify_every=24)
+    caplog.set_level(logging.WARNING, logger="agent.incremental_ta")
+    for end in range(window, len(df) + 1):
+        out = inc.apply("BTC/USDT:USDT", df.iloc[end - window : end])
+    assert "reseeding" not in caplog.text
+    assert inc.verify("BTC/USDT:USDT")
+
+    # The state carries the history since its seed: equal to a recompute from that origin...
+    _assert_close({k: v[-1:] for k, v in out.items()}, {k: v[-1:] for k, v in _reference(df).items()}, slice(None))
+    # ...while a recompute on the window alone (the per-pair path) differs by exactly its own
+    # seed (the SMA of the window's first `period` closes), decayed over the rest of the window.
+    close = df["close"].to_numpy(dtype=float)
+    full, windowed = _reference(df), _reference(df.iloc[-window:])
+    start = len(df) - window
+    for period in (20, 50):
+        decay = (1 - 2 / (period + 1)) ** (window - period)
+        seed_gap = close[start : start + period].mean() - full[f"ema{period}"][start + period - 1]
+        np.testing.assert_allclose(windowed[f"ema{period}"][-1] - out[f"ema{period}"][-1], decay * seed_gap, rtol=1e-6, atol=1e-9)
+    for name in ("bb_lowerband", "bb_middleband", "bb_upperband", "hh20", "ll20"):
+        np.testing.assert_allclose(out[name][-1], windowed[name][-1], rtol=1e-9, err_msg=name)
+
+
+def test_gap_reseeds_from_frame():
+    df = _candles(300)
+    inc = IncrementalIndicators()
+    inc.apply("ETH/USDT:USDT", df.iloc[:150])
+    out = inc.apply("ETH/USDT:USDT", df.iloc[200:300])  # does not continue the cached history
+    _assert_close(out, _reference(df.iloc[200:300]), slice(None))
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from agent import llm
+
+ENV = ("AGENT_LLM_API_URL", "AGENT_LLM_PROVIDER", "AGENT_LLM_MODEL", "AGENT_LLM_API_KEY_ENV", "ANTHROPIC_API_KEY")
+
+
+@pytest.fixture
+def params(tmp_path, monkeypatch):
+    for name in ENV:
+        monkeypatch.delenv(name, raising=False)
+    path = tmp_path / "params.json"
+    path.write_text(
+        json.dumps(
+            {
+                "agent": {
+                    "llm_api_url": "https://ark.example.com/api/v3",
+                    "llm_provider": "openai",
+                    "llm_model": "ui-model",
+                    "llm_api_key": "ui-key",
+                }
+            }
+        ),
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(llm, "PARAMS_PATH", path)
+    return path
+
+
+def test_params_json_over_defaults(params):
+    cfg = llm.load_llm_config()
+    assert (cfg.api_url, cfg.provider, cfg.model) == ("https://ark.example.com/api/v3", "openai", "ui-model")
+    assert llm._get_api_key(cfg) == "ui-key"
+
+
+def test_env_wins_for_every_setting(params, monkeypatch):
+    monkeypatch.setenv("AGENT_LLM_API_URL", "http://127.0.0.1:8765")
+    monkeypatch.setenv("AGENT_LLM_PROVIDER", "mock")
+    monkeypatch.setenv("AGENT_LLM_MODEL", "env-model")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "env-key")
+    cfg = llm.load_llm_config()
+    assert (cfg.api_url, cfg.provider, cfg.model) == ("http://127.0.0.1:8765", "mock", "env-model")
+    assert llm._get_api_key(cfg) == "env-key"
+
+
+def test_defaults(params):
+    params.write_text("{}", encoding="utf-8")
+    cfg = llm.load_llm_config()
+    assert (cfg.api_url, cfg.provider, cfg.model) == ("https://api.anthropic.com", "anthropic", "claude-3-5-sonnet-latest")
+    assert llm._get_api_key(cfg) is None
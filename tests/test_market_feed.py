@@ -0,0 +1,175 @@
+import json
+import time
+
+import pytest
+
+pytest.importorskip("ccxt.pro")
+pytest.importorskip("websockets")
+
+from agent.market_feed import MarketFeed, MarketSnapshot  # noqa: E402
+from agent.tools import ccxt_tools, exchange_factory  # noqa: E402
+from tests.fake_okx_ws import FakeOkxWs, order_msg, position_msg  # noqa: E402
+
+SYMBOL = "BTC/USDT:USDT"
+CREDS = {"name": "okx", "key": "k", "secret": "s", "password": "p", "ccxt_config": {}}
+PUBLIC = {"name": "okx", "key": None, "secret": None, "password": None, "ccxt_config": {}}
+
+
+def _wait_for(predicate, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        value = predicate()
+        if value:
+            return value
+        time.sleep(0.05)
+    raise AssertionError("condition not reached")
+
+
+class RestStub:
+    def __init__(self):
+        self.calls = []
+
+    def fetch_ticker(self, symbol):
+        self.calls.append("ticker")
+        return {"symbol": symbol, "last": -1.0}
+
+    def fetch_positions(self):
+        self.calls.append("positions")
+        return ["rest"]
+
+    def fetch_open_orders(self, symbol=None):
+        self.calls.append("orders")
+        return ["rest"]
+
+
+# --- snapshot ---
+
+
+def test_snapshot_merges_positions_and_orders():
+    snap = MarketSnapshot()
+    assert snap.positions() is None and snap.open_orders() is None  # not seeded yet
+
+    snap.set_private(
+        [{"symbol": SYMBOL, "side": "long", "contracts": 2}],
+        [{"id": "1", "symbol": SYMBOL, "status": "open"}, {"id": "2", "symbol": "ETH/USDT:USDT", "status": "open"}],
+    )
+    snap.update_positions([{"symbol": SYMBOL, "side": "short", "contracts": 1}])
+    snap.update_positions([{"symbol": SYMBOL, "side": "long", "contracts": 0}])  # closed
+    snap.update_orders([{"id": "1", "symbol": SYMBOL, "status": "closed"}, {"id": "3", "symbol": SYMBOL, "status": "open"}])
+
+    assert [(p["side"], p["contracts"]) for p in snap.positions()] == [("short", 1)]
+    assert sorted(o["id"] for o in snap.open_orders()) == ["2", "3"]
+    assert [o["id"] for o in snap.open_orders(SYMBOL)] == ["3"]
+
+    snap.mark_private_down()
+    assert snap.positions() is None and snap.open_orders() is None
+
+
+def test_snapshot_ticker_staleness():
+    snap = MarketSnapshot()
+    snap.update_tickers({SYMBOL: {"symbol": SYMBOL, "last": 100.0}})
+    assert snap.ticker(SYMBOL, max_age_s=5)["last"] == 100.0
+    time.sleep(0.05)
+    assert snap.ticker(SYMBOL, max_age_s=0.01) is None
+    assert snap.tickers([SYMBOL, "ETH/USDT:USDT"], max_age_s=5).keys() == {SYMBOL}
+
+
+def test_tools_fall_back_to_rest():
+    feed = MarketFeed(PUBLIC)  # never started: nothing fresh in its snapshot
+    rest = RestStub()
+    ctx = {"exchange": rest, "market_feed": feed}
+    assert ccxt_tools.fetch_ticker(args={"symbol": SYMBOL}, context=ctx)["last"] == -1.0
+    assert ccxt_tools.fetch_positions(args={}, context=ctx) == ["rest"]
+    assert ccxt_tools.fetch_open_orders(args={}, context=ctx) == ["rest"]
+    assert rest.calls == ["ticker", "positions", "orders"]
+    assert SYMBOL in feed._symbols  # the missed symbol is subscribed for next time
+
+    feed.snapshot.update_tickers({SYMBOL: {"symbol": SYMBOL, "last": 101.0}})
+    feed.snapshot.set_private([], [])
+    assert ccxt_tools.fetch_ticker(args={"symbol": SYMBOL}, context=ctx)["last"] == 101.0
+    assert ccxt_tools.fetch_positions(args={}, context=ctx) == []
+    assert rest.calls == ["ticker", "positions", "orders"]
+
+
+# --- against the fake WebSocket server ---
+
+
+@pytest.fixture
+def okx_markets(tmp_path, monkeypatch):
+    import ccxt
+
+    market = ccxt.okx().parse_market(
+        {
+            "instType": "SWAP",
+            "instId": "BTC-USDT-SWAP",
+            "uly": "BTC-USDT",
+            "instFamily": "BTC-USDT",
+            "settleCcy": "USDT",
+            "ctVal": "0.01",
+            "ctMult": "1",
+            "ctValCcy": "BTC",
+            "ctType": "linear",
+            "lotSz": "1",
+            "tickSz": "0.1",
+            "minSz": "1",
+            "lever": "100",
+            "state": "live",
+            "listTime": "1600000000000",
+        }
+    )
+    monkeypatch.setattr(exchange_factory, "MARKETS_DIR", tmp_path)
+    (tmp_path / "okx_swap.json").write_text(json.dumps({"ts": time.time(), "markets": {SYMBOL: market}}), encoding="utf-8")
+    exchange_factory.clear_exchanges()
+    yield
+    exchange_factory.clear_exchanges()
+
+
+@pytest.fixture
+def fake_ws():
+    server = FakeOkxWs({"BTC-USDT-SWAP": 100.5}).start()
+    yield server
+    server.stop()
+
+
+class SeededFeed(MarketFeed):
+    """Replaces the REST seed of the private channels (no network in tests)."""
+
+    def _exchange(self):
+        ex = super()._exchange()
+
+        async def fetch_positions(*args, **kwargs):
+            return [{"symbol": SYMBOL, "side": "long", "contracts": 1}]
+
+        async def fetch_open_orders(*args, **kwargs):
+            return []
+
+        ex.fetch_positions = fetch_positions
+        ex.fetch_open_orders = fetch_open_orders
+        return ex
+
+
+def test_feed_streams_tickers(okx_markets, fake_ws):
+    feed = MarketFeed(PUBLIC, symbols=[SYMBOL], ws_url=fake_ws.url).start()
+    try:
+        ticker = _wait_for(lambda: feed.snapshot.ticker(SYMBOL))
+        assert ticker["last"] == 100.5
+        assert feed.snapshot.positions() is None  # no credentials: private data stays on REST
+    finally:
+        feed.stop()
+
+
+def test_feed_streams_positions_and_orders(okx_markets, fake_ws):
+    feed = SeededFeed(CREDS, ws_url=fake_ws.url).start()
+    try:
+        assert _wait_for(lambda: feed.snapshot.positions())[0]["contracts"] == 1
+        _wait_for(lambda: fake_ws.subscribed("positions") and fake_ws.subscribed("orders"))
+
+        fake_ws.push(position_msg("BTC-USDT-SWAP", 3))
+        _wait_for(lambda: feed.snapshot.positions()[0]["contracts"] == 3)
+        fake_ws.push(order_msg("BTC-USDT-SWAP", "42", "live"))
+        assert _wait_for(lambda: feed.snapshot.open_orders(SYMBOL))[0]["id"] == "42"
+        fake_ws.push(order_msg("BTC-USDT-SWAP", "42", "filled"))
+        _wait_for(lambda: feed.snapshot.open_orders() == [])
+    finally:
+        feed.stop()
+    assert feed.snapshot.positions() is None  # stopped: readers fall back to REST
@@ -0,0 +1,119 @@
+import time
+
+import pytest
+
+pytest.importorskip("ccxt")
+
+from agent import candle_store  # noqa: E402
+from agent.tools.ccxt_tools import fetch_ohlcv  # noqa: E402
+from agent.tools.ohlcv_fetcher import stitch_pages  # noqa: E402
+
+H = 3600_000
+DAY = 24 * H
+
+
+class FakeExchange:
+    """Serves candles on the grid `phase + k * step`, like OKX (weekly on Monday, 1D in UTC+8)."""
+
+    id = "fake"
+    rateLimit = 1
+
+    def __init__(self, step: int, phase: int, page_cap: int = 300):
+        self.step, self.phase, self.page_cap = step, phase, page_cap
+
+    def fetch_ohlcv(self, symbol, timeframe=None, since=None, limit=100):
+        now = int(time.time() * 1000)
+        last = now - (now - self.phase) % self.step
+        limit = min(limit, self.page_cap)
+        start = last - (limit - 1) * self.step if since is None else since + (self.phase - since) % self.step
+        end = min(last, start + (limit - 1) * self.step)
+        return [[t, 1.0, 2.0, 0.5, 1.5, 10.0] for t in range(start, end + 1, self.step)]
+
+
+@pytest.fixture(autouse=True)
+def _store(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, "_STORE", candle_store.CandleStore(tmp_path))
+
+
+def _fetch(ex, timeframe, **args):
+    return fetch_ohlcv(args={"symbol": "BTC/USDT:USDT", "timeframe": timeframe, **args}, context={"exchange": ex})
+
+
+@pytest.mark.parametrize("cache", ["1", "0"])
+@pytest.mark.parametrize(
+    "timeframe,step,phase",
+    [("1w", 7 * DAY, 4 * DAY), ("1w", 7 * DAY, 4 * DAY - 8 * H), ("1d", DAY, 16 * H), ("6h", 6 * H, 4 * H), ("1h", H, 0)],
+)
+def test_offset_candle_grids(monkeypatch, cache, timeframe, step, phase):
+    monkeypatch.setenv("AGENT_CANDLE_CACHE", cache)
+    ex = FakeExchange(step, phase)
+    for args in ({"limit": 5}, {"limit": 700}, {"since": int(time.time() * 1000) - 400 * step}):
+        rows = _fetch(ex, timeframe, **args)
+        assert rows and all((r[0] - phase) % step == 0 for r in rows)
+        assert all(b[0] - a[0] == step for a, b in zip(rows, rows[1:]))
+        if "limit" in args:
+            assert len(rows) == args["limit"]
+
+
+def test_calendar_month_uses_plain_rest():
+    rows = _fetch(FakeExchange(30 * DAY, 0), "1M", limit=12)
+    assert len(rows) == 12
+
+
+def test_stitch_rejects_candles_off_the_first_grid():
+    week = 7 * DAY
+    monday = 4 * DAY
+    assert [r[0] for r in stitch_pages([[[monday + week, 1]], [[monday, 1]]], week)] == [monday, monday + week]
+    with pytest.raises(RuntimeError):
+        stitch_pages([[[monday, 1], [monday + week + H, 1]]], week)
+
+
+def test_live_candle_on_top_of_the_store(monkeypatch):
+    monkeypatch.setenv("AGENT_CANDLE_CACHE", "1")
+    ex = FakeExchange(DAY, 16 * H)
+    now = int(time.time() * 1000)
+    rows = _fetch(ex, "1d", limit=10)
+    assert len(rows) == 10
+    assert rows[-1][0] == candle_store.align_down(now, DAY, 16 * H)  # the candle still forming
+    assert candle_store.get_candle_store().read("fake", "BTC/USDT:USDT", "1d")[-1, 0] == rows[-2][0]  # only closed ones stored
+
+
+class FlakyExchange(FakeExchange):
+    """Answers the first `fail` history requests with an empty page."""
+
+    def __init__(self, *args, fail: int = 1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail = fail
+        self.history_calls = 0
+
+    def fetch_ohlcv(self, symbol, timeframe=None, since=None, limit=100):
+        if since is not None:
+            self.history_calls += 1
+            if self.fail > 0:
+                self.fail -= 1
+                return []
+        return super().fetch_ohlcv(symbol, timeframe, since, limit)
+
+
+def test_empty_page_is_not_marked_covered(monkeypatch):
+    monkeypatch.setenv("AGENT_CANDLE_CACHE", "1")
+    ex = FlakyExchange(H, 0, fail=1)
+    assert len(_fetch(ex, "1h", limit=50)) == 1  # history page lost: only the live candle
+    assert len(_fetch(ex, "1h", limit=50)) == 50  # fetched again instead of served as a hole
+    calls = ex.history_calls
+    assert len(_fetch(ex, "1h", limit=50)) == 50
+    assert ex.history_calls == calls  # now covered
+
+
+def test_holes_in_the_store_are_refetched(monkeypatch):
+    monkeypatch.setenv("AGENT_CANDLE_CACHE", "1")
+    ex = FakeExchange(H, 0)
+    store = candle_store.get_candle_store()
+    last_closed = candle_store.last_closed_open("1h")
+    rows = ex.fetch_ohlcv("BTC/USDT:USDT", "1h", since=last_closed - 99 * H, limit=100)
+    del rows[40:60]
+    store.write("fake", "BTC/USDT:USDT", "1h", rows, covered=(rows[0][0], rows[-1][0]))  # a sidecar that lies
+    assert store.data_gaps("fake", "BTC/USDT:USDT", "1h") == [(rows[39][0] + H, rows[40][0] - H)]
+    out = _fetch(ex, "1h", limit=101)
+    assert all(b[0] - a[0] == H for a, b in zip(out, out[1:]))
+    assert store.data_gaps("fake", "BTC/USDT:USDT", "1h") == []
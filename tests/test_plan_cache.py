@@ -0,0 +1,39 @@
+import pytest
+
+from agent import plan_cache
+from agent.plan_cache import PlanCache, instrument_tokens
+
+PLAN = {"assistant_message": "ok", "plan": [], "tool_calls": [{"call_id": "tc_1", "tool": "ccxt.fetch_ohlcv", "args": {}}]}
+
+
+@pytest.mark.parametrize(
+    "text,tokens",
+    [
+        ("BTC 1h", "btc|1h"),
+        ("看看 btc 4小时 走势", "btc|4h"),
+        ("ETH/USDT:USDT 15m", "eth|15m"),
+        ("analyze BTC-USDT-SWAP daily", "btc|1d"),
+        ("hello there", ""),
+    ],
+)
+def test_instrument_tokens(text, tokens):
+    assert instrument_tokens(text) == tokens
+
+
+def test_similar_messages_for_other_instruments_miss():
+    cache = PlanCache(similarity=0.7)
+    cache.put("show me the BTC 1h chart", None, PLAN)
+
+    hit = cache.get("Show me the BTC 1h chart!", None)
+    assert hit is not None and hit["tool_calls"][0]["call_id"] != "tc_1"
+    assert cache.get("show me the BTC 1h chart please", None) is not None  # similar wording, same instrument
+    assert cache.get("show me the BTC 4h chart", None) is None
+    assert cache.get("show me the ETH 1h chart", None) is None
+
+
+def test_cache_is_opt_in(monkeypatch):
+    monkeypatch.setattr(plan_cache, "_CACHE", None)
+    monkeypatch.delenv("AGENT_PLAN_CACHE_SIZE", raising=False)
+    assert plan_cache.get_plan_cache() is None
+    monkeypatch.setenv("AGENT_PLAN_CACHE_SIZE", "8")
+    assert plan_cache.get_plan_cache().max_size == 8
@@ -0,0 +1,71 @@
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("freqtrade")
+pytest.importorskip("talib")
+
+from freqtrade.enums import RunMode  # noqa: E402
+
+STRATEGY_PATH = Path(__file__).resolve().parents[1] / "user_data" / "strategies" / "HybridOkxAgent.py"
+SIGNALS = ("enter_long", "enter_short", "exit_long", "exit_short")
+
+
+def _strategy_cls():
+    spec = importlib.util.spec_from_file_location("hybrid_okx_agent", STRATEGY_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.HybridOkxAgent
+
+
+def _candles(n: int = 2000, seed: int = 3) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    open_ = close + rng.normal(0, 0.3, n)
+    return pd.DataFrame(
+        {
+            "date": pd.date_range("2024-01-01", periods=n, freq="h", tz="UTC"),
+            "open": open_,
+            "high": np.maximum(close, open_) + rng.random(n),
+            "low": np.minimum(close, open_) - rng.random(n),
+            "close": close,
+            "volume": rng.random(n) * 100,
+        }
+    )
+
+
+def _analyze(cls, df: pd.DataFrame) -> pd.DataFrame:
+    strategy = cls({"runmode": RunMode.DRY_RUN, "timeframe": "1h", "stake_currency": "USDT", "dry_run": True})
+    strategy.dp = None
+    md = {"pair": "BTC/USDT:USDT"}
+    out = strategy.populate_indicators(df.copy(), md)
+    out = strategy.populate_entry_trend(out, md)
+    return strategy.populate_exit_trend(out, md)
+
+
+def test_compact_float32_features_match_float64(monkeypatch):
+    monkeypatch.setenv("AGENT_LLM_ENABLED", "1")
+    monkeypatch.setenv("AGENT_STRATEGY_PLOT_DEBUG", "1")
+    cls = _strategy_cls()
+    df = _candles()
+
+    full = _analyze(cls, df)
+    monkeypatch.setenv("AGENT_STRATEGY_COMPACT", "1")
+    compact = _analyze(cls, df)
+
+    for col in SIGNALS:
+        assert compact[col].dtype == np.int8
+        np.testing.assert_array_equal(compact[col].to_numpy(), full[col].fillna(0).astype(int).to_numpy(), err_msg=col)
+
+    features = [c for c in compact.columns if compact[c].dtype == np.float32]
+    assert {"rsi", "adx", "bb_percent", "ema20", "ema50"} <= set(features)
+    for col in features:
+        want = full[col].to_numpy(dtype=np.float64)
+        got = compact[col].to_numpy(dtype=np.float64)
+        np.testing.assert_array_equal(np.isnan(got), np.isnan(want), err_msg=col)
+        ok = ~np.isnan(want)
+        # float32 keeps ~7 significant digits; allow a small absolute slack for values near 0.
+        np.testing.assert_allclose(got[ok], want[ok], rtol=1e-6, atol=1e-5 * max(1.0, np.abs(want[ok]).max()), err_msg=col)
@@ -0,0 +1,69 @@
+import threading
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+ccxt = pytest.importorskip("ccxt")
+
+from agent.valuation import PriceCache, usdt_prices  # noqa: E402
+
+
+def _okx_with_markets():
+    ex = ccxt.okx()
+    common = {"lotSz": "1", "tickSz": "0.1", "minSz": "1", "state": "live", "listTime": "1600000000000"}
+    swap = {
+        "instType": "SWAP",
+        "instId": "BTC-USDT-SWAP",
+        "uly": "BTC-USDT",
+        "instFamily": "BTC-USDT",
+        "settleCcy": "USDT",
+        "ctVal": "0.01",
+        "ctMult": "1",
+        "ctValCcy": "BTC",
+        "ctType": "linear",
+        "lever": "100",
+        **common,
+    }
+    spot = {"instType": "SPOT", "instId": "ETH-USDT", "baseCcy": "ETH", "quoteCcy": "USDT", **common}
+    ex.set_markets([ex.parse_market(swap), ex.parse_market(spot)])
+    return ex
+
+
+class Recorder:
+    """Stands in for the exchange's HTTP layer and records every outgoing request."""
+
+    def __init__(self, prices: dict[str, float]):
+        self.prices = prices
+        self.requests: list[tuple[str, dict]] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, url, method="GET", headers=None, body=None):
+        parsed = urlparse(url)
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        with self._lock:
+            self.requests.append((parsed.path, params))
+        inst_id = params.get("instId")
+        data = [{"instId": inst_id, "instType": "SWAP", "last": str(self.prices[inst_id]), "ts": "1700000000000"}]
+        return {"code": "0", "msg": "", "data": data}
+
+
+def test_only_held_tickers_are_requested():
+    ex = _okx_with_markets()
+    ex.fetch = Recorder({"BTC-USDT-SWAP": 50000.0, "ETH-USDT": 2500.0})
+
+    prices = usdt_prices(ex, ["BTC", "ETH", "USDT", "XYZ"], cache=PriceCache())
+
+    assert prices == {"BTC": 50000.0, "ETH": 2500.0, "USDT": 1.0, "XYZ": None}
+    assert sorted(ex.fetch.requests, key=lambda r: r[1]["instId"]) == [
+        ("/api/v5/market/ticker", {"instId": "BTC-USDT-SWAP"}),
+        ("/api/v5/market/ticker", {"instId": "ETH-USDT"}),
+    ]
+
+
+def test_cached_prices_skip_the_request():
+    ex = _okx_with_markets()
+    ex.fetch = Recorder({"BTC-USDT-SWAP": 50000.0})
+    cache = PriceCache()
+    assert usdt_prices(ex, ["BTC"], cache=cache)["BTC"] == 50000.0
+    assert usdt_prices(ex, ["BTC"], cache=cache)["BTC"] == 50000.0
+    assert len(ex.fetch.requests) == 1
@@ -38,14 +38,83 @@ from freqtrade.strategy import (
 import talib.abstract as ta
 from technical import qtpylib
 
+# Agent helpers are loaded once here rather than on every callback.
+try:
+    from agent.memory import add_memory, search_memory
+    from agent.policy import decide_entry
+    from agent.runtime import load_runtime_news_summaries
+    from agent.decision_store import candle_ts, get_replay, record_decision
+except Exception:  # agent package not importable: callbacks degrade to no-ops / allow
+    add_memory = search_memory = decide_entry = load_runtime_news_summaries = None
+    candle_ts = get_replay = record_decision = None
+
+try:  # AGENT_PROFILE=1 times the callbacks below; otherwise these are no-ops
+    from agent.profiler import profile_span, profiled
+except Exception:
+    from contextlib import nullcontext
+
+    def profiled(stage):
+        return lambda fn: fn
+
+    def profile_span(stage, pair=None):
+        return nullcontext()
+
+
+class FeatureSnapshot:
+    """Latest-candle features of one pair, as read by confirm_trade_entry."""
+
+    __slots__ = ("date", "rsi", "adx", "bb_percent", "ema20", "ema50")
+
+    def __init__(self, date, rsi: float, adx: float, bb_percent: float, ema20: float, ema50: float):
+        self.date = date
+        self.rsi = rsi
+        self.adx = adx
+        self.bb_percent = bb_percent
+        self.ema20 = ema20
+        self.ema50 = ema50
+
+    @classmethod
+    def from_frame(cls, dataframe: DataFrame) -> "FeatureSnapshot | None":
+        if not len(dataframe) or "ema20" not in dataframe.columns or "ema50" not in dataframe.columns:
+            return None
+        last = len(dataframe) - 1
+
+        def value(col: str) -> float:
+            return float(dataframe[col].iat[last]) if col in dataframe.columns else 0.0
+
+        return cls(
+            dataframe["date"].iat[last] if "date" in dataframe.columns else None,
+            value("rsi"), value("adx"), value("bb_percent"), value("ema20"), value("ema50"),
+        )
+
+    def indicators(self) -> dict:
+        return {
+            "rsi": self.rsi,
+            "adx": self.adx,
+            "bb_percent": self.bb_percent,
+            "ema20": self.ema20,
+            "ema50": self.ema50,
+        }
+
 
 class HybridOkxAgent(IStrategy):
     protections = []
 
+    def __init__(self, config: dict) -> None:
+        super().__init__(config)
+        # The resampled 1d regime needs ~11 days of base candles; without them live frames
+        # would run with the filter undefined while backtests (longer history) apply it.
+        if self.use_regime_filter.value or self.runmode_value == "hyperopt":
+            from agent.resample_cache import warmup_candles
+
+            timeframe = (config or {}).get("timeframe") or self.timeframe
+            self.startup_candle_count = max(self.startup_candle_count, warmup_candles(timeframe))
+
+    @profiled("order_filled")
     def order_filled(self, pair: str, trade: Trade, order, current_time: datetime, **kwargs) -> None:
+        if add_memory is None:
+            return
         try:
-            from agent.memory import add_memory
-
             add_memory(
                 kind="order_filled",
                 pair=pair,
@@ -62,6 +131,7 @@ class HybridOkxAgent(IStrategy):
         except Exception:
             pass
 
+    @profiled("confirm_trade_entry")
     def confirm_trade_entry(
         self,
         pair: str,
@@ -77,38 +147,60 @@ class HybridOkxAgent(IStrategy):
         if os.getenv("AGENT_LLM_ENABLED", "0") not in ("1", "true", "TRUE"):
             return True
 
-        # Keep this lightweight: only use already computed indicators.
-        try:
-            df = self.dp.get_analyzed_dataframe(pair, self.timeframe)
-            row = df.iloc[-1]
-            indicators = {
-                "rsi": float(row.get("rsi", 0.0)),
-                "adx": float(row.get("adx", 0.0)),
-                "bb_percent": float(row.get("bb_percent", 0.0)),
-                "ema20": float(row.get("ema20", 0.0)) if "ema20" in row else None,
-                "ema50": float(row.get("ema50", 0.0)) if "ema50" in row else None,
-            }
-        except Exception:
-            indicators = {}
-
-        try:
-            from agent.policy import decide_entry
-            from agent.runtime import load_runtime_news_summaries
+        if decide_entry is None:
+            return True
 
-            from agent.memory import search_memory
+        # Keep this lightweight: read the snapshot published by populate_entry_trend,
+        # falling back to the analyzed dataframe (e.g. in backtests, where none is kept).
+        snap = getattr(self, "_snapshots", {}).get(pair)
+        if snap is None:
+            try:
+                df, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
+                snap = FeatureSnapshot.from_frame(df)
+            except Exception:
+                snap = None
+        indicators = snap.indicators() if snap is not None else {}
+        signal_ts = candle_ts(snap.date) if snap is not None else None
+
+        # Backtests replay decisions recorded in live / dry-run instead of calling the LLM.
+        runmode = self.runmode_value
+        if runmode in ("backtest", "hyperopt") and os.getenv("AGENT_POLICY_REPLAY", "1") in ("1", "true", "TRUE"):
+            try:
+                replay = get_replay(self.timeframe)
+                return bool(replay.lookup(pair=pair, side=side, ts=signal_ts, indicators=indicators).allow)
+            except Exception:
+                return True
 
-            decision = decide_entry(
-                pair=pair,
-                side=side,
-                timeframe=self.timeframe,
-                indicators=indicators,
-                recent_news=load_runtime_news_summaries(),
-                memory_hits=search_memory(pair, limit=3, pair=pair),
-            )
-            return bool(decision.allow)
+        try:
+            with profile_span("confirm.memory", pair):
+                memory_hits = search_memory(pair, limit=3, pair=pair)
+            recent_news = load_runtime_news_summaries()
+            with profile_span("confirm.llm", pair):
+                decision = decide_entry(
+                    pair=pair,
+                    side=side,
+                    timeframe=self.timeframe,
+                    indicators=indicators,
+                    recent_news=recent_news,
+                    memory_hits=memory_hits,
+                )
         except Exception:
             return True
 
+        if runmode in ("live", "dry_run") and signal_ts is not None:
+            try:
+                record_decision(
+                    pair=pair,
+                    side=side,
+                    timeframe=self.timeframe,
+                    ts=signal_ts,
+                    indicators=indicators,
+                    decision=decision,
+                )
+            except Exception:
+                pass
+        return bool(decision.allow)
+
     """
     This is a strategy template to get you started.
     More information in https://www.freqtrade.io/en/latest/strategy-customization/
@@ -158,12 +250,23 @@ class HybridOkxAgent(IStrategy):
     exit_profit_only = False
     ignore_roi_if_entry_signal = False
 
-    # Number of candles the strategy requires before producing valid signals
-    startup_candle_count: int = 30
-
     # Strategy parameters
+    # Defaults reproduce the original hardcoded signal thresholds.
     buy_rsi = IntParameter(10, 40, default=30, space="buy")
-    sell_rsi = IntParameter(60, 90, default=70, space="sell")# Optional order type mapping.
+    sell_rsi = IntParameter(60, 90, default=70, space="sell")
+    ema_fast = IntParameter(10, 30, default=20, space="buy")
+    ema_slow = IntParameter(40, 100, default=50, space="buy")
+    donchian_window = IntParameter(10, 40, default=20, space="buy")
+    exit_long_rsi = IntParameter(50, 70, default=55, space="sell")
+    exit_short_rsi = IntParameter(30, 50, default=45, space="sell")
+    # Only enter with (not against) the 4h / 1d regime resampled from the base candles.
+    use_regime_filter = BooleanParameter(default=False, space="buy")
+
+    # Number of candles the strategy requires before producing valid signals: the longest
+    # window any hyperopt epoch can pick (ema_slow up to 100), so no epoch starts on NaN warm-up.
+    startup_candle_count: int = max(30, ema_fast.high, ema_slow.high, donchian_window.high)
+
+    # Optional order type mapping.
     order_types = {
         "entry": "limit",
         "exit": "limit",
@@ -176,25 +279,121 @@ class HybridOkxAgent(IStrategy):
         "entry": "GTC",
         "exit": "GTC"
     }
+
+    # --- Indicator dependencies ---
+    # populate_indicators is the feature stage: every derived series is computed there once
+    # per candle and stored in the analyzed dataframe. Entry / exit / confirmation are pure
+    # reads of those columns. Each stage declares what it reads; only the indicator groups
+    # producing them are computed. PLOT_COLUMNS are display extras, added only
+    # in plot/debug mode (AGENT_STRATEGY_PLOT_DEBUG=1 or `freqtrade plot-dataframe`).
+    # CONFIRM_COLUMNS are only needed when the LLM gate in confirm_trade_entry is on.
+    # Entry also reads the EMA / Donchian columns selected by its parameters (entry_columns).
+    ENTRY_COLUMNS = ("rsi", "bb_lowerband", "bb_upperband")
+    EXIT_COLUMNS = ("rsi", "bb_middleband")
+    CONFIRM_COLUMNS = ("rsi", "adx", "bb_percent", "ema20", "ema50")
+    PLOT_COLUMNS = (
+        "tema", "sar", "macd", "macdsignal", "macdhist", "fastd", "fastk", "mfi", "htsine", "htleadsine", "bb_width",
+    )
+
+    # Indicator group -> columns it produces (computed by `_ind_<group>`).
+    INDICATOR_GROUPS = {
+        "adx": ("adx",),
+        "rsi": ("rsi",),
+        "bbands": ("bb_lowerband", "bb_middleband", "bb_upperband", "bb_percent", "bb_width"),
+        # Parameterized: ema{n} / donchian_high_{n} / donchian_low_{n}, see group_columns.
+        "ema": (),
+        "donchian": (),
+        "stochf": ("fastd", "fastk"),
+        "macd": ("macd", "macdsignal", "macdhist"),
+        "mfi": ("mfi",),
+        "sar": ("sar",),
+        "tema": ("tema",),
+        "htsine": ("htsine", "htleadsine"),
+        "regime": ("regime_4h", "regime_1d"),
+    }
+    # Groups the live engines (vectorized / incremental) provide.
+    ENGINE_GROUPS = ("rsi", "bbands", "ema", "donchian")
+
+    @property
+    def runmode_value(self) -> str | None:
+        runmode = (getattr(self, "config", None) or {}).get("runmode")
+        return getattr(runmode, "value", runmode)
+
+    @property
+    def plot_debug(self) -> bool:
+        if os.getenv("AGENT_STRATEGY_PLOT_DEBUG", "0") in ("1", "true", "TRUE"):
+            return True
+        return self.runmode_value == "plot"
+
+    # --- Parameterized columns ---
+    # Outside hyperopt `.range` is just the current value; in hyperopt it is the whole search
+    # range, so populate_indicators (run once) precomputes every variant and each epoch only
+    # re-evaluates the boolean signals on the columns its parameter values select.
+
+    def ema_periods(self) -> list:
+        periods = set(self.ema_fast.range) | set(self.ema_slow.range)
+        if os.getenv("AGENT_LLM_ENABLED", "0") in ("1", "true", "TRUE"):
+            periods |= {20, 50}  # confirm_trade_entry always sends ema20 / ema50
+        return sorted(periods)
+
+    def donchian_windows(self) -> list:
+        return list(self.donchian_window.range)
+
+    @staticmethod
+    def donchian_columns(window: int) -> tuple:
+        # Highest high / lowest low of the `window` candles *before* the current one.
+        return f"donchian_high_{window}", f"donchian_low_{window}"
+
+    def group_columns(self, group: str) -> tuple:
+        if group == "ema":
+            return tuple(f"ema{n}" for n in self.ema_periods())
+        if group == "donchian":
+            return tuple(c for n in self.donchian_windows() for c in self.donchian_columns(n))
+        return self.INDICATOR_GROUPS[group]
+
+    def entry_columns(self) -> set:
+        # Uses `.range`, not `.value`: this runs during hyperopt's one-off indicator stage.
+        emas = {f"ema{n}" for n in (*self.ema_fast.range, *self.ema_slow.range)}
+        cols = set(self.ENTRY_COLUMNS) | emas | set(self.group_columns("donchian"))
+        if any(self.use_regime_filter.range):
+            cols |= set(self.INDICATOR_GROUPS["regime"])
+        return cols
+
+    def required_columns(self) -> set:
+        cols = self.entry_columns() | set(self.EXIT_COLUMNS)
+        if os.getenv("AGENT_LLM_ENABLED", "0") in ("1", "true", "TRUE"):
+            cols |= set(self.CONFIRM_COLUMNS)
+        if self.plot_debug:
+            cols |= set(self.PLOT_COLUMNS)
+        return cols
+
+    def required_groups(self) -> list:
+        cols = self.required_columns()
+        return [g for g in self.INDICATOR_GROUPS if cols & set(self.group_columns(g))]
+
     @property
     def plot_config(self):
-        return {
+        config = {
             # Main plot indicators (Moving averages, ...)
             "main_plot": {
-                "tema": {},
-                "sar": {"color": "white"},
+                "bb_upperband": {"color": "grey"},
+                "bb_middleband": {"color": "grey"},
+                "bb_lowerband": {"color": "grey"},
             },
             "subplots": {
                 # Subplots - each dict defines one additional plot
-                "MACD": {
-                    "macd": {"color": "blue"},
-                    "macdsignal": {"color": "orange"},
-                },
                 "RSI": {
                     "rsi": {"color": "red"},
                 }
             }
         }
+        if self.plot_debug:
+            config["main_plot"].update({"tema": {}, "sar": {"color": "white"}})
+            config["subplots"]["MACD"] = {
+                "macd": {"color": "blue"},
+                "macdsignal": {"color": "orange"},
+            }
+        return config
 
     def informative_pairs(self):
         """
@@ -209,106 +408,134 @@ class HybridOkxAgent(IStrategy):
         """
         return []
 
+    @profiled("populate_indicators")
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """
-        Adds several different TA indicators to the given DataFrame
+        Feature stage: adds every series the signal stages read (see ENTRY/EXIT/CONFIRM_COLUMNS).
 
-        Performance Note: For the best performance be frugal on the number of indicators
-        you are using. Let uncomment only the indicator you are using in your strategies
-        or your hyperopt configuration, otherwise you will waste your memory and CPU usage.
+        Only the indicator groups producing a required column are computed; display-only
+        groups are added in plot/debug mode.
         :param dataframe: Dataframe with data from the exchange
         :param metadata: Additional information, like the currently traded pair
         :return: a Dataframe with all mandatory indicators for the strategies
         """
-        # Momentum Indicators
-        # ------------------------------------
-
-        # ADX
-        dataframe["adx"] = ta.ADX(dataframe)
+        groups = self.required_groups()
+        batch = self._batch_slice(metadata["pair"], dataframe)
+        if batch is not None:
+            # Live: features (and entry signals) were computed for the whole whitelist at once.
+            self._assign_engine_columns(dataframe, batch)
+            self._batch_entries[metadata["pair"]] = (batch["enter_long"], batch["enter_short"])
+            groups = [g for g in groups if g not in self.ENGINE_GROUPS]
+        elif self.use_incremental:
+            # Live: rsi / Bollinger / EMA / Donchian come from per-pair running state.
+            self._assign_engine_columns(dataframe, self.incremental.apply(metadata["pair"], dataframe))
+            groups = [g for g in groups if g not in self.ENGINE_GROUPS]
+
+        # Groups with one column per parameter value return them, to be added in one concat
+        # (inserting ~150 hyperopt variants one by one fragments the frame).
+        wide = {}
+        for group in groups:
+            if group == "regime":  # cached per pair
+                wide.update(self._ind_regime(dataframe, metadata["pair"]))
+                continue
+            wide.update(getattr(self, f"_ind_{group}")(dataframe) or {})
+        if wide:
+            dataframe = pd.concat([dataframe, DataFrame(wide, index=dataframe.index)], axis=1)
+        return dataframe
 
-        # # Plus Directional Indicator / Movement
-        # dataframe["plus_dm"] = ta.PLUS_DM(dataframe)
-        # dataframe["plus_di"] = ta.PLUS_DI(dataframe)
-
-        # # Minus Directional Indicator / Movement
-        # dataframe["minus_dm"] = ta.MINUS_DM(dataframe)
-        # dataframe["minus_di"] = ta.MINUS_DI(dataframe)
-
-        # # Aroon, Aroon Oscillator
-        # aroon = ta.AROON(dataframe)
-        # dataframe["aroonup"] = aroon["aroonup"]
-        # dataframe["aroondown"] = aroon["aroondown"]
-        # dataframe["aroonosc"] = ta.AROONOSC(dataframe)
-
-        # # Awesome Oscillator
-        # dataframe["ao"] = qtpylib.awesome_oscillator(dataframe)
-
-        # # Keltner Channel
-        # keltner = qtpylib.keltner_channel(dataframe)
-        # dataframe["kc_upperband"] = keltner["upper"]
-        # dataframe["kc_lowerband"] = keltner["lower"]
-        # dataframe["kc_middleband"] = keltner["mid"]
-        # dataframe["kc_percent"] = (
-        #     (dataframe["close"] - dataframe["kc_lowerband"]) /
-        #     (dataframe["kc_upperband"] - dataframe["kc_lowerband"])
-        # )
-        # dataframe["kc_width"] = (
-        #     (dataframe["kc_upperband"] - dataframe["kc_lowerband"]) / dataframe["kc_middleband"]
-        # )
-
-        # # Ultimate Oscillator
-        # dataframe["uo"] = ta.ULTOSC(dataframe)
-
-        # # Commodity Channel Index: values [Oversold:-100, Overbought:100]
-        # dataframe["cci"] = ta.CCI(dataframe)
-
-        # RSI
-        dataframe["rsi"] = ta.RSI(dataframe)
+    def _assign_engine_columns(self, dataframe: DataFrame, cols: dict) -> None:
+        names = ["rsi", "bb_lowerband", "bb_middleband", "bb_upperband"] + [f"ema{n}" for n in self.ema_periods()]
+        for name in names:
+            dataframe[name] = np.array(cols[name], dtype=float)
+        n = self.donchian_window.value
+        high, low = self.donchian_columns(n)
+        dataframe[high] = np.concatenate(([np.nan], cols[f"hh{n}"][:-1]))
+        dataframe[low] = np.concatenate(([np.nan], cols[f"ll{n}"][:-1]))
+        self._bb_derived(dataframe)
 
-        # # Inverse Fisher transform on RSI: values [-1.0, 1.0] (https://goo.gl/2JGGoy)
-        # rsi = 0.1 * (dataframe["rsi"] - 50)
-        # dataframe["fisher_rsi"] = (np.exp(2 * rsi) - 1) / (np.exp(2 * rsi) + 1)
+    @property
+    def use_vectorized(self) -> bool:
+        """AGENT_STRATEGY_VECTORIZED=1 in live / dry-run: one (time x pair) pass per candle."""
+        if os.getenv("AGENT_STRATEGY_VECTORIZED", "0") not in ("1", "true", "TRUE"):
+            return False
+        return self.runmode_value in ("live", "dry_run")
+
+    def bot_loop_start(self, current_time: datetime, **kwargs) -> None:
+        if not self.use_vectorized or self.dp is None:
+            return
+        from agent.multi_pair import hybrid_features, hybrid_signals, stack_frames
+
+        frames = {pair: self.dp.get_pair_dataframe(pair, self.timeframe) for pair in self.dp.current_whitelist()}
+        last = max((df["date"].iloc[-1] for df in frames.values() if df is not None and len(df)), default=None)
+        if last is None or last == getattr(self, "_panel_last", None):
+            return
+        n = self.donchian_window.value
+        panel = hybrid_features(stack_frames(frames), ema_periods=tuple(self.ema_periods()), donchian_window=n)
+        self._panel = hybrid_signals(
+            panel,
+            donchian_window=n,
+            fast=self.ema_fast.value,
+            slow=self.ema_slow.value,
+            buy_rsi=self.buy_rsi.value,
+            sell_rsi=self.sell_rsi.value,
+        )
+        self._panel_last = last
+        self._batch_entries = {}
 
-        # # Inverse Fisher transform on RSI normalized: values [0.0, 100.0] (https://goo.gl/2JGGoy)
-        # dataframe["fisher_rsi_norma"] = 50 * (dataframe["fisher_rsi"] + 1)
+    def _batch_slice(self, pair: str, dataframe: DataFrame):
+        panel = getattr(self, "_panel", None)
+        if panel is None or not self.use_vectorized:
+            return None
+        from agent.multi_pair import frame_dates
 
-        # # Stochastic Slow
-        # stoch = ta.STOCH(dataframe)
-        # dataframe["slowd"] = stoch["slowd"]
-        # dataframe["slowk"] = stoch["slowk"]
+        return panel.slice(pair, frame_dates(dataframe))
 
-        # Stochastic Fast
-        stoch_fast = ta.STOCHF(dataframe)
-        dataframe["fastd"] = stoch_fast["fastd"]
-        dataframe["fastk"] = stoch_fast["fastk"]
-
-        # # Stochastic RSI
-        # Please read https://github.com/freqtrade/freqtrade/issues/2961 before using this.
-        # STOCHRSI is NOT aligned with tradingview, which may result in non-expected results.
-        # stoch_rsi = ta.STOCHRSI(dataframe)
-        # dataframe["fastd_rsi"] = stoch_rsi["fastd"]
-        # dataframe["fastk_rsi"] = stoch_rsi["fastk"]
+    @property
+    def use_incremental(self) -> bool:
+        """AGENT_STRATEGY_INCREMENTAL=1 in live / dry-run: update indicators per new candle.
+
+        The running EMA / RSI carry the history since the pair was seeded, like a backtest
+        over the full data; the per-pair path recomputes them on freqtrade's live window,
+        seeded at its first candle. The two differ by that seed decayed over the window
+        (EMA50 on a 130-candle window keeps ~4% of it, EMA20 / RSI < 0.1%; Bollinger and
+        Donchian are identical), so an ema20 / ema50 cross within that gap can fire one
+        candle apart between the two paths.
+        """
+        if os.getenv("AGENT_STRATEGY_INCREMENTAL", "0") not in ("1", "true", "TRUE"):
+            return False
+        return self.runmode_value in ("live", "dry_run")
 
-        # MACD
-        macd = ta.MACD(dataframe)
-        dataframe["macd"] = macd["macd"]
-        dataframe["macdsignal"] = macd["macdsignal"]
-        dataframe["macdhist"] = macd["macdhist"]
+    @property
+    def incremental(self):
+        if getattr(self, "_incremental", None) is None:
+            from agent.incremental_ta import IncrementalIndicators
+
+            self._incremental = IncrementalIndicators(
+                ema_periods=tuple(self.ema_periods()),
+                rsi_period=14,
+                bb_window=20,
+                bb_stds=2,
+                donchian_window=self.donchian_window.value,
+                verify_every=int(os.getenv("AGENT_STRATEGY_INCREMENTAL_VERIFY", "24")),
+            )
+        return self._incremental
 
-        # MFI
-        dataframe["mfi"] = ta.MFI(dataframe)
+    # --- Indicator groups ---
 
-        # # ROC
-        # dataframe["roc"] = ta.ROC(dataframe)
+    def _ind_adx(self, dataframe: DataFrame) -> None:
+        dataframe["adx"] = ta.ADX(dataframe)
 
-        # Overlap Studies
-        # ------------------------------------
+    def _ind_rsi(self, dataframe: DataFrame) -> None:
+        dataframe["rsi"] = ta.RSI(dataframe)
 
-        # Bollinger Bands
+    def _ind_bbands(self, dataframe: DataFrame) -> None:
         bollinger = qtpylib.bollinger_bands(qtpylib.typical_price(dataframe), window=20, stds=2)
         dataframe["bb_lowerband"] = bollinger["lower"]
         dataframe["bb_middleband"] = bollinger["mid"]
         dataframe["bb_upperband"] = bollinger["upper"]
+        self._bb_derived(dataframe)
+
+    def _bb_derived(self, dataframe: DataFrame) -> None:
         dataframe["bb_percent"] = (
             (dataframe["close"] - dataframe["bb_lowerband"]) /
             (dataframe["bb_upperband"] - dataframe["bb_lowerband"])
@@ -317,181 +544,147 @@ class HybridOkxAgent(IStrategy):
             (dataframe["bb_upperband"] - dataframe["bb_lowerband"]) / dataframe["bb_middleband"]
         )
 
-        # Bollinger Bands - Weighted (EMA based instead of SMA)
-        # weighted_bollinger = qtpylib.weighted_bollinger_bands(
-        #     qtpylib.typical_price(dataframe), window=20, stds=2
-        # )
-        # dataframe["wbb_upperband"] = weighted_bollinger["upper"]
-        # dataframe["wbb_lowerband"] = weighted_bollinger["lower"]
-        # dataframe["wbb_middleband"] = weighted_bollinger["mid"]
-        # dataframe["wbb_percent"] = (
-        #     (dataframe["close"] - dataframe["wbb_lowerband"]) /
-        #     (dataframe["wbb_upperband"] - dataframe["wbb_lowerband"])
-        # )
-        # dataframe["wbb_width"] = (
-        #     (dataframe["wbb_upperband"] - dataframe["wbb_lowerband"]) / dataframe["wbb_middleband"]
-        # )
-
-        # # EMA - Exponential Moving Average
-        # dataframe["ema3"] = ta.EMA(dataframe, timeperiod=3)
-        # dataframe["ema5"] = ta.EMA(dataframe, timeperiod=5)
-        # dataframe["ema10"] = ta.EMA(dataframe, timeperiod=10)
-        # dataframe["ema21"] = ta.EMA(dataframe, timeperiod=21)
-        # dataframe["ema50"] = ta.EMA(dataframe, timeperiod=50)
-        # dataframe["ema100"] = ta.EMA(dataframe, timeperiod=100)
-
-        # # SMA - Simple Moving Average
-        # dataframe["sma3"] = ta.SMA(dataframe, timeperiod=3)
-        # dataframe["sma5"] = ta.SMA(dataframe, timeperiod=5)
-        # dataframe["sma10"] = ta.SMA(dataframe, timeperiod=10)
-        # dataframe["sma21"] = ta.SMA(dataframe, timeperiod=21)
-        # dataframe["sma50"] = ta.SMA(dataframe, timeperiod=50)
-        # dataframe["sma100"] = ta.SMA(dataframe, timeperiod=100)
-
-        # Parabolic SAR
+    def _ind_ema(self, dataframe: DataFrame) -> dict:
+        return {f"ema{n}": ta.EMA(dataframe, timeperiod=n) for n in self.ema_periods()}
+
+    def _ind_donchian(self, dataframe: DataFrame) -> dict:
+        cols = {}
+        for n in self.donchian_windows():
+            high, low = self.donchian_columns(n)
+            cols[high] = dataframe["high"].rolling(n).max().shift(1)
+            cols[low] = dataframe["low"].rolling(n).min().shift(1)
+        return cols
+
+    def _ind_stochf(self, dataframe: DataFrame) -> None:
+        stoch_fast = ta.STOCHF(dataframe)
+        dataframe["fastd"] = stoch_fast["fastd"]
+        dataframe["fastk"] = stoch_fast["fastk"]
+
+    def _ind_macd(self, dataframe: DataFrame) -> None:
+        macd = ta.MACD(dataframe)
+        dataframe["macd"] = macd["macd"]
+        dataframe["macdsignal"] = macd["macdsignal"]
+        dataframe["macdhist"] = macd["macdhist"]
+
+    def _ind_mfi(self, dataframe: DataFrame) -> None:
+        dataframe["mfi"] = ta.MFI(dataframe)
+
+    def _ind_sar(self, dataframe: DataFrame) -> None:
         dataframe["sar"] = ta.SAR(dataframe)
 
-        # TEMA - Triple Exponential Moving Average
+    def _ind_tema(self, dataframe: DataFrame) -> None:
         dataframe["tema"] = ta.TEMA(dataframe, timeperiod=9)
 
-        # Cycle Indicator
-        # ------------------------------------
-        # Hilbert Transform Indicator - SineWave
+    def _ind_htsine(self, dataframe: DataFrame) -> None:
         hilbert = ta.HT_SINE(dataframe)
         dataframe["htsine"] = hilbert["sine"]
         dataframe["htleadsine"] = hilbert["leadsine"]
 
-        # Pattern Recognition - Bullish candlestick patterns
-        # ------------------------------------
-        # # Hammer: values [0, 100]
-        # dataframe["CDLHAMMER"] = ta.CDLHAMMER(dataframe)
-        # # Inverted Hammer: values [0, 100]
-        # dataframe["CDLINVERTEDHAMMER"] = ta.CDLINVERTEDHAMMER(dataframe)
-        # # Dragonfly Doji: values [0, 100]
-        # dataframe["CDLDRAGONFLYDOJI"] = ta.CDLDRAGONFLYDOJI(dataframe)
-        # # Piercing Line: values [0, 100]
-        # dataframe["CDLPIERCING"] = ta.CDLPIERCING(dataframe) # values [0, 100]
-        # # Morningstar: values [0, 100]
-        # dataframe["CDLMORNINGSTAR"] = ta.CDLMORNINGSTAR(dataframe) # values [0, 100]
-        # # Three White Soldiers: values [0, 100]
-        # dataframe["CDL3WHITESOLDIERS"] = ta.CDL3WHITESOLDIERS(dataframe) # values [0, 100]
-
-        # Pattern Recognition - Bearish candlestick patterns
-        # ------------------------------------
-        # # Hanging Man: values [0, 100]
-        # dataframe["CDLHANGINGMAN"] = ta.CDLHANGINGMAN(dataframe)
-        # # Shooting Star: values [0, 100]
-        # dataframe["CDLSHOOTINGSTAR"] = ta.CDLSHOOTINGSTAR(dataframe)
-        # # Gravestone Doji: values [0, 100]
-        # dataframe["CDLGRAVESTONEDOJI"] = ta.CDLGRAVESTONEDOJI(dataframe)
-        # # Dark Cloud Cover: values [0, 100]
-        # dataframe["CDLDARKCLOUDCOVER"] = ta.CDLDARKCLOUDCOVER(dataframe)
-        # # Evening Doji Star: values [0, 100]
-        # dataframe["CDLEVENINGDOJISTAR"] = ta.CDLEVENINGDOJISTAR(dataframe)
-        # # Evening Star: values [0, 100]
-        # dataframe["CDLEVENINGSTAR"] = ta.CDLEVENINGSTAR(dataframe)
-
-        # Pattern Recognition - Bullish/Bearish candlestick patterns
-        # ------------------------------------
-        # # Three Line Strike: values [0, -100, 100]
-        # dataframe["CDL3LINESTRIKE"] = ta.CDL3LINESTRIKE(dataframe)
-        # # Spinning Top: values [0, -100, 100]
-        # dataframe["CDLSPINNINGTOP"] = ta.CDLSPINNINGTOP(dataframe) # values [0, -100, 100]
-        # # Engulfing: values [0, -100, 100]
-        # dataframe["CDLENGULFING"] = ta.CDLENGULFING(dataframe) # values [0, -100, 100]
-        # # Harami: values [0, -100, 100]
-        # dataframe["CDLHARAMI"] = ta.CDLHARAMI(dataframe) # values [0, -100, 100]
-        # # Three Outside Up/Down: values [0, -100, 100]
-        # dataframe["CDL3OUTSIDE"] = ta.CDL3OUTSIDE(dataframe) # values [0, -100, 100]
-        # # Three Inside Up/Down: values [0, -100, 100]
-        # dataframe["CDL3INSIDE"] = ta.CDL3INSIDE(dataframe) # values [0, -100, 100]
-
-        # # Chart type
-        # # ------------------------------------
-        # # Heikin Ashi Strategy
-        # heikinashi = qtpylib.heikinashi(dataframe)
-        # dataframe["ha_open"] = heikinashi["open"]
-        # dataframe["ha_close"] = heikinashi["close"]
-        # dataframe["ha_high"] = heikinashi["high"]
-        # dataframe["ha_low"] = heikinashi["low"]
-
-        # Retrieve best bid and best ask from the orderbook
-        # ------------------------------------
-        """
-        # first check if dataprovider is available
-        if self.dp:
-            if self.dp.runmode.value in ("live", "dry_run"):
-                ob = self.dp.orderbook(metadata["pair"], 1)
-                dataframe["best_bid"] = ob["bids"][0][0]
-                dataframe["best_ask"] = ob["asks"][0][0]
-        """
+    def _ind_regime(self, dataframe: DataFrame, pair: str) -> dict:
+        from agent.resample_cache import get_resample_cache
 
-        return dataframe
+        out = get_resample_cache().apply(pair, self.timeframe, dataframe)
+        return {c: out[c] for c in self.INDICATOR_GROUPS["regime"]}
 
-    def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        # Trend regime
-        dataframe["ema20"] = ta.EMA(dataframe, timeperiod=20)
-        dataframe["ema50"] = ta.EMA(dataframe, timeperiod=50)
+    # --- Signal stage (pure reads of feature columns) ---
+
+    def _entry_signals(self, dataframe: DataFrame) -> tuple:
+        close = dataframe["close"]
+        active = dataframe["volume"] > 0
 
-        uptrend = dataframe["ema20"] > dataframe["ema50"]
-        downtrend = dataframe["ema20"] < dataframe["ema50"]
+        # Trend regime
+        ema_fast = dataframe[f"ema{self.ema_fast.value}"]
+        ema_slow = dataframe[f"ema{self.ema_slow.value}"]
+        uptrend = ema_fast > ema_slow
+        downtrend = ema_fast < ema_slow
 
         # Mean-reversion signals (BB + RSI)
-        mr_long = (dataframe["rsi"] < 30) & (dataframe["close"] < dataframe["bb_lowerband"])
-        mr_short = (dataframe["rsi"] > 70) & (dataframe["close"] > dataframe["bb_upperband"])
+        mr_long = (dataframe["rsi"] < self.buy_rsi.value) & (close < dataframe["bb_lowerband"])
+        mr_short = (dataframe["rsi"] > self.sell_rsi.value) & (close > dataframe["bb_upperband"])
 
         # Breakout signals (Donchian-ish)
-        hh = dataframe["high"].rolling(20).max()
-        ll = dataframe["low"].rolling(20).min()
-        bo_long = dataframe["close"] > hh.shift(1)
-        bo_short = dataframe["close"] < ll.shift(1)
-
-        dataframe.loc[
-            (
-                (dataframe["volume"] > 0)
-                & (
-                    (uptrend & (mr_long | bo_long))
-                    | (downtrend & bo_long)
-                )
-            ),
-            "enter_long",
-        ] = 1
-
-        dataframe.loc[
-            (
-                (dataframe["volume"] > 0)
-                & (
-                    (downtrend & (mr_short | bo_short))
-                    | (uptrend & bo_short)
-                )
-            ),
-            "enter_short",
-        ] = 1
+        donchian_high, donchian_low = self.donchian_columns(self.donchian_window.value)
+        bo_long = close > dataframe[donchian_high]
+        bo_short = close < dataframe[donchian_low]
+
+        enter_long = active & ((uptrend & (mr_long | bo_long)) | (downtrend & bo_long))
+        enter_short = active & ((downtrend & (mr_short | bo_short)) | (uptrend & bo_short))
+        return self._regime_filter(dataframe, enter_long, enter_short)
+
+    def _regime_filter(self, dataframe: DataFrame, enter_long, enter_short) -> tuple:
+        if not self.use_regime_filter.value:
+            return enter_long, enter_short
+        # Undefined regime (0) blocks neither side.
+        up = (dataframe["regime_4h"] >= 0) & (dataframe["regime_1d"] >= 0)
+        down = (dataframe["regime_4h"] <= 0) & (dataframe["regime_1d"] <= 0)
+        return enter_long & up.to_numpy(), enter_short & down.to_numpy()
+
+    def _exit_signals(self, dataframe: DataFrame) -> tuple:
+        # Exit on partial mean reversion / loss of momentum.
+        close = dataframe["close"]
+        active = dataframe["volume"] > 0
+        exit_long = active & ((close >= dataframe["bb_middleband"]) | (dataframe["rsi"] > self.exit_long_rsi.value))
+        exit_short = active & ((close <= dataframe["bb_middleband"]) | (dataframe["rsi"] < self.exit_short_rsi.value))
+        return exit_long, exit_short
 
+    @profiled("populate_entry_trend")
+    def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        batch = getattr(self, "_batch_entries", {}).pop(metadata["pair"], None)
+        if batch is not None and len(batch[0]) == len(dataframe):
+            enter_long, enter_short = self._regime_filter(dataframe, *batch)
+        else:
+            enter_long, enter_short = self._entry_signals(dataframe)
+        dataframe.loc[enter_long, "enter_long"] = 1
+        dataframe.loc[enter_short, "enter_short"] = 1
+        if self.keep_snapshots:
+            if not hasattr(self, "_snapshots"):
+                self._snapshots = {}
+            self._snapshots[metadata["pair"]] = FeatureSnapshot.from_frame(dataframe)
         return dataframe
 
+    @property
+    def keep_snapshots(self) -> bool:
+        """Per-pair confirm snapshots are only useful where confirm runs on the last candle."""
+        if os.getenv("AGENT_LLM_ENABLED", "0") not in ("1", "true", "TRUE"):
+            return False
+        return self.runmode_value in ("live", "dry_run")
+
+    @profiled("populate_exit_trend")
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        # Exit on partial mean reversion / loss of momentum.
-        dataframe.loc[
-            (
-                (dataframe["volume"] > 0)
-                & (
-                    (dataframe["close"] >= dataframe["bb_middleband"])
-                    | (dataframe["rsi"] > 55)
-                )
-            ),
-            "exit_long",
-        ] = 1
-
-        dataframe.loc[
-            (
-                (dataframe["volume"] > 0)
-                & (
-                    (dataframe["close"] <= dataframe["bb_middleband"])
-                    | (dataframe["rsi"] < 45)
-                )
-            ),
-            "exit_short",
-        ] = 1
+        exit_long, exit_short = self._exit_signals(dataframe)
+        dataframe.loc[exit_long, "exit_long"] = 1
+        dataframe.loc[exit_short, "exit_short"] = 1
+        if self.use_compact:
+            return self._compact(dataframe)
+        return dataframe
 
-        return dataframe
\ No newline at end of file
+    # --- Compact analyzed dataframe ---
+
+    SIGNAL_COLUMNS = ("enter_long", "enter_short", "exit_long", "exit_short")
+
+    @property
+    def use_compact(self) -> bool:
+        """AGENT_STRATEGY_COMPACT=1: float32 features, int8 signals, intermediates dropped.
+
+        Not used in hyperopt, where the indicator frame is reused across epochs.
+        """
+        if os.getenv("AGENT_STRATEGY_COMPACT", "0") not in ("1", "true", "TRUE"):
+            return False
+        return self.runmode_value != "hyperopt"
+
+    def _compact(self, dataframe: DataFrame) -> DataFrame:
+        # Signals are already derived from the float64 features, so they are unaffected;
+        # only the retained feature values lose precision (float32, ~7 significant digits).
+        keep = set()
+        if os.getenv("AGENT_LLM_ENABLED", "0") in ("1", "true", "TRUE"):
+            keep |= set(self.CONFIRM_COLUMNS)
+        if self.plot_debug:
+            keep |= set(self.PLOT_COLUMNS) | self.entry_columns() | set(self.EXIT_COLUMNS)
+        produced = {c for g in self.INDICATOR_GROUPS for c in self.group_columns(g)}
+        dataframe = dataframe.drop(columns=[c for c in dataframe.columns if c in produced and c not in keep])
+
+        dtypes = {c: "int8" for c in self.SIGNAL_COLUMNS if c in dataframe.columns}
+        for c in dtypes:
+            dataframe[c] = dataframe[c].fillna(0)
+        dtypes.update({c: "float32" for c in dataframe.columns if c in keep and c in produced})
+        return dataframe.astype(dtypes)